@@ -0,0 +1,213 @@
+"""
+api/admission.py — Допуск тяжёлых генераций: лимиты, очередь, приоритеты
+
+Каждый генерационный маршрут относится к полосе (Lane) со своим лимитом
+одновременных задач, ограниченной очередью ожидания и таймаутом ожидания.
+Сверху действует общий бюджет слотов процесса (по умолчанию — число ядер):
+задача полосы занимает ``weight`` слотов, пакетная может занимать несколько.
+
+Когда слот освобождается, очередь разбирается по приоритету полос
+(интерактивные одиночные модули и дома раньше пакетных), внутри полосы —
+в порядке прихода.  Перегрузка отражается в ответе, а не в латентности всех:
+
+  очередь полосы заполнена         → 429 Too Many Requests + Retry-After
+  не дождались слота за timeout    → 503 Service Unavailable + Retry-After
+
+Retry-After оценивается по скользящему среднему времени обслуживания полосы.
+
+Контроллер живёт в event loop сервера и не потокобезопасен: enter/release
+вызываются только из корутин (сама генерация идёт в пуле потоков).
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, Optional
+
+from src.metrics import REGISTRY
+
+# Retry-After, пока по полосе нет статистики, и его пределы (секунды)
+DEFAULT_RETRY_AFTER = 5
+MAX_RETRY_AFTER = 300
+
+# Вес нового замера в скользящем среднем времени обслуживания
+SERVICE_TIME_ALPHA = 0.2
+
+ADMISSION_WAIT = REGISTRY.histogram(
+    "admission_wait_seconds", "Time generation requests spent queued for a slot", ("lane",),
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total", "Generation requests rejected by admission control",
+    ("lane", "reason"),
+)
+
+
+@dataclass
+class Lane:
+    """Настройки полосы допуска."""
+    name: str
+    limit: int                  # одновременно выполняемых задач полосы
+    max_queue: int              # ожидающих сверх limit; дальше — 429
+    timeout: float              # сколько ждать слота, секунд; дальше — 503
+    priority: int = 0           # 0 — интерактивные; больше — обслуживаются позже
+    weight: int = 1             # сколько слотов общего бюджета занимает задача
+
+
+class Rejected(Exception):
+    """Запрос не допущен: status_code 429/503 и рекомендуемый Retry-After."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """Место задачи в полосе: ожидание слота и его освобождение."""
+
+    def __init__(self, controller: "AdmissionController", lane: Lane):
+        self.controller = controller
+        self.lane = lane
+        self.enqueued_at = time.perf_counter()
+        self.granted_at: Optional[float] = None
+        self.released = False
+        self._granted = asyncio.get_running_loop().create_future()
+
+    @property
+    def granted(self) -> bool:
+        return self._granted.done()
+
+    def _grant(self) -> None:
+        self.granted_at = time.perf_counter()
+        self._granted.set_result(None)
+
+    async def wait(self) -> None:
+        """Ждёт слот не дольше lane.timeout; при таймауте — Rejected(503)."""
+        try:
+            if not self.granted:
+                await asyncio.wait_for(asyncio.shield(self._granted), self.lane.timeout)
+        except asyncio.TimeoutError:
+            if not self.granted:
+                self.controller._abandon(self)
+                ADMISSION_REJECTED.inc(lane=self.lane.name, reason="timeout")
+                raise Rejected(
+                    f"Сервер перегружен: нет свободного слота '{self.lane.name}' "
+                    f"за {self.lane.timeout:.0f} с",
+                    503, self.controller.retry_after(self.lane.name),
+                )
+        except BaseException:
+            # Отмена (клиент ушёл): освобождаем место в очереди или слот
+            self.release()
+            raise
+        ADMISSION_WAIT.observe(self.granted_at - self.enqueued_at, lane=self.lane.name)
+
+    def release(self) -> None:
+        if self.released:
+            return
+        self.released = True
+        if self.granted:
+            self.controller._finish(self)
+        else:
+            self.controller._abandon(self)
+
+
+class AdmissionController:
+    """Общий бюджет слотов + полосы с лимитами, очередями и приоритетами."""
+
+    def __init__(self, slots: int, lanes: Iterable[Lane]):
+        self.slots = max(1, slots)
+        self.lanes: Dict[str, Lane] = {}
+        for lane in lanes:
+            lane.weight = max(1, min(lane.weight, self.slots))
+            self.lanes[lane.name] = lane
+        self._order = sorted(self.lanes.values(), key=lambda l: l.priority)
+        self._active: Dict[str, int] = {name: 0 for name in self.lanes}
+        self._queues: Dict[str, Deque[Ticket]] = {name: deque() for name in self.lanes}
+        self._service_time: Dict[str, Optional[float]] = {name: None for name in self.lanes}
+        self._used = 0
+
+    # ── Допуск ────────────────────────────────────────────────────
+
+    def enter(self, lane_name: str) -> Ticket:
+        """Ставит задачу в полосу; сразу выдаёт слот, если он есть. Иначе очередь или 429."""
+        lane = self.lanes[lane_name]
+        queue = self._queues[lane_name]
+        if len(queue) >= lane.max_queue and not self._can_run(lane):
+            ADMISSION_REJECTED.inc(lane=lane_name, reason="queue_full")
+            raise Rejected(
+                f"Слишком много запросов '{lane_name}': очередь заполнена ({lane.max_queue})",
+                429, self.retry_after(lane_name),
+            )
+        ticket = Ticket(self, lane)
+        queue.append(ticket)
+        self._dispatch()
+        return ticket
+
+    async def acquire(self, lane_name: str) -> Ticket:
+        ticket = self.enter(lane_name)
+        await ticket.wait()
+        return ticket
+
+    def _can_run(self, lane: Lane) -> bool:
+        return (self._active[lane.name] < lane.limit
+                and self._used + lane.weight <= self.slots)
+
+    def _dispatch(self) -> None:
+        for lane in self._order:
+            queue = self._queues[lane.name]
+            while queue and self._can_run(lane):
+                ticket = queue.popleft()
+                self._active[lane.name] += 1
+                self._used += lane.weight
+                ticket._grant()
+
+    def _abandon(self, ticket: Ticket) -> None:
+        try:
+            self._queues[ticket.lane.name].remove(ticket)
+        except ValueError:
+            pass
+
+    def _finish(self, ticket: Ticket) -> None:
+        lane = ticket.lane
+        self._active[lane.name] -= 1
+        self._used -= lane.weight
+        held = time.perf_counter() - ticket.granted_at
+        prev = self._service_time[lane.name]
+        self._service_time[lane.name] = held if prev is None else (
+            prev + SERVICE_TIME_ALPHA * (held - prev))
+        self._dispatch()
+
+    # ── Состояние ─────────────────────────────────────────────────
+
+    def retry_after(self, lane_name: str) -> int:
+        """Оценка, через сколько секунд в полосе освободится место."""
+        lane = self.lanes[lane_name]
+        service = self._service_time[lane_name]
+        if service is None:
+            return DEFAULT_RETRY_AFTER
+        waves = (len(self._queues[lane_name]) + self._active[lane_name]) / lane.limit
+        return int(max(1, min(MAX_RETRY_AFTER, math.ceil(service * max(1.0, waves)))))
+
+    def active(self) -> Dict[tuple, int]:
+        return {(name,): n for name, n in self._active.items()}
+
+    def queued(self) -> Dict[tuple, int]:
+        return {(name,): len(q) for name, q in self._queues.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "used": self._used,
+            "lanes": {
+                name: {
+                    "active": self._active[name],
+                    "queued": len(self._queues[name]),
+                    "limit": lane.limit,
+                    "max_queue": lane.max_queue,
+                    "priority": lane.priority,
+                }
+                for name, lane in self.lanes.items()
+            },
+        }
@@ -0,0 +1,104 @@
+"""
+api/idempotency.py — Idempotency-Key и объединение одинаковых генераций
+
+Клиенты повторяют /api/generate-module и /api/generate-house по таймауту;
+без защиты каждый повтор запускает новую генерацию с новым module_id.
+
+Запрос описывается отпечатком (fingerprint) нормализованных параметров.
+Генерация — это задача (``api.jobs.Job``), и повторы присоединяются к ней:
+
+  * одинаковый отпечаток, пока задача выполняется → та же задача
+    (single-flight: все ждут одно вычисление и получают один результат);
+  * тот же Idempotency-Key → та же задача и после завершения, в течение TTL
+    (успешный результат отдаётся повторно без генерации);
+  * тот же ключ с другими параметрами → IdempotencyConflict (422).
+
+Неудачная задача по ключу не закрепляется: повтор после ошибки запускает
+генерацию заново.  Всё хранится в памяти процесса и используется только из
+event loop, поэтому блокировки не нужны.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.metrics import REGISTRY
+
+# Сколько помнить результат по Idempotency-Key и сколько ключей держать
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+IDEMPOTENCY_MAX_KEYS = 1000
+MAX_KEY_LENGTH = 255
+
+COALESCED = REGISTRY.counter(
+    "generation_coalesced_total",
+    "Generation requests served by an existing job instead of a new one",
+    ("kind", "reason"),
+)
+
+
+class IdempotencyConflict(Exception):
+    """Ключ уже использован с другими параметрами (или некорректен)."""
+
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def fingerprint(data: Any) -> str:
+    """Стабильный хэш JSON-совместимых параметров (порядок ключей не важен)."""
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class RequestCoalescer:
+    """Выполняющиеся задачи по отпечатку и задачи по Idempotency-Key."""
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._running: Dict[Tuple[str, str], Any] = {}
+        # (kind, key) → (fingerprint, job, истекает)
+        self._keys: "OrderedDict[Tuple[str, str], Tuple[str, Any, float]]" = OrderedDict()
+
+    def find(self, kind: str, key: Optional[str], fp: str) -> Optional[Any]:
+        """Задача, к которой можно присоединить запрос, или None."""
+        if key is not None:
+            if not key or len(key) > MAX_KEY_LENGTH:
+                raise IdempotencyConflict(f"Idempotency-Key: от 1 до {MAX_KEY_LENGTH} символов", 400)
+            entry = self._keys.get((kind, key))
+            if entry is not None:
+                entry_fp, job, expires = entry
+                if expires < time.monotonic() or job.status == "error":
+                    del self._keys[(kind, key)]
+                elif entry_fp != fp:
+                    raise IdempotencyConflict("Idempotency-Key уже использован с другими параметрами")
+                else:
+                    COALESCED.inc(kind=kind, reason="key")
+                    return job
+
+        job = self._running.get((kind, fp))
+        if job is not None:
+            if not job.done:
+                COALESCED.inc(kind=kind, reason="in_flight")
+                if key is not None:
+                    self._remember(kind, key, fp, job)
+                return job
+            del self._running[(kind, fp)]
+        return None
+
+    def register(self, kind: str, key: Optional[str], fp: str, job: Any) -> None:
+        """Запоминает только что запущенную задачу."""
+        for flight, other in list(self._running.items()):
+            if other.done:
+                del self._running[flight]
+        self._running[(kind, fp)] = job
+        if key is not None:
+            self._remember(kind, key, fp, job)
+
+    def _remember(self, kind: str, key: str, fp: str, job: Any) -> None:
+        self._keys[(kind, key)] = (fp, job, time.monotonic() + self.ttl)
+        self._keys.move_to_end((kind, key))
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
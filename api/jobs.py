@@ -0,0 +1,167 @@
+"""
+api/jobs.py — Фоновые задачи генерации и поток их прогресса (Server-Sent Events)
+
+Задача (Job) копит события стадий, которые присылают хуки генераторов и
+ассемблера (см. ``src.generator.progress``), и отдаёт их подписчикам SSE.
+События нумеруются, поэтому клиент, переподключившийся с заголовком
+``Last-Event-ID``, получает только пропущенное.  Поток закрывается событием
+``done`` (результат) или ``error``.
+
+Хуки вызываются из рабочих потоков, подписчики живут в event loop сервера:
+добавление события — под ``threading.Lock``, пробуждение подписчиков — через
+``loop.call_soon_threadsafe``.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# Интервал комментариев keep-alive в SSE, чтобы прокси не рвали соединение
+SSE_HEARTBEAT_SECONDS = 15.0
+
+# Сколько задач держать в памяти (старые завершённые вытесняются первыми)
+MAX_JOBS = 200
+
+
+class Job:
+    """Одна фоновая генерация: журнал событий + итог."""
+
+    def __init__(self, kind: str, loop: asyncio.AbstractEventLoop):
+        self.job_id = str(uuid.uuid4())[:8]
+        self.kind = kind
+        self.created_at = datetime.now().isoformat()
+        self.status = "running"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.status_code = 200
+        self.retry_after: Optional[int] = None
+        self.trace_id: Optional[str] = None  # трассировка, куда пишутся стадии (src/tracing.py)
+
+        self._t0 = time.perf_counter()
+        self._events: List[Tuple[str, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status != "running"
+
+    # ── Производитель (рабочий поток) ─────────────────────────────
+
+    def hook(self, event: Dict[str, Any]) -> None:
+        """ProgressHook: события стадий с временем от начала задачи."""
+        self._append("stage", {"elapsed": round(time.perf_counter() - self._t0, 4), **event})
+
+    def finish(self, result: Dict[str, Any]) -> None:
+        self.result = result
+        self.status = "done"
+        self._append("done", result)
+
+    def fail(self, error: str, status_code: int = 500, retry_after: Optional[int] = None) -> None:
+        self.error = error
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.status = "error"
+        data: Dict[str, Any] = {"error": error, "status_code": status_code}
+        if retry_after is not None:
+            data["retry_after"] = retry_after
+        self._append("error", data)
+
+    def _append(self, kind: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._events.append((kind, data))
+        self._loop.call_soon_threadsafe(self._notify)
+
+    def _notify(self) -> None:
+        # Новое Event на каждое изменение: подписчики, ждущие старое, просыпаются
+        # все сразу, и ни один не может «съесть» уведомление другого через clear().
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    # ── Потребитель (event loop) ──────────────────────────────────
+
+    def stages(self) -> List[Dict[str, Any]]:
+        """Завершённые стадии (end/error) — сводка для GET /api/jobs/{id}."""
+        with self._lock:
+            return [data for kind, data in self._events
+                    if kind == "stage" and data.get("status") != "start"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "stages": self.stages(),
+        }
+        if self.result is not None:
+            info["result"] = self.result
+        if self.error is not None:
+            info["error"] = self.error
+        if self.trace_id is not None:
+            info["trace_id"] = self.trace_id
+        return info
+
+    async def wait(self) -> None:
+        """Дожидается done/error (для синхронных ответов и объединённых запросов)."""
+        while True:
+            changed = self._changed
+            if self.done:
+                return
+            await changed.wait()
+
+    async def stream(self, last_event_id: int = -1) -> AsyncIterator[str]:
+        """SSE-кадры начиная с события после *last_event_id*, до done/error."""
+        idx = max(0, last_event_id + 1)
+        while True:
+            changed = self._changed
+            with self._lock:
+                pending = self._events[idx:]
+            for kind, data in pending:
+                yield f"id: {idx}\nevent: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                idx += 1
+                if kind in ("done", "error"):
+                    return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+
+class JobStore:
+    """Ограниченный реестр задач в памяти процесса."""
+
+    def __init__(self, max_jobs: int = MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, kind: str) -> Job:
+        job = Job(kind, asyncio.get_running_loop())
+        with self._lock:
+            self._jobs[job.job_id] = job
+            if len(self._jobs) > self.max_jobs:
+                for job_id in [j for j, old in self._jobs.items() if old.done]:
+                    if len(self._jobs) <= self.max_jobs:
+                        break
+                    del self._jobs[job_id]
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def counts(self) -> Dict[Tuple[str, str], int]:
+        """Число задач по (kind, status) — для метрик."""
+        result: Dict[Tuple[str, str], int] = {}
+        with self._lock:
+            for job in self._jobs.values():
+                key = (job.kind, job.status)
+                result[key] = result.get(key, 0) + 1
+        return result
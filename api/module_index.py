@@ -0,0 +1,164 @@
+"""
+api/module_index.py — Индексы реестра модулей для постраничной выдачи /api/modules
+
+Записи берутся из RegistryStore (api/registry_store.py) и переиндексируются
+только когда меняется его версия; между изменениями страница строится по
+индексам:
+
+  records    — все записи, отсортированные по (created_at, module_id)
+  keys       — те же ключи сортировки, для bisect по курсору и created_after
+  by_type    — позиции записей каждого типа (в том же порядке) и их ключи
+  by_id      — module_id → запись
+
+Курсор — непрозрачная строка с ключом последней выданной записи, поэтому
+страницы стабильны при добавлении новых модулей.  Фильтры по диапазонам
+параметров проверяются при проходе от курсора: просматривается ровно столько
+записей, сколько нужно, чтобы набрать страницу.
+"""
+
+import base64
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from api.registry_store import RegistryStore
+
+SortKey = Tuple[str, str]
+# (имя параметра, нижняя граница | None, верхняя граница | None)
+ParamRange = Tuple[str, Optional[float], Optional[float]]
+
+# Больше любой строки module_id — чтобы created_after отсекал весь момент времени
+_KEY_MAX = "\uffff"
+
+
+def encode_cursor(key: SortKey) -> str:
+    raw = json.dumps(list(key), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Обратное к encode_cursor; ValueError для испорченного курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, module_id = json.loads(raw.decode("utf-8"))
+        return str(created_at), str(module_id)
+    except Exception as exc:
+        raise ValueError(f"Некорректный cursor: {cursor}") from exc
+
+
+def project(record: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """Оставляет только указанные поля; params.width — вложенное поле."""
+    out: Dict[str, Any] = {}
+    for field in fields:
+        head, _, rest = field.partition(".")
+        if head not in record:
+            continue
+        if not rest:
+            out[head] = record[head]
+        elif isinstance(record[head], dict) and rest in record[head]:
+            out.setdefault(head, {})[rest] = record[head][rest]
+    return out
+
+
+def _in_ranges(record: Dict[str, Any], ranges: Sequence[ParamRange]) -> bool:
+    params = record.get("params") or {}
+    for name, lo, hi in ranges:
+        try:
+            value = float(params[name])
+        except (KeyError, TypeError, ValueError):
+            return False
+        if lo is not None and value < lo:
+            return False
+        if hi is not None and value > hi:
+            return False
+    return True
+
+
+def _sort_key(record: Dict[str, Any]) -> SortKey:
+    return str(record.get("created_at") or ""), str(record.get("module_id") or "")
+
+
+class ModuleIndex:
+    """Вторичные индексы реестра, перестраиваемые только при изменении реестра."""
+
+    def __init__(self, store: RegistryStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+
+        self.records: List[Dict[str, Any]] = []
+        self.keys: List[SortKey] = []
+        self.by_type: Dict[str, List[int]] = {}
+        self.type_keys: Dict[str, List[SortKey]] = {}
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+
+    def refresh(self) -> None:
+        """Перестраивает индексы, если реестр изменился с прошлого раза."""
+        self.store.refresh()
+        version = self.store.version
+        records = self.store.all()
+        with self._lock:
+            if version == self._version:
+                return
+            self._rebuild(records)
+            self._version = version
+
+    def _rebuild(self, modules: List[Dict[str, Any]]) -> None:
+        records = sorted(modules, key=_sort_key)
+        keys = [_sort_key(r) for r in records]
+        by_type: Dict[str, List[int]] = {}
+        for pos, record in enumerate(records):
+            by_type.setdefault(record.get("module_type"), []).append(pos)
+
+        self.records = records
+        self.keys = keys
+        self.by_type = by_type
+        self.type_keys = {t: [keys[p] for p in positions] for t, positions in by_type.items()}
+        self.by_id = {r.get("module_id"): r for r in records}
+
+    def of_type(self, module_type: str) -> List[Dict[str, Any]]:
+        self.refresh()
+        return [self.records[p] for p in self.by_type.get(module_type, [])]
+
+    def page(self,
+             module_type: Optional[str] = None,
+             created_after: Optional[str] = None,
+             ranges: Sequence[ParamRange] = (),
+             cursor: Optional[str] = None,
+             limit: int = 50,
+             descending: bool = False) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Одна страница (записи, курсор следующей страницы или None)."""
+        self.refresh()
+        with self._lock:
+            records = self.records
+            if module_type is not None:
+                positions: Optional[List[int]] = self.by_type.get(module_type, [])
+                keys = self.type_keys.get(module_type, [])
+            else:
+                positions = None
+                keys = self.keys
+        after_key = decode_cursor(cursor) if cursor else None
+
+        lower = bisect_right(keys, (created_after, _KEY_MAX)) if created_after else 0
+        upper = len(keys)
+        items: List[Dict[str, Any]] = []
+
+        if not descending:
+            i = max(lower, bisect_right(keys, after_key)) if after_key else lower
+            while i < upper and len(items) < limit:
+                record = records[positions[i] if positions is not None else i]
+                if not ranges or _in_ranges(record, ranges):
+                    items.append(record)
+                i += 1
+            next_cursor = encode_cursor(keys[i - 1]) if i < upper else None
+        else:
+            i = (bisect_left(keys, after_key) if after_key else upper) - 1
+            while i >= lower and len(items) < limit:
+                record = records[positions[i] if positions is not None else i]
+                if not ranges or _in_ranges(record, ranges):
+                    items.append(record)
+                i -= 1
+            next_cursor = encode_cursor(keys[i + 1]) if i >= lower else None
+
+        return items, next_cursor
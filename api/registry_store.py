@@ -0,0 +1,349 @@
+"""
+api/registry_store.py — Реестры модулей и домов в памяти с журналом изменений
+
+Раньше каждое чтение реестра брало fcntl-замок и разбирало весь JSON-файл,
+а каждое изменение перезаписывало его целиком.  RegistryStore держит
+разобранные записи в памяти (порядок добавления + индекс по id и по типу):
+чтение — поиск в словаре, без разбора файла.
+
+На диске реестр — это базовый файл (прежний JSON-список, формат не изменился)
+и журнал рядом с ним (``<имя>.journal``, JSON Lines), куда дописываются
+операции:
+
+  {"op": "put", "record": {...}}   — добавить или заменить запись по id
+  {"op": "del", "id": "..."}       — удалить запись
+
+Изменение — это одна-две строки в конце журнала, а не перезапись реестра.
+Когда в журнале набирается ``compact_every`` операций, он сворачивается:
+базовый файл атомарно переписывается (tmp + os.replace), журнал очищается.
+
+Другие процессы (uvicorn --workers N) замечаются по mtime/размеру файлов:
+выросший журнал дочитывается с прошлой позиции, а заменённый базовый файл
+(после сворачивания) перечитывается целиком.  Все записи и сворачивание идут
+под эксклюзивным fcntl-замком журнала, чтение с диска — под разделяемым.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.metrics import REGISTRY
+from src.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# После скольких операций в журнале переписывать базовый файл
+REGISTRY_COMPACT_EVERY = int(os.getenv("REGISTRY_COMPACT_EVERY", "200"))
+
+try:
+    import fcntl as _fcntl
+
+    def _flock(f, exclusive: bool):
+        _fcntl.flock(f, _fcntl.LOCK_EX if exclusive else _fcntl.LOCK_SH)
+
+    def _funlock(f):
+        _fcntl.flock(f, _fcntl.LOCK_UN)
+except ImportError:
+    # Windows: без межпроцессных замков, одного процесса хватает threading.Lock
+    def _flock(f, exclusive: bool):  # noqa: F811
+        pass
+
+    def _funlock(f):                 # noqa: F811
+        pass
+
+
+REGISTRY_LOCK_WAIT = REGISTRY.histogram(
+    "registry_lock_wait_seconds",
+    "Time spent waiting for the registry thread lock and file lock",
+    ("registry", "mode"),
+)
+REGISTRY_RELOADS = REGISTRY.counter(
+    "registry_reloads_total",
+    "Registry reads from disk (full reload of the base file or journal tail)",
+    ("registry", "kind"),
+)
+REGISTRY_COMPACTIONS = REGISTRY.counter(
+    "registry_compactions_total", "Registry journal compactions", ("registry",),
+)
+
+Signature = Optional[Tuple[int, int, int]]
+
+
+def _signature(path: Path) -> Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class RegistryStore:
+    """
+    Записи одного реестра в памяти (id → запись) с индексом по типу.
+
+    Возвращаемые записи — общие объекты кэша, их нельзя менять на месте:
+    изменение — это put() копии, update() или delete().
+    """
+
+    def __init__(self,
+                 path: Path,
+                 id_field: str,
+                 type_field: Optional[str] = None,
+                 compact_every: int = REGISTRY_COMPACT_EVERY):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".journal")
+        self.id_field = id_field
+        self.type_field = type_field
+        self.compact_every = max(1, compact_every)
+        self.name = self.path.stem
+
+        self._lock = threading.RLock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._by_type: Dict[Any, Dict[str, Dict[str, Any]]] = {}
+        self._list: Optional[List[Dict[str, Any]]] = None
+        self._base_sig: Signature = None
+        self._journal_sig: Signature = None
+        self._offset = 0           # сколько байт журнала уже применено
+        self._journal_ops = 0      # операций в журнале (для сворачивания)
+        self.version = 0           # растёт при каждом изменении содержимого
+
+        if not self.path.exists():
+            self._write_base([])
+        self.journal_path.touch(exist_ok=True)
+
+    # ── Чтение ────────────────────────────────────────────────────
+
+    def refresh(self) -> None:
+        """Подхватывает изменения файлов (других процессов), если они были."""
+        if (_signature(self.path) == self._base_sig
+                and _signature(self.journal_path) == self._journal_sig):
+            return
+        with self._lock:
+            with self._journal(exclusive=False, mode="read") as journal:
+                self._sync(journal)
+
+    def get(self, record_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        self.refresh()
+        # Без замка: _sync подменяет словарь целиком, чтение одной ссылки атомарно
+        return self._records.get(record_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Все записи в порядке добавления (один и тот же список до изменения)."""
+        self.refresh()
+        with self._lock:
+            if self._list is None:
+                self._list = list(self._records.values())
+            return self._list
+
+    def of_type(self, record_type: Any) -> List[Dict[str, Any]]:
+        self.refresh()
+        with self._lock:
+            return list(self._by_type.get(record_type, {}).values())
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._records)
+
+    # ── Изменение ─────────────────────────────────────────────────
+
+    def put(self, *records: Dict[str, Any]) -> None:
+        """Добавляет записи или заменяет записи с тем же id."""
+        self._commit([{"op": "put", "record": r} for r in records])
+
+    def delete(self, record_id: str) -> bool:
+        """Удаляет запись; False, если её не было."""
+        removed = []
+
+        def ops(records: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+            if record_id not in records:
+                return []
+            removed.append(record_id)
+            return [{"op": "del", "id": record_id}]
+
+        self._commit(ops)
+        return bool(removed)
+
+    def update(self, mutate: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]
+               ) -> List[Dict[str, Any]]:
+        """
+        mutate(копии записей) → новый список; в журнал пишется только разница.
+        Чтение и запись идут под одним замком, как прежний read-modify-write.
+        """
+        def ops(records: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+            current = list(records.values())
+            result = mutate(json.loads(json.dumps(current, ensure_ascii=False)))
+            new_ids = {r.get(self.id_field) for r in result}
+            out: List[Dict[str, Any]] = [
+                {"op": "del", "id": rid} for rid in records if rid not in new_ids
+            ]
+            out += [{"op": "put", "record": r} for r in result
+                    if records.get(r.get(self.id_field)) != r]
+            return out
+
+        self._commit(ops)
+        return self.all()
+
+    def replace(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Заменяет весь реестр (прежний save_*_registry)."""
+        records = list(records)
+        self.update(lambda _: records)
+
+    def compact(self) -> None:
+        """Сворачивает журнал в базовый файл."""
+        with self._lock:
+            with self._journal(exclusive=True, mode="compact") as journal:
+                self._sync(journal)
+                self._compact(journal)
+
+    # ── Внутреннее ────────────────────────────────────────────────
+
+    @contextmanager
+    def _journal(self, exclusive: bool, mode: str):
+        """Файл журнала под fcntl-замком на время операции."""
+        t0 = time.perf_counter()
+        with span("registry_io", registry=self.name, mode=mode), \
+                open(self.journal_path, "r+b" if exclusive else "rb") as f:
+            _flock(f, exclusive)
+            REGISTRY_LOCK_WAIT.observe(time.perf_counter() - t0, registry=self.name, mode=mode)
+            try:
+                yield f
+            finally:
+                _funlock(f)
+
+    def _commit(self, ops) -> None:
+        with self._lock:
+            with self._journal(exclusive=True, mode="write") as journal:
+                self._sync(journal)
+                if callable(ops):
+                    ops = ops(self._records)
+                if not ops:
+                    return
+                journal.seek(0, os.SEEK_END)
+                if journal.tell() > 0:
+                    journal.seek(-1, os.SEEK_END)
+                    if journal.read(1) != b"\n":
+                        # Хвост недописанной строки (упавший процесс) — отделяем
+                        journal.write(b"\n")
+                data = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+                journal.write(data.encode("utf-8"))
+                journal.flush()
+                for op in ops:
+                    self._apply(op)
+                self._journal_ops += len(ops)
+                self._offset = journal.tell()
+                self._base_sig = _signature(self.path)
+                self._journal_sig = _signature(self.journal_path)
+                self._changed()
+                if self._journal_ops >= self.compact_every:
+                    self._compact(journal)
+
+    def _sync(self, journal) -> None:
+        """Приводит память к состоянию файлов; вызывается под замком журнала."""
+        base_sig = _signature(self.path)
+        journal_sig = _signature(self.journal_path)
+        if base_sig == self._base_sig and journal_sig == self._journal_sig:
+            return
+        full = (base_sig != self._base_sig or journal_sig is None
+                or self._journal_sig is None or journal_sig[0] != self._journal_sig[0]
+                or journal_sig[2] < self._offset)
+        # Полная перезагрузка строится в новых словарях и подменяется одним
+        # присваиванием: get() без замка не видит пустой или недостроенный реестр.
+        # Хвост журнала применяется на месте — каждая операция атомарна сама по себе
+        if full:
+            records, by_type = self._load_base()
+            offset, journal_ops = 0, 0
+            REGISTRY_RELOADS.inc(registry=self.name, kind="full")
+        else:
+            records, by_type = self._records, self._by_type
+            offset, journal_ops = self._offset, self._journal_ops
+            REGISTRY_RELOADS.inc(registry=self.name, kind="journal")
+
+        journal.seek(offset)
+        tail = journal.read()
+        complete = tail.rfind(b"\n") + 1
+        for line in tail[:complete].splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line), records, by_type)
+            except (ValueError, KeyError, TypeError) as exc:
+                logger.warning(f"Пропущена повреждённая строка журнала {self.journal_path.name}: {exc}")
+                continue
+            journal_ops += 1
+        self._records, self._by_type = records, by_type
+        self._offset = offset + complete
+        self._journal_ops = journal_ops
+        self._base_sig = base_sig
+        self._journal_sig = journal_sig
+        self._changed()
+
+    def _load_base(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[Any, Dict[str, Dict[str, Any]]]]:
+        """Записи базового файла в новых словарях (текущие не трогаются)."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, ValueError) as exc:
+            logger.error(f"Ошибка загрузки реестра {self.path.name}: {exc}")
+            records = []
+        by_id: Dict[str, Dict[str, Any]] = {}
+        by_type: Dict[Any, Dict[str, Dict[str, Any]]] = {}
+        for record in records:
+            self._apply({"op": "put", "record": record}, by_id, by_type)
+        return by_id, by_type
+
+    def _apply(self, op: Dict[str, Any], records=None, by_type=None) -> None:
+        records = self._records if records is None else records
+        by_type = self._by_type if by_type is None else by_type
+        if op["op"] == "put":
+            record = op["record"]
+            record_id = record.get(self.id_field)
+            old = records.get(record_id)
+            if old is not None:
+                self._unindex(record_id, old, by_type)
+            records[record_id] = record
+            if self.type_field is not None:
+                by_type.setdefault(record.get(self.type_field), {})[record_id] = record
+        elif op["op"] == "del":
+            old = records.pop(op["id"], None)
+            if old is not None:
+                self._unindex(op["id"], old, by_type)
+        else:
+            raise KeyError(op["op"])
+
+    def _unindex(self, record_id: str, record: Dict[str, Any], by_type) -> None:
+        if self.type_field is None:
+            return
+        bucket = by_type.get(record.get(self.type_field))
+        if bucket is not None:
+            bucket.pop(record_id, None)
+
+    def _changed(self) -> None:
+        self._list = None
+        self.version += 1
+
+    def _compact(self, journal) -> None:
+        t0 = time.perf_counter()
+        self._write_base(list(self._records.values()))
+        journal.seek(0)
+        journal.truncate()
+        self._offset = 0
+        self._journal_ops = 0
+        self._base_sig = _signature(self.path)
+        self._journal_sig = _signature(self.journal_path)
+        REGISTRY_COMPACTIONS.inc(registry=self.name)
+        logger.info(f"✓ Журнал реестра {self.name} свёрнут "
+                    f"({len(self._records)} записей, {time.perf_counter() - t0:.3f} с)")
+
+    def _write_base(self, records: List[Dict[str, Any]]) -> None:
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
@@ -3,22 +3,23 @@ api/server.py — Переделанный сервер для модульно
 Три вкладки: Module Generator → Module Library → House Builder
 """
 
+import asyncio
 import base64
-import copy
 import logging
 import json
+import os
 import subprocess
 import threading
-import zipfile
+import time
 import uuid
-from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Mapping, Optional
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, FileResponse, Response
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Импортируем свои модули
@@ -29,9 +30,20 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.ai_parser.parser import extract_module_parameters, parse_building_text
 from src.ai_parser.nlp_parser import ModuleTextParser, BuildingTextParser
-from src.generator.assembler import assemble_building
-from src.generator.procedural.procedural_batch_runner import run_all_generators
-from src.generator.procedural.procedural_batch_json_parser import parse_and_run
+# Генераторы и ассемблер (trimesh, numpy, PIL) импортируются внутри функций
+# при первом использовании или в warm_up() — так старт сервера не ждёт их загрузки
+from src.config.templates import BALCONY_CERAMIC_TEMPLATE, GENERATOR_TEMPLATE, TEMPLATES, thaw
+from src.generator.progress import ProgressHook, stage
+from src.zipper.zipper import dir_zip_entries, iter_zip, write_zip
+from src.metrics import REGISTRY as METRICS
+from src.tracing import TRACES, annotate, bind, current_trace, span, trace
+from api.admission import AdmissionController, Lane, Rejected
+from api.idempotency import IdempotencyConflict, RequestCoalescer, fingerprint
+from api.jobs import JobStore
+from api.static import PrecompressedStaticFiles, precompress_dir
+from api.module_index import ModuleIndex, project
+from api.registry_store import RegistryStore
+from api.storage_gc import AccessLog, OutputGC, RetentionPolicy
 
 # ======================= КОНФИГУРАЦИЯ =======================
 
@@ -60,6 +72,105 @@ async def favicon_ico():
     return Response(content=_FAVICON_PNG, media_type="image/png")
 
 
+# ======================= МЕТРИКИ =======================
+
+HTTP_LATENCY = METRICS.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response starts, per route template",
+    ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = METRICS.gauge("http_requests_in_flight", "HTTP requests being handled")
+
+# Префиксы смонтированной статики — один ярлык на весь каталог
+_STATIC_ROUTE_PREFIXES = ("/modules", "/textures")
+
+
+def _route_label(request: Request) -> str:
+    """Шаблон маршрута (/api/modules/{module_id}), а не сырой путь — иначе метки бесконечны."""
+    route = request.scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    path = request.url.path
+    for prefix in _STATIC_ROUTE_PREFIXES:
+        if path.startswith(prefix + "/"):
+            return prefix + "/*"
+    return "unmatched" if path.startswith("/api/") else "/*"
+
+
+# Заголовок запроса, включающий выдачу трассировки: в ответе будут X-Trace-Id
+# и X-Trace-Url, а сама трассировка останется доступной по этому адресу.
+TRACE_HEADER = "x-debug-trace"
+
+# Не трассируем отладочные эндпоинты, метрики и SSE-потоки (их тело — минуты ожидания)
+_UNTRACED_PREFIXES = ("/api/debug/", "/api/metrics")
+
+
+def _traced_request(request: Request) -> bool:
+    path = request.url.path
+    return (path.startswith("/api/") and not path.startswith(_UNTRACED_PREFIXES)
+            and not path.endswith("/events"))
+
+
+def _trace_requested(request: Request) -> bool:
+    return request.headers.get(TRACE_HEADER, "").strip().lower() not in ("", "0", "false", "off")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    HTTP_IN_FLIGHT.inc()
+    t0 = time.perf_counter()
+    status = 500
+    requested = _trace_requested(request)
+    tracing = (trace(f"{request.method} {request.url.path}", requested=requested,
+                     method=request.method, path=request.url.path)
+               if _traced_request(request) else nullcontext())
+    try:
+        with tracing as tr:
+            response = await call_next(request)
+            status = response.status_code
+            if tr is not None:
+                tr.name = f"{request.method} {_route_label(request)}"
+                tr.annotate(status=status)
+                if requested:
+                    response.headers["X-Trace-Id"] = tr.trace_id
+                    response.headers["X-Trace-Url"] = f"/api/debug/traces/{tr.trace_id}"
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        HTTP_LATENCY.observe(time.perf_counter() - t0, method=request.method,
+                             route=_route_label(request), status=status)
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """Метрики процесса в текстовом формате Prometheus."""
+    return Response(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/debug/traces")
+async def list_traces():
+    """Самые медленные трассировки запросов и задач (сводки, по убыванию длительности)."""
+    return {
+        "capacity": TRACES.capacity,
+        "traces": [t.summary() for t in TRACES.slowest()],
+    }
+
+
+@app.get("/api/debug/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """
+    Трассировка в формате Chrome trace-event JSON: открывается в chrome://tracing
+    или Perfetto.  Доступны самые медленные и запрошенные заголовком X-Debug-Trace.
+    """
+    tr = TRACES.get(trace_id)
+    if tr is None:
+        return JSONResponse({"error": "Трассировка не найдена"}, status_code=404)
+    return JSONResponse(
+        tr.to_chrome(),
+        headers={"Content-Disposition": f'inline; filename="trace-{trace_id}.json"'},
+    )
+
+
 # ======================= ПУТИ =======================
 
 OUTPUT_DIR = PROJECT_ROOT / "output"
@@ -81,91 +192,60 @@ for d in [OUTPUT_DIR, CONFIG_DIR, MODELS_DIR, BUILDINGS_DIR, MODULES_DIR, TEXTUR
     d.mkdir(parents=True, exist_ok=True)
     logger.info(f"✓ Папка создана/проверена: {d}")
 
-# Инициализируем реестры если их нет
-def ensure_registry_exists(registry_file: Path):
-    """Создает пустой реестр если его нет"""
-    if not registry_file.exists():
-        with open(registry_file, 'w', encoding='utf-8') as f:
-            json.dump([], f, ensure_ascii=False, indent=2)
-        logger.info(f"✓ Реестр создан: {registry_file}")
-
-ensure_registry_exists(MODULES_REGISTRY_FILE)
-ensure_registry_exists(HOUSES_REGISTRY_FILE)
-
 
 # ======================= ФУНКЦИИ РЕЕСТРА =======================
 
-# Per-file threading locks prevent concurrent in-process corruption.
-# Advisory file locks (fcntl) cover multi-process scenarios (e.g. uvicorn --workers N).
-_modules_lock = threading.Lock()
-_houses_lock  = threading.Lock()
-
-try:
-    import fcntl as _fcntl
-    def _flock(f, exclusive: bool):
-        op = _fcntl.LOCK_EX if exclusive else _fcntl.LOCK_SH
-        _fcntl.flock(f, op)
-    def _funlock(f):
-        _fcntl.flock(f, _fcntl.LOCK_UN)
-except ImportError:
-    # Windows fallback — threading.Lock alone is still sufficient for a
-    # single uvicorn worker, which is the default dev configuration.
-    def _flock(f, exclusive: bool):  # noqa: F811
-        pass
-    def _funlock(f):                 # noqa: F811
-        pass
-
-
-@contextmanager
-def _registry_read(path: Path, thread_lock: threading.Lock):
-    with thread_lock:
-        with open(path, 'r', encoding='utf-8') as f:
-            _flock(f, exclusive=False)
-            try:
-                yield f
-            finally:
-                _funlock(f)
-
-
-@contextmanager
-def _registry_write(path: Path, thread_lock: threading.Lock):
-    with thread_lock:
-        with open(path, 'w', encoding='utf-8') as f:
-            _flock(f, exclusive=True)
-            try:
-                yield f
-            finally:
-                _funlock(f)
+# Реестры живут в памяти процесса; изменения дописываются в журнал рядом с
+# JSON-файлом и периодически сворачиваются в него (см. api/registry_store.py).
+# Межпроцессная согласованность (uvicorn --workers N) — через fcntl-замок
+# журнала и проверку mtime/размера файлов перед чтением.
+MODULES_REGISTRY = RegistryStore(MODULES_REGISTRY_FILE, "module_id", type_field="module_type")
+HOUSES_REGISTRY = RegistryStore(HOUSES_REGISTRY_FILE, "house_id")
 
 
 def load_modules_registry() -> List[Dict[str, Any]]:
+    """Все модули (записи общие с кэшем — не менять на месте)."""
     try:
-        with _registry_read(MODULES_REGISTRY_FILE, _modules_lock) as f:
-            return json.load(f)
+        return list(MODULES_REGISTRY.all())
     except Exception as e:
         logger.error(f"Ошибка загрузки реестра модулей: {e}")
         return []
 
 def save_modules_registry(modules: List[Dict[str, Any]]):
     try:
-        with _registry_write(MODULES_REGISTRY_FILE, _modules_lock) as f:
-            json.dump(modules, f, ensure_ascii=False, indent=2)
+        MODULES_REGISTRY.replace(modules)
         logger.info(f"✓ Реестр сохранен ({len(modules)} модулей)")
     except Exception as e:
         logger.error(f"Ошибка сохранения реестра: {e}")
 
+def append_modules_registry(records: List[Dict[str, Any]]):
+    """Добавляет записи в реестр модулей одной операцией журнала."""
+    if not records:
+        return
+    try:
+        MODULES_REGISTRY.put(*records)
+        logger.info(f"✓ Реестр сохранен (+{len(records)}, всего {len(MODULES_REGISTRY)} модулей)")
+    except Exception as e:
+        logger.error(f"Ошибка сохранения реестра: {e}")
+
+def update_modules_registry(mutate):
+    """mutate(копии записей) → новые записи; чтение и запись под одним замком."""
+    MODULES_REGISTRY.update(mutate)
+
+def update_houses_registry(mutate):
+    HOUSES_REGISTRY.update(mutate)
+
 def load_houses_registry() -> List[Dict[str, Any]]:
+    """Все дома (записи общие с кэшем — не менять на месте)."""
     try:
-        with _registry_read(HOUSES_REGISTRY_FILE, _houses_lock) as f:
-            return json.load(f)
+        return list(HOUSES_REGISTRY.all())
     except Exception as e:
         logger.error(f"Ошибка загрузки реестра домов: {e}")
         return []
 
 def save_houses_registry(houses: List[Dict[str, Any]]):
     try:
-        with _registry_write(HOUSES_REGISTRY_FILE, _houses_lock) as f:
-            json.dump(houses, f, ensure_ascii=False, indent=2)
+        HOUSES_REGISTRY.replace(houses)
         logger.info(f"✓ Реестр домов сохранен ({len(houses)} домов)")
     except Exception as e:
         logger.error(f"Ошибка сохранения реестра домов: {e}")
@@ -173,21 +253,42 @@ def save_houses_registry(houses: List[Dict[str, Any]]):
 
 # ======================= ФУНКЦИИ ГЕНЕРАЦИИ МОДУЛЕЙ =======================
 
-def generate_module_obj(module_type: str, params: Dict[str, Any], module_id: str) -> Optional[Path]:
-    """Генерирует модуль с процедурными текстурами через procedural_batch_runner"""
+
+GENERATOR_CONFIG_FILE = GENERATOR_TEMPLATE
+BALCONY_CERAMIC_CONFIG_FILE = BALCONY_CERAMIC_TEMPLATE
+
+
+def load_generator_templates() -> Dict[str, Optional[Mapping[str, Any]]]:
+    """
+    JSON-шаблоны генераторов из TEMPLATES: разобраны, проверены и заморожены
+    один раз, перечитываются только при изменении файла (mtime).
+    Шаблон балкона необязателен: без него падают только балконы.
+    """
+    return {
+        "base": TEMPLATES.get(GENERATOR_CONFIG_FILE, "Config"),
+        "balcony": TEMPLATES.get_optional(BALCONY_CERAMIC_CONFIG_FILE, "Ceramic balcony config"),
+    }
+
+
+def generate_module_obj(module_type: str,
+                        params: Dict[str, Any],
+                        module_id: str,
+                        progress: Optional[ProgressHook] = None,
+                        templates: Optional[Dict[str, Any]] = None) -> Optional[Path]:
+    """
+    Генерирует модуль с процедурными текстурами через procedural_batch_runner.
+    templates — результат load_generator_templates() (иначе берётся из TEMPLATES).
+    """
     try:
         output_dir = MODULES_DIR / module_type / module_id
         output_dir.mkdir(parents=True, exist_ok=True)
 
         logger.info(f"🔨 Генерация {module_type}_{module_id}...")
 
-        # Загружаем JSON конфиг
-        config_file = PROJECT_ROOT / "scripts" / "balcony_examples" / "batch_generators_config.json"
-        if not config_file.exists():
-            raise FileNotFoundError(f"Config not found: {config_file}")
-
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        # Изменяемая копия замороженного шаблона — секции ниже правятся на месте
+        with span("template", module_type=module_type):
+            templates = templates or load_generator_templates()
+            config = thaw(templates["base"])
 
         # Обновляем конфиг в зависимости от типа модуля
         if module_type == "wall":
@@ -294,18 +395,14 @@ def generate_module_obj(module_type: str, params: Dict[str, Any], module_id: str
                     config[key]["enabled"] = False
 
         elif module_type == "balcony":
-            ceramic_file = (
-                PROJECT_ROOT / "scripts" / "balcony_examples" / "batch_balcony_ceramic_tile.json"
-            )
-            if not ceramic_file.exists():
-                raise FileNotFoundError(f"Ceramic balcony config not found: {ceramic_file}")
-            with open(ceramic_file, "r", encoding="utf-8") as bf:
-                ceramic_cfg = json.load(bf)
+            ceramic_cfg = templates.get("balcony")
+            if ceramic_cfg is None:
+                ceramic_cfg = TEMPLATES.get(BALCONY_CERAMIC_CONFIG_FILE, "Ceramic balcony config")
 
-            tpl = copy.deepcopy(ceramic_cfg.get("balcony") or {})
+            tpl = thaw(ceramic_cfg.get("balcony") or {})
             for key in ("entrance", "entrance_textured", "window", "wall", "wall_window"):
                 if key in ceramic_cfg:
-                    config[key] = copy.deepcopy(ceramic_cfg[key])
+                    config[key] = thaw(ceramic_cfg[key])
 
             tpl["enabled"] = True
             tpl["out_dir"] = str(output_dir)
@@ -403,7 +500,8 @@ def generate_module_obj(module_type: str, params: Dict[str, Any], module_id: str
             f"📋 Config для {module_type}: {json.dumps({k: v for k, v in config.items() if isinstance(v, dict) and v.get('enabled')}, indent=2)}")
 
         # Вызываем batch генератор
-        results = run_all_generators(config, default_out_root=output_dir)
+        from src.generator.procedural.procedural_batch_runner import run_all_generators
+        results = run_all_generators(config, default_out_root=output_dir, progress=progress)
 
         # Возвращаем первый найденный результат
         if results:
@@ -491,27 +589,74 @@ def _inject_door_material(obj_path: Path, color_hex: Optional[str]) -> None:
     except Exception as exc:
         logger.warning(f"_inject_door_material failed: {exc}")
 
+# ======================= ПРЕВЬЮ (THUMBNAILS) =======================
+
+# Превью для карточек каталога рендерятся при экспорте (CPU, без дисплея —
+# src/generator/thumbnail.py) и лежат рядом с OBJ; в ZIP-архивы не входят.
+THUMBNAIL_FILE = "thumbnail.png"
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "256"))
+# Модули, которые генератор экспортирует в Z-up (остальные — Y-up)
+_THUMBNAIL_Z_UP = {"wall_window"}
+
+
+def render_obj_thumbnail(obj_path: Path, module_type: str,
+                         progress: Optional[ProgressHook] = None) -> Optional[Path]:
+    """Рендерит thumbnail.png рядом с OBJ; ошибка превью не роняет экспорт."""
+    try:
+        from src.generator.thumbnail import render_thumbnail
+        with stage(progress, "thumbnail", module_type=module_type):
+            return render_thumbnail(obj_path, obj_path.with_name(THUMBNAIL_FILE),
+                                    size=THUMBNAIL_SIZE, z_up=module_type in _THUMBNAIL_Z_UP)
+    except Exception as e:
+        logger.warning(f"⚠️ Превью не создано для {obj_path}: {e}")
+        return None
+
+
+async def _thumbnail_response(obj_path: Path, module_type: str):
+    """Отдаёт превью; для старых модулей без превью рендерит его один раз."""
+    thumb = obj_path.with_name(THUMBNAIL_FILE)
+    if not thumb.exists():
+        if not obj_path.exists():
+            return JSONResponse({"error": "Файлы модели не найдены"}, status_code=404)
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, bind(render_obj_thumbnail), obj_path, module_type) is None:
+            return JSONResponse({"error": "Не удалось создать превью"}, status_code=500)
+    return FileResponse(thumb, media_type="image/png",
+                        headers={"Cache-Control": "public, max-age=3600"})
+
+
+def _module_zip_entries(module_type: str,
+                        module_id: str,
+                        config: Dict[str, Any],
+                        module_dir: Optional[Path] = None) -> List:
+    """Содержимое архива модуля: OBJ, MTL и текстуры из папки модуля + config.json."""
+    module_dir = module_dir or MODULES_DIR / module_type / module_id
+    entries = dir_zip_entries(module_dir, exclude=(THUMBNAIL_FILE,))
+    entries.append(("config.json", json.dumps(config, indent=2, ensure_ascii=False).encode("utf-8")))
+    return entries
+
+
 def create_module_zip(module_id: str, module_type: str, params: Dict[str, Any], obj_path: Optional[Path]) -> Optional[Path]:
     """
-    Создает ZIP архив модуля
+    Создает ZIP архив модуля (OBJ + MTL + текстуры + config.json).
+    Картинки кладутся без сжатия, deflate — только для OBJ/MTL/JSON.
     """
     try:
         zip_filename = f"{module_type}_{module_id}.zip"
         zip_path = MODULES_DIR / zip_filename
 
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as z:
-            # Добавляем OBJ файл если существует
-            if obj_path and obj_path.exists():
-                z.write(obj_path, arcname=obj_path.name)
-
-            # Добавляем конфиг параметров
-            config = {
-                "module_id": module_id,
-                "module_type": module_type,
-                "params": params,
-                "created_at": datetime.now().isoformat()
-            }
-            z.writestr("config.json", json.dumps(config, indent=2, ensure_ascii=False))
+        # Добавляем конфиг параметров
+        config = {
+            "module_id": module_id,
+            "module_type": module_type,
+            "params": params,
+            "created_at": datetime.now().isoformat()
+        }
+        module_dir = obj_path.parent if obj_path and obj_path.exists() else None
+        if module_dir is not None:
+            render_obj_thumbnail(obj_path, module_type)
+        entries = _module_zip_entries(module_type, module_id, config, module_dir)
+        write_zip(entries, zip_path)
 
         logger.info(f"✓ ZIP модуля создан: {zip_path}")
         return zip_path
@@ -521,6 +666,370 @@ def create_module_zip(module_id: str, module_type: str, params: Dict[str, Any],
         return None
 
 
+def _zip_download(entries: List, filename: str) -> StreamingResponse:
+    """Отдаёт архив по мере сборки — без буфера на весь ZIP."""
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# ======================= ПРОГРЕВ КЭША МОДУЛЕЙ =======================
+
+# Сколько последних модулей (по реестру) загрузить в кэш мешей при старте
+MODULE_CACHE_WARM_COUNT = 20
+
+_ASSEMBLER_MODULE_TYPES = ("wall", "window", "door", "balcony", "wall_window")
+
+
+def _recent_module_obj_paths(limit: int) -> List[Path]:
+    """OBJ-файлы последних созданных модулей тех типов, которые использует ассемблер."""
+    paths: List[Path] = []
+    for module in reversed(load_modules_registry()):
+        if len(paths) >= limit:
+            break
+        mtype = module.get("module_type")
+        if mtype not in _ASSEMBLER_MODULE_TYPES:
+            continue
+        obj_path = MODULES_DIR / mtype / module.get("module_id", "") / f"{mtype}.obj"
+        if obj_path.is_file():
+            paths.append(obj_path)
+    return paths
+
+
+# Режим прогрева при старте (SERVER_WARMUP):
+#   background — в фоне, сервер принимает запросы сразу (по умолчанию)
+#   blocking   — старт ждёт окончания прогрева
+#   off        — без прогрева, всё загружается при первом запросе
+SERVER_WARMUP = os.environ.get("SERVER_WARMUP", "background").strip().lower()
+
+WARMUP_TEXTURES_DIR = PROJECT_ROOT / "data" / "textures"
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Явный прогрев: импорт генераторов и ассемблера, чтение шаблонов,
+    процедурные текстуры окон (шумовые основы пишутся на диск один раз)
+    и кэш мешей последних модулей.  Возвращает длительность шагов в секундах.
+    """
+    timings: Dict[str, float] = {}
+
+    def step(name: str, fn) -> None:
+        t0 = time.perf_counter()
+        try:
+            with stage(None, "warmup", section=name):
+                fn()
+        except Exception as e:
+            logger.warning(f"Прогрев '{name}' не удался: {e}")
+        timings[name] = round(time.perf_counter() - t0, 4)
+
+    def imports() -> None:
+        import src.generator.assembler  # noqa: F401
+        import src.generator.procedural.procedural_batch_runner  # noqa: F401
+
+    def textures() -> None:
+        from src.generator.procedural.texturing import ensure_window_textures
+        ensure_window_textures(WARMUP_TEXTURES_DIR)
+
+    def module_cache() -> None:
+        if MODULE_CACHE_WARM_COUNT > 0:
+            paths = _recent_module_obj_paths(MODULE_CACHE_WARM_COUNT)
+            from src.generator.assembler import warm_module_cache
+            warm_module_cache(paths)
+
+    step("imports", imports)
+    step("templates", load_generator_templates)
+    step("textures", textures)
+    step("module_cache", module_cache)
+    logger.info(f"🔥 Прогрев завершён: {timings}")
+    return timings
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    """Запускает warm_up() согласно SERVER_WARMUP."""
+    if SERVER_WARMUP in ("off", "0", "false", "no"):
+        return
+    future = asyncio.get_event_loop().run_in_executor(None, warm_up)
+    if SERVER_WARMUP == "blocking":
+        await future
+
+
+@app.on_event("startup")
+async def precompress_frontend():
+    """Готовит .gz/.br копии JS/CSS/HTML фронтенда (только устаревшие)."""
+    if FRONTEND_DIR.exists():
+        await asyncio.get_event_loop().run_in_executor(None, precompress_dir, FRONTEND_DIR)
+
+
+# ======================= УБОРКА СГЕНЕРИРОВАННЫХ ФАЙЛОВ (GC) =======================
+
+# Последние скачивания модулей и домов — для вытеснения давно не нужных (LRU)
+ACCESS_LOG = AccessLog(CONFIG_DIR / "access_log.json")
+
+STORAGE_GC = OutputGC(
+    MODULES_DIR,
+    OUTPUT_DIR / ".trash",
+    load_modules=load_modules_registry,
+    update_modules=update_modules_registry,
+    load_houses=load_houses_registry,
+    update_houses=update_houses_registry,
+    access_log=ACCESS_LOG,
+    policy=RetentionPolicy.from_env(),
+)
+
+
+async def _storage_gc_loop():
+    interval = STORAGE_GC.policy.interval_seconds
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, STORAGE_GC.run)
+        except Exception as e:
+            logger.error(f"Ошибка GC: {e}", exc_info=True)
+
+
+@app.on_event("startup")
+async def start_storage_gc():
+    """Периодическая уборка output/modules (GC_INTERVAL секунд, 0 — выключена)."""
+    if STORAGE_GC.policy.interval_seconds > 0:
+        app.state.storage_gc_task = asyncio.get_running_loop().create_task(_storage_gc_loop())
+
+
+@app.get("/api/storage/gc")
+async def storage_gc_status():
+    """Политика хранения, число проходов, всего освобождено байт и отчёт последнего прохода."""
+    return {"status": "success", **STORAGE_GC.status()}
+
+
+@app.post("/api/storage/gc")
+async def run_storage_gc(dry_run: bool = False):
+    """
+    Запустить проход GC сейчас.  ?dry_run=true — только показать, что будет удалено.
+
+    Ответ: reclaimed_bytes, deleted (orphan_dirs, orphan_zips, records, modules,
+    houses), evicted_module_ids, evicted_house_ids, duration.
+    """
+    try:
+        report = await asyncio.get_running_loop().run_in_executor(None, STORAGE_GC.run, dry_run)
+        return {"status": "success", **report}
+    except Exception as e:
+        logger.error(f"Ошибка GC: {e}", exc_info=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+# ======================= ФОНОВЫЕ ЗАДАЧИ И ПРОГРЕСС (SSE) =======================
+
+class ApiError(Exception):
+    """Ошибка запроса с HTTP-статусом (400/404…), а не сбой генерации."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+JOBS = JobStore()
+
+# ======================= ДОПУСК ГЕНЕРАЦИЙ (BACKPRESSURE) =======================
+
+# Общий бюджет одновременно выполняемых генераций (по умолчанию — число ядер)
+GENERATION_SLOTS = int(os.environ.get("GENERATION_SLOTS", "0") or 0) or max(1, os.cpu_count() or 1)
+
+# Полосы: интерактивные модули и дома обслуживаются раньше пакетной генерации;
+# пакет занимает до половины бюджета, чтобы интерактив не голодал.
+ADMISSION = AdmissionController(GENERATION_SLOTS, [
+    Lane("module", limit=GENERATION_SLOTS, max_queue=32, timeout=30.0, priority=0),
+    Lane("house", limit=max(1, GENERATION_SLOTS // 2), max_queue=8, timeout=120.0, priority=0),
+    Lane("batch", limit=1, max_queue=4, timeout=300.0, priority=1,
+         weight=max(1, GENERATION_SLOTS // 2)),
+])
+
+METRICS.gauge("admission_active", "Generation requests holding a slot", ("lane",),
+              fn=ADMISSION.active)
+METRICS.gauge("admission_queued", "Generation requests waiting for a slot", ("lane",),
+              fn=ADMISSION.queued)
+
+
+def _rejected_response(e: Rejected) -> JSONResponse:
+    return JSONResponse(
+        {"error": str(e), "retry_after": e.retry_after},
+        status_code=e.status_code,
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+async def _run_admitted(lane: str, fn, *args):
+    """Синхронный ответ: ждёт слот полосы и выполняет fn в пуле потоков, не блокируя loop."""
+    ticket = ADMISSION.enter(lane)
+    try:
+        await ticket.wait()
+        return await asyncio.get_running_loop().run_in_executor(None, bind(fn), *args)
+    finally:
+        ticket.release()
+
+
+METRICS.gauge("generation_jobs", "Background generation jobs by kind and status",
+              ("kind", "status"), fn=JOBS.counts)
+
+
+def _run_job(job, fn, payload: Dict[str, Any]) -> None:
+    """Выполняет генерацию в рабочем потоке, отправляя стадии в задачу."""
+    try:
+        job.finish(fn(payload, progress=job.hook))
+    except ApiError as e:
+        job.fail(str(e), e.status_code)
+    except Exception as e:
+        logger.error(f"Ошибка задачи {job.kind} {job.job_id}: {e}", exc_info=True)
+        job.fail(str(e))
+
+
+def _launch_job(kind: str, fn, payload: Dict[str, Any], lane: str):
+    """
+    Запускает fn(payload, progress=...) в фоне и возвращает задачу.
+    Задача встаёт в полосу допуска lane; при полной очереди — Rejected (429).
+    """
+    ticket = ADMISSION.enter(lane)
+    job = JOBS.create(kind)
+    annotate(job_id=job.job_id)
+    task = asyncio.get_running_loop().create_task(_run_admitted_job(job, ticket, fn, payload))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    logger.info(f"▶️ Задача {kind} запущена: {job.job_id}")
+    return job
+
+
+def _accepted_response(job, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        {
+            "status": "accepted",
+            "job_id": job.job_id,
+            "status_url": f"/api/jobs/{job.job_id}",
+            "events_url": f"/api/jobs/{job.job_id}/events",
+        },
+        status_code=202,
+        headers=headers,
+    )
+
+
+def _start_job(kind: str, fn, payload: Dict[str, Any], lane: str) -> JSONResponse:
+    """Запускает задачу и сразу отвечает 202 с job_id."""
+    return _accepted_response(_launch_job(kind, fn, payload, lane))
+
+
+def _job_response(job, headers: Dict[str, str]) -> JSONResponse:
+    """Итог завершённой задачи в виде обычного (синхронного) ответа."""
+    if job.status == "done":
+        return JSONResponse(job.result, headers=headers)
+    if job.retry_after is not None:
+        headers = {**headers, "Retry-After": str(job.retry_after)}
+    return JSONResponse({"error": job.error}, status_code=job.status_code, headers=headers)
+
+
+COALESCER = RequestCoalescer()
+
+
+async def _generate_idempotent(request: Request,
+                               kind: str,
+                               fn,
+                               payload: Dict[str, Any],
+                               lane: str,
+                               normalized: Dict[str, Any]) -> JSONResponse:
+    """
+    Запуск генерации с Idempotency-Key и объединением одинаковых запросов.
+
+    normalized — параметры, определяющие результат; запросы с тем же отпечатком,
+    пока генерация идёт, и повторы с тем же ключом получают ту же задачу
+    (заголовок Idempotent-Replayed: true).  С "async" ответ — 202 на задачу,
+    иначе ждём её завершения.
+    """
+    key = request.headers.get("idempotency-key")
+    fp = fingerprint({"kind": kind, "params": normalized})
+    job = COALESCER.find(kind, key, fp)
+    headers: Dict[str, str] = {}
+    if job is None:
+        job = _launch_job(kind, fn, payload, lane)
+        COALESCER.register(kind, key, fp, job)
+    else:
+        headers["Idempotent-Replayed"] = "true"
+        logger.info(f"↩️ Запрос {kind} присоединён к задаче {job.job_id}")
+
+    if payload.get("async"):
+        return _accepted_response(job, headers)
+    await job.wait()
+    return _job_response(job, headers)
+
+
+def _job_tracing(job, payload: Dict[str, Any]):
+    """
+    Синхронная задача пишет стадии в трассировку запроса, который её ждёт;
+    фоновая ("async") переживает запрос и получает собственную трассировку.
+    """
+    parent = current_trace()
+    if parent is not None and not payload.get("async"):
+        return nullcontext(parent)
+    return trace(f"job:{job.kind}",
+                 requested=parent is not None and parent.requested,
+                 job_id=job.job_id,
+                 parent_trace_id=parent.trace_id if parent is not None else None)
+
+
+async def _run_admitted_job(job, ticket, fn, payload: Dict[str, Any]) -> None:
+    """Ждёт слот полосы (стадия queued), затем выполняет задачу в пуле потоков."""
+    try:
+        with _job_tracing(job, payload) as tr:
+            if tr is not None:
+                job.trace_id = tr.trace_id
+            with stage(job.hook, "queued", lane=ticket.lane.name):
+                await ticket.wait()
+            await asyncio.get_running_loop().run_in_executor(None, bind(_run_job), job, fn, payload)
+    except Rejected as e:
+        job.fail(str(e), e.status_code, retry_after=e.retry_after)
+    finally:
+        ticket.release()
+
+
+# Ссылки на корутины задач, чтобы их не собрал GC до завершения
+_job_tasks: set = set()
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Статус фоновой задачи, завершённые стадии с длительностями и результат."""
+    job = JOBS.get(job_id)
+    if not job:
+        return JSONResponse({"error": "Задача не найдена"}, status_code=404)
+    return job.to_dict()
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    SSE-поток стадий задачи:
+
+        event: stage   data: {"stage": "facade", "status": "end", "facade": "front",
+                              "duration": 0.41, "elapsed": 2.73}
+        event: done    data: <ответ эндпоинта генерации>
+        event: error   data: {"error": "...", "status_code": 500}
+
+    Уже произошедшие события отдаются сразу, поэтому подписаться можно в любой
+    момент; Last-Event-ID продолжает поток после разрыва.
+    """
+    job = JOBS.get(job_id)
+    if not job:
+        return JSONResponse({"error": "Задача не найдена"}, status_code=404)
+    try:
+        last_event_id = int(request.headers.get("last-event-id", -1))
+    except ValueError:
+        last_event_id = -1
+    return StreamingResponse(
+        job.stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ======================= API ENDPOINTS =======================
 
 @app.get("/api/health")
@@ -529,8 +1038,9 @@ async def health_check():
     return {
         "status": "ok",
         "timestamp": datetime.now().isoformat(),
-        "modules_count": len(load_modules_registry()),
-        "houses_count": len(load_houses_registry())
+        "modules_count": len(MODULES_REGISTRY),
+        "houses_count": len(HOUSES_REGISTRY),
+        "admission": ADMISSION.snapshot(),
     }
 
 
@@ -598,7 +1108,8 @@ async def generate_module(request: Request):
     Входные данные:
     {
         "text": "стена 3м высота, 2м ширина, бетон",
-        "module_type": "wall"
+        "module_type": "wall",
+        "async": false
     }
 
     Выходные данные:
@@ -610,123 +1121,373 @@ async def generate_module(request: Request):
         "dimensions": {"width": 2.0, "height": 3.0},
         "zip_url": "/files/wall_uuid.zip"
     }
+
+    С "async": true сразу возвращается 202 с job_id; стадии (parsing,
+    generator, zipping, registry) идут в /api/jobs/{job_id}/events, а ответ
+    выше приходит событием done.
+
+    Под нагрузкой запрос ждёт слот в полосе "module"; при полной очереди —
+    429, если слот не освободился вовремя — 503 (оба с Retry-After).
+
+    Одинаковые (после разбора) запросы, пока генерация идёт, получают один
+    результат; повтор с тем же заголовком Idempotency-Key отдаёт готовый
+    модуль без новой генерации (Idempotent-Replayed: true).
     """
     try:
         payload = await request.json()
-        text = payload.get("text", "").strip()
-        module_type = payload.get("module_type")
+        return await _generate_idempotent(request, "module", _generate_module, payload,
+                                          lane="module", normalized=_module_identity(payload))
+
+    except Rejected as e:
+        return _rejected_response(e)
+    except IdempotencyConflict as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+    except ApiError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Ошибка генерации модуля: {e}", exc_info=True)
+        return JSONResponse(
+            {"error": str(e)},
+            status_code=500
+        )
 
-        if not text:
-            return JSONResponse(
-                {"error": "Пустой текст"},
-                status_code=400
-            )
 
-        logger.info(f"🔨 Генерация модуля: '{text}'")
+def _request_identity(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Поля запроса, определяющие результат (режим ответа не влияет)."""
+    return {k: v for k, v in payload.items() if k != "async"}
 
-        # === 1️⃣ Парсинг ===
-        parser = ModuleTextParser()
-        parse_result = parser.parse(text)
 
-        module_type = parse_result.module_type.value
-        params = parse_result.params
+def _module_identity(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Тип и параметры после разбора: разные формулировки одного модуля совпадают."""
+    try:
+        parse_result, params = _parse_module_spec(payload, ModuleTextParser())
+    except Exception:
+        return _request_identity(payload)
+    return {"module_type": parse_result.module_type.value, "params": params}
+
+
+def _parse_module_spec(payload: Dict[str, Any], parser: ModuleTextParser):
+    """Текст (+ цвет из палитры) → (ModuleParams, params). Без генерации."""
+    text = (payload.get("text") or "").strip()
+    if not text:
+        raise ApiError("Пустой текст")
+
+    parse_result = parser.parse(text)
+    params = parse_result.params
+
+    # Color from the UI color-picker overrides any color the NLP parser extracted
+    # from the text description.  Normalise both paths to #RRGGBB before storing.
+    picker_color = _normalise_hex(payload.get("color"))
+    if picker_color:
+        params["color"] = picker_color
+    elif "color" in params:
+        params["color"] = _normalise_hex(params["color"]) or params["color"]
+    return parse_result, params
+
+
+def _build_module(module_type: str,
+                  module_name: str,
+                  params: Dict[str, Any],
+                  progress: Optional[ProgressHook] = None,
+                  templates: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Генерирует OBJ и ZIP модуля; возвращает запись для реестра (не сохраняя её)."""
+    # === 2️⃣ Генерация OBJ ===
+    module_id = str(uuid.uuid4())[:8]
+    obj_path = generate_module_obj(module_type, params, module_id,
+                                   progress=progress, templates=templates)
+    if obj_path is None:
+        raise ApiError(f"Генератор не вернул OBJ для {module_type}", status_code=500)
+
+    # === 3️⃣ Упаковка в ZIP ===
+    with stage(progress, "zipping", module_type=module_type):
+        zip_path = create_module_zip(module_id, module_type, params, obj_path)
 
-        # Color from the UI color-picker overrides any color the NLP parser extracted
-        # from the text description.  Normalise both paths to #RRGGBB before storing.
-        picker_color = _normalise_hex(payload.get("color"))
-        if picker_color:
-            params["color"] = picker_color
-        elif "color" in params:
-            params["color"] = _normalise_hex(params["color"]) or params["color"]
+    if not zip_path:
+        raise ApiError("Ошибка создания ZIP", status_code=500)
 
-        # === 2️⃣ Генерация OBJ ===
-        module_id = str(uuid.uuid4())[:8]
-        obj_path = generate_module_obj(module_type, params, module_id)
+    # .gz/.br копии OBJ/MTL для /modules (после ZIP — в архив они не нужны)
+    with stage(progress, "precompress", module_type=module_type):
+        precompress_dir(obj_path.parent)
 
-        # === 3️⃣ Упаковка в ZIP ===
-        zip_path = create_module_zip(module_id, module_type, params, obj_path)
+    # === 4️⃣ СОХРАНЯЕМ РАЗМЕРЫ МОДУЛЯ ===
+    return {
+        "module_id": module_id,
+        "module_type": module_type,
+        "module_name": module_name,
+        "params": params,
+        "zip_file": zip_path.name,
+        "created_at": datetime.now().isoformat(),
+        "dimensions": {
+            "width": params.get("width", 4.0),
+            "height": params.get("height", 3.0)
+        }
+    }
 
-        if not zip_path:
-            return JSONResponse(
-                {"error": "Ошибка создания ZIP"},
-                status_code=500
-            )
 
-        # === 4️⃣ СОХРАНЯЕМ РАЗМЕРЫ МОДУЛЯ ===
-        module_width = params.get("width", 4.0)
-        module_height = params.get("height", 3.0)
+def _module_response(record: Dict[str, Any], confidence: float) -> Dict[str, Any]:
+    module_id = record["module_id"]
+    module_type = record["module_type"]
+    return {
+        "status": "success",
+        "module_id": module_id,
+        "module_type": module_type,
+        "module_name": record["module_name"],
+        "params": record["params"],
+        "dimensions": record["dimensions"],
+        "obj_url": f"/modules/{module_type}/{module_id}/{module_type}.obj",
+        "zip_url": f"/api/modules/{module_id}/download",
+        "confidence": confidence
+    }
 
-        # === 5️⃣ Сохранение в реестр ===
-        module_record = {
-            "module_id": module_id,
-            "module_type": module_type,
-            "module_name": parse_result.module_name,
-            "params": params,
-            "zip_file": zip_path.name,
-            "created_at": datetime.now().isoformat(),
-            "dimensions": {  # ← ДОБАВЛЕНО
-                "width": module_width,
-                "height": module_height
-            }
-        }
 
-        modules = load_modules_registry()
-        modules.append(module_record)
-        save_modules_registry(modules)
+def _generate_module(payload: Dict[str, Any],
+                     progress: Optional[ProgressHook] = None) -> Dict[str, Any]:
+    """Тело /api/generate-module; вызывается напрямую или из фоновой задачи."""
+    logger.info(f"🔨 Генерация модуля: '{(payload.get('text') or '').strip()}'")
 
-        logger.info(f"✓ Модуль сохранен: {module_id}")
-        logger.info(f"✓ Размеры: {module_width}м (ширина) × {module_height}м (высота)")
+    # === 1️⃣ Парсинг ===
+    with stage(progress, "parsing"):
+        parse_result, params = _parse_module_spec(payload, ModuleTextParser())
 
-        return {
-            "status": "success",
-            "module_id": module_id,
-            "module_type": module_type,
-            "module_name": parse_result.module_name,
-            "params": params,
-            "dimensions": {  # ← ВОЗВРАЩАЕМ
-                "width": module_width,
-                "height": module_height
-            },
-            "obj_url": f"/modules/{module_type}/{module_id}/{module_type}.obj",
-            "zip_url": f"/api/modules/{module_id}/download",
-            "confidence": parse_result.confidence
-        }
+    record = _build_module(parse_result.module_type.value, parse_result.module_name,
+                           params, progress=progress)
+
+    # === 5️⃣ Сохранение в реестр ===
+    with stage(progress, "registry"):
+        append_modules_registry([record])
+
+    logger.info(f"✓ Модуль сохранен: {record['module_id']}")
+    logger.info(
+        f"✓ Размеры: {record['dimensions']['width']}м (ширина) × "
+        f"{record['dimensions']['height']}м (высота)"
+    )
+    return _module_response(record, parse_result.confidence)
+
+
+# Максимум модулей в одном пакетном запросе и размер пула генерации.
+# Пул — потоки, а не процессы: сборка упирается в numpy/PIL/zlib, которые
+# отпускают GIL, а прогресс (SSE), трассировка и шаблоны остаются общими
+# без сериализации. Генераторы не держат изменяемого глобального состояния
+# (тайл атласа балкона передаётся в build_balcony_meshes явно).
+BATCH_MAX_MODULES = 100
+BATCH_MODULE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+BATCH_QUEUE_DEPTH = METRICS.gauge(
+    "module_batch_queue_depth", "Batch module builds waiting for a pool worker",
+)
+
+
+@app.post("/api/generate-modules/batch")
+async def generate_modules_batch(request: Request):
+    """
+    🔹 ВКЛАДКА 1: ПАКЕТНАЯ ГЕНЕРАЦИЯ МОДУЛЕЙ (наполнение каталога)
+
+    Входные данные:
+    {
+        "modules": [
+            {"text": "стена 3м высота, 2м ширина", "color": "#C0C0C0"},
+            {"text": "окно 1.2 на 1.4"},
+            ...
+        ],
+        "async": false
+    }
 
+    Одинаковые спецификации (тот же тип и параметры после разбора) генерируются
+    один раз.  Шаблоны генераторов читаются один раз на пакет, модули строятся
+    параллельно в пуле потоков, реестр пишется одной транзакцией.
+
+    Выходные данные:
+    {
+        "status": "success" | "partial" | "error",
+        "generated": 2, "deduplicated": 1, "failed": 0,
+        "results": [
+            {"index": 0, "status": "success", "module_id": "...", ...},
+            {"index": 1, "status": "error", "error": "..."},
+            {"index": 2, "status": "success", "duplicate_of": 0, ...}
+        ]
+    }
+    """
+    try:
+        payload = await request.json()
+        if payload.get("async"):
+            return _start_job("module_batch", _generate_modules_batch, payload, lane="batch")
+        return await _run_admitted("batch", _generate_modules_batch, payload)
+
+    except Rejected as e:
+        return _rejected_response(e)
+    except ApiError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
     except Exception as e:
-        logger.error(f"Ошибка генерации модуля: {e}", exc_info=True)
-        return JSONResponse(
-            {"error": str(e)},
-            status_code=500
-        )
+        logger.error(f"Ошибка пакетной генерации модулей: {e}", exc_info=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+def _generate_modules_batch(payload: Dict[str, Any],
+                            progress: Optional[ProgressHook] = None) -> Dict[str, Any]:
+    specs = payload.get("modules")
+    if not isinstance(specs, list) or not specs:
+        raise ApiError("Ожидается непустой список modules")
+    if len(specs) > BATCH_MAX_MODULES:
+        raise ApiError(f"Слишком много модулей в пакете (максимум {BATCH_MAX_MODULES})")
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(specs)
+
+    # === 1️⃣ Разбор и дедупликация (дёшево, в одном потоке) ===
+    parser = ModuleTextParser()
+    unique: Dict[str, int] = {}           # ключ спецификации → индекс первого вхождения
+    parsed: Dict[int, Any] = {}           # индекс первого вхождения → (ModuleParams, params)
+    duplicates: Dict[int, int] = {}       # индекс дубликата → индекс оригинала
+    with stage(progress, "parsing", count=len(specs)):
+        for i, spec in enumerate(specs):
+            try:
+                if isinstance(spec, str):
+                    spec = {"text": spec}
+                if not isinstance(spec, dict):
+                    raise ApiError("Спецификация модуля должна быть объектом или строкой")
+                parse_result, params = _parse_module_spec(spec, parser)
+            except Exception as e:
+                results[i] = {"index": i, "status": "error", "error": str(e)}
+                continue
+            key = json.dumps([parse_result.module_type.value, params],
+                             sort_keys=True, ensure_ascii=False, default=str)
+            if key in unique:
+                duplicates[i] = unique[key]
+            else:
+                unique[key] = i
+                parsed[i] = (parse_result, params)
+
+    # === 2️⃣ Генерация в пуле (шаблоны читаются один раз) ===
+    templates = load_generator_templates() if parsed else None
+
+    def build(i: int) -> Dict[str, Any]:
+        BATCH_QUEUE_DEPTH.dec()
+        parse_result, params = parsed[i]
+        with stage(progress, "module", index=i, module_type=parse_result.module_type.value):
+            return _build_module(parse_result.module_type.value, parse_result.module_name,
+                                 params, progress=progress, templates=templates)
+
+    records: Dict[int, Dict[str, Any]] = {}
+    BATCH_QUEUE_DEPTH.inc(len(parsed))
+    with ThreadPoolExecutor(max_workers=BATCH_MODULE_WORKERS,
+                            thread_name_prefix="module-batch") as pool:
+        futures = {i: pool.submit(bind(build), i) for i in parsed}
+        for i, future in futures.items():
+            try:
+                records[i] = future.result()
+            except Exception as e:
+                logger.error(f"Ошибка генерации модуля #{i}: {e}")
+                results[i] = {"index": i, "status": "error", "error": str(e)}
+
+    # === 3️⃣ Один проход по реестру на весь пакет ===
+    with stage(progress, "registry", count=len(records)):
+        append_modules_registry([records[i] for i in sorted(records)])
+
+    for i, record in records.items():
+        results[i] = {"index": i, **_module_response(record, parsed[i][0].confidence)}
+    for i, original in duplicates.items():
+        results[i] = {**results[original], "index": i, "duplicate_of": original}
+
+    failed = sum(1 for r in results if r["status"] != "success")
+    logger.info(
+        f"✓ Пакет модулей: {len(records)} сгенерировано, "
+        f"{len(duplicates)} дубликатов, {failed} ошибок"
+    )
+    return {
+        "status": "success" if not failed else ("error" if failed == len(results) else "partial"),
+        "generated": len(records),
+        "deduplicated": len(duplicates),
+        "failed": failed,
+        "results": results,
+    }
 
 
 # ======================= 2️⃣ MODULE LIBRARY ENDPOINTS =======================
 
+# Индексы реестра модулей для постраничной выдачи (перестраиваются при изменении файла)
+MODULE_INDEX = ModuleIndex(MODULES_REGISTRY)
+
+MODULES_PAGE_DEFAULT = 50
+MODULES_PAGE_MAX = 500
+
+_MODULES_PAGE_PARAMS = {"limit", "cursor", "module_type", "created_after", "param", "fields", "order"}
+
+
+def _parse_param_range(spec: str):
+    """"width:1.5:3" → ("width", 1.5, 3.0); пустая граница — без ограничения."""
+    parts = spec.split(":")
+    if len(parts) != 3 or not parts[0]:
+        raise ApiError(f"param ожидается как имя:мин:макс, получено: {spec}")
+    name, lo, hi = parts
+    try:
+        return name, (float(lo) if lo else None), (float(hi) if hi else None)
+    except ValueError:
+        raise ApiError(f"Некорректная граница в param={spec}")
+
+
 @app.get("/api/modules")
-async def get_all_modules():
+async def get_all_modules(request: Request):
     """
     🔹 ВКЛАДКА 2: БИБЛИОТЕКА - ВСЕ МОДУЛИ
 
-    Возвращает все модули, отсортированные по типам
+    Без параметров возвращает все модули, отсортированные по типам.
+
+    С любым из параметров — одна страница по индексам реестра:
+      limit=50                 размер страницы (до 500)
+      cursor=...               next_cursor предыдущей страницы
+      module_type=wall         фильтр по типу
+      created_after=2025-11-18 только созданные позже (ISO 8601)
+      param=width:1.5:3        диапазон параметра (можно повторять; граница может быть пустой)
+      fields=module_id,params.width   проекция полей
+      order=desc               новые сначала (по умолчанию asc)
     """
     try:
-        modules = load_modules_registry()
+        query = request.query_params
+        if _MODULES_PAGE_PARAMS.isdisjoint(query.keys()):
+            return _all_modules_response()
 
-        # Группируем по типам
-        by_type = {}
-        for module in modules:
-            mtype = module["module_type"]
-            if mtype not in by_type:
-                by_type[mtype] = []
-            by_type[mtype].append(module)
+        try:
+            limit = int(query.get("limit", MODULES_PAGE_DEFAULT))
+        except ValueError:
+            raise ApiError("limit должен быть целым числом")
+        limit = max(1, min(MODULES_PAGE_MAX, limit))
+
+        created_after = query.get("created_after")
+        if created_after:
+            try:
+                datetime.fromisoformat(created_after)
+            except ValueError:
+                raise ApiError(f"created_after не в формате ISO 8601: {created_after}")
 
+        order = query.get("order", "asc").lower()
+        if order not in ("asc", "desc"):
+            raise ApiError("order: asc или desc")
+
+        ranges = [_parse_param_range(spec) for spec in query.getlist("param")]
+        fields = [f.strip() for f in query.get("fields", "").split(",") if f.strip()]
+
+        try:
+            items, next_cursor = MODULE_INDEX.page(
+                module_type=query.get("module_type") or None,
+                created_after=created_after or None,
+                ranges=ranges,
+                cursor=query.get("cursor") or None,
+                limit=limit,
+                descending=(order == "desc"),
+            )
+        except ValueError as e:
+            raise ApiError(str(e))
+
+        if fields:
+            items = [project(m, fields) for m in items]
         return {
             "status": "success",
-            "total": len(modules),
-            "by_type": by_type,
-            "modules": modules
+            "count": len(items),
+            "next_cursor": next_cursor,
+            "modules": items,
         }
 
+    except ApiError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
     except Exception as e:
         logger.error(f"Ошибка получения модулей: {e}")
         return JSONResponse(
@@ -735,6 +1496,25 @@ async def get_all_modules():
         )
 
 
+def _all_modules_response() -> Dict[str, Any]:
+    modules = load_modules_registry()
+
+    # Группируем по типам
+    by_type = {}
+    for module in modules:
+        mtype = module["module_type"]
+        if mtype not in by_type:
+            by_type[mtype] = []
+        by_type[mtype].append(module)
+
+    return {
+        "status": "success",
+        "total": len(modules),
+        "by_type": by_type,
+        "modules": modules
+    }
+
+
 @app.get("/api/modules/{module_type}")
 async def get_modules_by_type(module_type: str):
     """
@@ -743,8 +1523,7 @@ async def get_modules_by_type(module_type: str):
     module_type: wall, window, door, balcony, entrance
     """
     try:
-        modules = load_modules_registry()
-        filtered = [m for m in modules if m["module_type"] == module_type]
+        filtered = MODULE_INDEX.of_type(module_type)
 
         return {
             "status": "success",
@@ -767,8 +1546,7 @@ async def download_module(module_id: str):
     🔹 ВКЛАДКА 2: СКАЧИВАНИЕ МОДУЛЯ ZIP
     """
     try:
-        modules = load_modules_registry()
-        module = next((m for m in modules if m["module_id"] == module_id), None)
+        module = MODULES_REGISTRY.get(module_id)
 
         if not module:
             return JSONResponse(
@@ -776,7 +1554,24 @@ async def download_module(module_id: str):
                 status_code=404
             )
 
+        module_type = module["module_type"]
+        module_dir = MODULES_DIR / module_type / module_id
         zip_file = MODULES_DIR / module["zip_file"]
+        ACCESS_LOG.touch(module_id)
+
+        # Архив собирается из папки модуля на лету; готовый ZIP — только
+        # запасной вариант для модулей, чьи файлы уже удалены.
+        if module_dir.is_dir():
+            config = {
+                "module_id": module_id,
+                "module_type": module_type,
+                "params": module.get("params", {}),
+                "created_at": module.get("created_at"),
+            }
+            return _zip_download(
+                _module_zip_entries(module_type, module_id, config, module_dir),
+                module["zip_file"],
+            )
 
         if not zip_file.exists():
             return JSONResponse(
@@ -794,14 +1589,33 @@ async def download_module(module_id: str):
         )
 
 
+@app.get("/api/modules/{module_id}/thumbnail")
+async def module_thumbnail(module_id: str):
+    """
+    🔹 ВКЛАДКА 2: ПРЕВЬЮ МОДУЛЯ (PNG ~256², прозрачный фон)
+
+    Для карточек каталога вместо загрузки OBJ + MTL + текстур.
+    """
+    try:
+        module = MODULES_REGISTRY.get(module_id)
+        if not module:
+            return JSONResponse({"error": "Модуль не найден"}, status_code=404)
+        module_type = module["module_type"]
+        obj_path = MODULES_DIR / module_type / module_id / f"{module_type}.obj"
+        return await _thumbnail_response(obj_path, module_type)
+
+    except Exception as e:
+        logger.error(f"Ошибка превью модуля: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
 @app.delete("/api/modules/{module_id}")
 async def delete_module(module_id: str):
     """
     🔹 ВКЛАДКА 2: УДАЛЕНИЕ МОДУЛЯ
     """
     try:
-        modules = load_modules_registry()
-        module = next((m for m in modules if m["module_id"] == module_id), None)
+        module = MODULES_REGISTRY.get(module_id)
 
         if not module:
             return JSONResponse(
@@ -809,15 +1623,13 @@ async def delete_module(module_id: str):
                 status_code=404
             )
 
-        # Удаляем ZIP файл
+        # Сначала реестр, затем файлы (ZIP и папка модуля — через корзину GC)
+        MODULES_REGISTRY.delete(module_id)
+
         zip_file = MODULES_DIR / module["zip_file"]
-        if zip_file.exists():
-            zip_file.unlink()
+        if STORAGE_GC.remove(zip_file):
             logger.info(f"✓ ZIP удален: {zip_file}")
-
-        # Удаляем из реестра
-        modules = [m for m in modules if m["module_id"] != module_id]
-        save_modules_registry(modules)
+        STORAGE_GC.remove(MODULES_DIR / module["module_type"] / module_id)
 
         logger.info(f"✓ Модуль удален: {module_id}")
 
@@ -848,14 +1660,12 @@ async def rename_module(module_id: str, request: Request):
         if not new_name:
             return JSONResponse({"error": "Имя не может быть пустым"}, status_code=400)
 
-        modules = load_modules_registry()
-        module = next((m for m in modules if m["module_id"] == module_id), None)
+        module = MODULES_REGISTRY.get(module_id)
 
         if not module:
             return JSONResponse({"error": "Модуль не найден"}, status_code=404)
 
-        module["module_name"] = new_name
-        save_modules_registry(modules)
+        MODULES_REGISTRY.put({**module, "module_name": new_name})
         logger.info(f"✓ Модуль переименован: {module_id} → '{new_name}'")
 
         return {"status": "success", "module_id": module_id, "module_name": new_name}
@@ -915,7 +1725,7 @@ async def analyze_building_text(request: Request):
 
         import asyncio
         loop = asyncio.get_event_loop()
-        ai_result = await loop.run_in_executor(None, parse_building_text, text)
+        ai_result = await loop.run_in_executor(None, bind(parse_building_text), text)
         if ai_result is not None:
             logger.info(f"AI parse succeeded: {ai_result}")
             return ai_result
@@ -929,7 +1739,101 @@ async def analyze_building_text(request: Request):
 
 
 # ======================= 3️⃣ HOUSE BUILDER ENDPOINTS =======================
-def create_wall_window_module(wall_params: Dict[str, Any], window_params: Dict[str, Any]) -> str:
+
+# Размер чанка дома по умолчанию (этажей × колонок)
+HOUSE_CHUNK_FLOORS = 4
+HOUSE_CHUNK_COLUMNS = 6
+
+# Поля запроса обновления дома → ключи параметров ассемблера
+_HOUSE_UPDATE_FIELDS = {
+    "floors": "floors",
+    "width": "columns",
+    "sections": "sections",
+    "depth": "depth",
+    "texture_scale": "texture_scale",
+    "balcony_rate": "balcony_rate",
+    "balcony_module_id": "balcony_module_id",
+    "door_module_id": "entrance_module_id",
+    "chunk_floors": "chunk_floors",
+    "chunk_columns": "chunk_columns",
+}
+# Поля, которые обновление применяет отдельно (пересборка wall_window)
+_HOUSE_UPDATE_SPECIAL = ("wall_module_id", "window_module_id")
+
+# Варианты wall_window генерируются в отдельном пуле, параллельно с загрузкой
+# модулей и планированием фасадов; одинаковые варианты не генерируются дважды.
+WALL_WINDOW_WORKERS = int(os.getenv("WALL_WINDOW_WORKERS", "2"))
+WALL_WINDOW_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, WALL_WINDOW_WORKERS),
+                                          thread_name_prefix="wall-window")
+_wall_window_lock = threading.Lock()
+_wall_window_flights: Dict[str, "Future[str]"] = {}
+
+WALL_WINDOW_VARIANTS = METRICS.counter(
+    "wall_window_variants_total",
+    "wall_window variants requested by house generation, by outcome",
+    ("outcome",),
+)
+
+
+def _wall_window_config(wall_params: Dict[str, Any],
+                        window_params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Секция wall_window для run_all_generators (без out_dir).
+    Полностью определяет результат генерации, поэтому её отпечаток —
+    ключ варианта: размеры стены и окна, импосты и цвета текстур.
+    """
+    wall_height = float(wall_params.get("height", 3.0))
+    win_height  = float(window_params.get("height", 1.4))
+    # Centre the window vertically within the wall, leaving at least 0.15m
+    # headroom above and 0.2m sill below so the wall mesh doesn't degenerate.
+    sill_z = max(0.2, (wall_height - win_height) / 2)
+    if sill_z + win_height > wall_height - 0.12:
+        sill_z = wall_height - win_height - 0.12
+        if sill_z < 0.15:  # если слишком низко, оставить центровано
+            sill_z = max(0.2, (wall_height - win_height) / 2)
+
+    wall_window_cfg: Dict[str, Any] = {
+        "enabled": True,
+        # Wall geometry from wall module params
+        "wall_length": float(wall_params.get("width", 3.0)),
+        "wall_height": wall_height,
+        "wall_thickness": float(wall_params.get("thickness", 0.25)),
+        # Window position (centred vertically; sill computed above)
+        "window_center_x": 0.0,
+        "window_sill_z": sill_z,
+        # Window geometry from window module params
+        "width": float(window_params.get("width", 1.1)),
+        "height": win_height,
+        "mullions_vertical": int(window_params.get("mullions_vertical", 1)),
+        "no_view": True,
+        # PBR maps
+        "texture": {
+            "generate_normal": True,
+            "generate_roughness": True,
+        },
+    }
+
+    # Pass wall colour tint directly (top-level, not nested – forwarded as-is to exporter)
+    wall_color = wall_params.get("color")
+    if isinstance(wall_color, str) and wall_color.strip().startswith("#"):
+        wall_window_cfg["wall_texture_color"] = hex_to_rgb(wall_color.strip())
+
+    frame_color = window_params.get("color") or window_params.get("frame_color")
+    if isinstance(frame_color, str) and frame_color.strip().startswith("#"):
+        wall_window_cfg["frame_texture_color"] = hex_to_rgb(frame_color.strip())
+
+    glass_color = window_params.get("glass_color")
+    if isinstance(glass_color, str) and glass_color.strip().startswith("#"):
+        wall_window_cfg["glass_texture_color"] = hex_to_rgb(glass_color.strip())
+    else:
+        wall_window_cfg["glass_texture_color"] = [135, 206, 235]  # default sky blue
+
+    return wall_window_cfg
+
+
+def create_wall_window_module(wall_params: Dict[str, Any],
+                              window_params: Dict[str, Any],
+                              progress: Optional[ProgressHook] = None) -> str:
     """
     Builds a wall_window module from wall + window params via procedural_batch_runner.
     Returns the module_id saved in the registry (type "wall_window").
@@ -939,57 +1843,14 @@ def create_wall_window_module(wall_params: Dict[str, Any], window_params: Dict[s
         output_dir = MODULES_DIR / "wall_window" / module_id
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Build the wall_window config section for run_all_generators
-        wall_height = float(wall_params.get("height", 3.0))
-        win_height  = float(window_params.get("height", 1.4))
-        # Centre the window vertically within the wall, leaving at least 0.15m
-        # headroom above and 0.2m sill below so the wall mesh doesn't degenerate.
-        sill_z = max(0.2, (wall_height - win_height) / 2)
-        if sill_z + win_height > wall_height - 0.12:
-            sill_z = wall_height - win_height - 0.12
-            if sill_z < 0.15:  # если слишком низко, оставить центровано
-                sill_z = max(0.2, (wall_height - win_height) / 2)
-
-        wall_window_cfg: Dict[str, Any] = {
-            "enabled": True,
-            "out_dir": str(output_dir),
-            # Wall geometry from wall module params
-            "wall_length": float(wall_params.get("width", 3.0)),
-            "wall_height": wall_height,
-            "wall_thickness": float(wall_params.get("thickness", 0.25)),
-            # Window position (centred vertically; sill computed above)
-            "window_center_x": 0.0,
-            "window_sill_z": sill_z,
-            # Window geometry from window module params
-            "width": float(window_params.get("width", 1.1)),
-            "height": win_height,
-            "mullions_vertical": int(window_params.get("mullions_vertical", 1)),
-            "no_view": True,
-            # PBR maps
-            "texture": {
-                "generate_normal": True,
-                "generate_roughness": True,
-            },
-        }
-
-        # Pass wall colour tint directly (top-level, not nested – forwarded as-is to exporter)
-        wall_color = wall_params.get("color")
-        if isinstance(wall_color, str) and wall_color.strip().startswith("#"):
-            wall_window_cfg["wall_texture_color"] = hex_to_rgb(wall_color.strip())
-            logger.info(f"wall_window_cfg = {wall_window_cfg}")
-
-        frame_color = window_params.get("color") or window_params.get("frame_color")
-        if isinstance(frame_color, str) and frame_color.strip().startswith("#"):
-            wall_window_cfg["frame_texture_color"] = hex_to_rgb(frame_color.strip())
-
-        glass_color = window_params.get("glass_color")
-        if isinstance(glass_color, str) and glass_color.strip().startswith("#"):
-            wall_window_cfg["glass_texture_color"] = hex_to_rgb(glass_color.strip())
-        else:
-            wall_window_cfg["glass_texture_color"] = [135, 206, 235]  # default sky blue
+        base_cfg = _wall_window_config(wall_params, window_params)
+        wall_window_cfg = {**base_cfg, "out_dir": str(output_dir)}
+        logger.info(f"wall_window_cfg = {wall_window_cfg}")
 
         logger.info(f"🔨 Generating wall_window via batch runner for module {module_id}")
-        results = run_all_generators({"wall_window": wall_window_cfg}, default_out_root=output_dir)
+        from src.generator.procedural.procedural_batch_runner import run_all_generators
+        results = run_all_generators({"wall_window": wall_window_cfg},
+                                     default_out_root=output_dir, progress=progress)
 
         obj_path = results.get("wall_window")
         if not obj_path or not obj_path.exists():
@@ -1006,7 +1867,8 @@ def create_wall_window_module(wall_params: Dict[str, Any], window_params: Dict[s
             "mullions_vertical": wall_window_cfg["mullions_vertical"],
         }
 
-        zip_path = create_module_zip(module_id, "wall_window", combined_params, obj_path)
+        with stage(progress, "zipping", module_type="wall_window"):
+            zip_path = create_module_zip(module_id, "wall_window", combined_params, obj_path)
         if not zip_path:
             raise Exception("Failed to create ZIP for wall_window")
 
@@ -1018,6 +1880,7 @@ def create_wall_window_module(wall_params: Dict[str, Any], window_params: Dict[s
                 f"{window_params.get('width', 1.1):.1f}×{window_params.get('height', 1.4):.1f}"
             ),
             "params": combined_params,
+            "variant_key": fingerprint(base_cfg),
             "zip_file": zip_path.name,
             "created_at": datetime.now().isoformat(),
             "dimensions": {
@@ -1026,9 +1889,7 @@ def create_wall_window_module(wall_params: Dict[str, Any], window_params: Dict[s
             },
         }
 
-        modules = load_modules_registry()
-        modules.append(module_record)
-        save_modules_registry(modules)
+        append_modules_registry([module_record])
 
         logger.info(f"✓ Wall_window saved to registry: {module_id}")
         return module_id
@@ -1037,121 +1898,341 @@ def create_wall_window_module(wall_params: Dict[str, Any], window_params: Dict[s
         logger.error(f"❌ Error creating wall_window: {e}", exc_info=True)
         raise Exception(f"Failed to create wall_window: {str(e)}")
 
+
+def _find_wall_window_variant(variant_key: str) -> Optional[str]:
+    """Уже сгенерированный wall_window с тем же ключом варианта (и файлами на диске)."""
+    for record in reversed(MODULE_INDEX.of_type("wall_window")):
+        if record.get("variant_key") != variant_key:
+            continue
+        module_id = record.get("module_id")
+        if (MODULES_DIR / "wall_window" / str(module_id) / "wall_window.obj").exists():
+            return module_id
+    return None
+
+
+def ensure_wall_window_module(wall_params: Dict[str, Any],
+                              window_params: Dict[str, Any],
+                              progress: Optional[ProgressHook] = None) -> "Future[str]":
+    """
+    wall_window для пары стена + окно как Future[module_id]:
+
+      * вариант с тем же ключом уже есть в реестре → готовый Future;
+      * такой же вариант сейчас генерируется → Future этой генерации;
+      * иначе генерация запускается в WALL_WINDOW_EXECUTOR.
+
+    Вызывающий может параллельно планировать дом и ждать результат позже.
+    """
+    variant_key = fingerprint(_wall_window_config(wall_params, window_params))
+
+    with _wall_window_lock:
+        existing = _find_wall_window_variant(variant_key)
+        if existing is not None:
+            WALL_WINDOW_VARIANTS.inc(outcome="reused")
+            logger.info(f"♻️ Wall_window reused: {existing} (variant {variant_key})")
+            future: "Future[str]" = Future()
+            future.set_result(existing)
+            return future
+
+        future = _wall_window_flights.get(variant_key)
+        if future is not None:
+            WALL_WINDOW_VARIANTS.inc(outcome="joined")
+            return future
+
+        WALL_WINDOW_VARIANTS.inc(outcome="generated")
+        future = WALL_WINDOW_EXECUTOR.submit(bind(_generate_wall_window_variant),
+                                             wall_params, window_params, progress)
+        _wall_window_flights[variant_key] = future
+
+    def _forget(done: "Future[str]") -> None:
+        with _wall_window_lock:
+            if _wall_window_flights.get(variant_key) is done:
+                del _wall_window_flights[variant_key]
+
+    future.add_done_callback(_forget)
+    return future
+
+
+def _generate_wall_window_variant(wall_params: Dict[str, Any],
+                                  window_params: Dict[str, Any],
+                                  progress: Optional[ProgressHook] = None) -> str:
+    with stage(progress, "wall_window"):
+        return create_wall_window_module(wall_params, window_params, progress=progress)
+
 @app.post("/api/generate-house")
 async def generate_house(request: Request):
+    """
+    🔹 ВКЛАДКА 3: СБОРКА ДОМА
+
+    С "async": true в теле запроса сразу возвращается 202 с job_id; стадии
+    (wall_window, generator, zipping, module_loading, planning, module_wait,
+    facade, texture_packing, export, thumbnail, precompress, registry) идут в /api/jobs/{job_id}/events.
+    wall_window генерируется параллельно с module_loading/planning либо
+    берётся готовым из реестра, если такой вариант уже есть.
+
+    Допуск — полоса "house" (429/503 с Retry-After при перегрузке).
+    Idempotency-Key и объединение одинаковых запросов — как в /api/generate-module.
+    """
     try:
         payload = await request.json()
-        house_name = payload.get("house_name", "Дом")
-
-        # === ПОЛУЧАЕМ ПАРАМЕТРЫ WALL, WINDOW И BALCONY ===
-        wall_module_id = payload.get("wall_module_id")
-        window_module_id = payload.get("window_module_id")
-        door_module_id = payload.get("door_module_id")
-        balcony_module_id = payload.get("balcony_module_id") or None
-        wall_dimensions = {"width": 4.0, "height": 3.0}
-
-        wall_params = None
-        window_params = None
-        modules_registry = load_modules_registry()
-
-        # Ищем wall, window и balcony в реестре
-        for module in modules_registry:
-            module_id = module.get("module_id")
-
-            if module_id == wall_module_id:
-                wall_params = module.get("params", {})
-                if "dimensions" in module:
-                    wall_dimensions = module["dimensions"]
-                logger.info(f"✓ Wall параметры: {wall_params}")
-
-            if module_id == window_module_id:
-                window_params = module.get("params", {})
-                logger.info(f"✓ Window параметры: {window_params}")
-
-            if module_id == balcony_module_id:
-                logger.info(f"✓ Balcony module найден в реестре: {module_id}")
-
-        # === REQUIRE BOTH WALL AND WINDOW ===
-        if not wall_params:
-            return JSONResponse({"error": "Wall module not found in registry"}, status_code=400)
-        if not window_params:
-            return JSONResponse({"error": "Window module not found in registry"}, status_code=400)
-
-        # === COMBINE WALL + WINDOW → WALL_WINDOW via procedural_batch_runner ===
-        logger.info("🔗 Combining wall + window → wall_window via batch runner...")
-        try:
-            wall_window_module_id = create_wall_window_module(wall_params, window_params)
-            logger.info(f"✓ Wall_window created: {wall_window_module_id}")
-        except Exception as ww_err:
-            logger.warning(
-                f"⚠️ Wall_window generation failed: {ww_err}. "
-                "Assembly will proceed using plain walls for window cells."
-            )
-            wall_window_module_id = None
+        return await _generate_idempotent(request, "house", _generate_house, payload,
+                                          lane="house", normalized=_request_identity(payload))
+
+    except Rejected as e:
+        return _rejected_response(e)
+    except IdempotencyConflict as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+    except ApiError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Ошибка создания дома: {e}", exc_info=True)
+        return JSONResponse({"error": str(e)}, status_code=500)
 
-        house_id = str(uuid.uuid4())[:8]
-        house_dir = MODULES_DIR / "houses" / house_id
-        house_dir.mkdir(parents=True, exist_ok=True)
-
-        # === ПАРАМЕТРЫ ДЛЯ АССЕМБЛЕРА ===
-        from src.generator.assembler import assemble_building
-
-        building_params = {
-            "floors": payload.get("floors", 5),
-            "columns": payload.get("width", 18),
-            "sections": payload.get("sections", 3),
-            "module_width": wall_dimensions.get("width", 4.0),
-            "module_height": wall_dimensions.get("height", 3.0),
-            "depth": payload.get("depth", 2),
-            "texture_scale": payload.get("texture_scale", 1),
-            # has_balcony: True if the user selected a balcony module
-            "has_balcony": bool(payload.get("has_balconies", False)) and balcony_module_id is not None,
-            # Specific UUIDs so the assembler loads freshly generated modules
-            # rather than an arbitrary first alphabetical match from disk.
-            "wall_module_id":         wall_module_id,
-            "wall_window_module_id":  wall_window_module_id,
-            "entrance_module_id":     door_module_id,
-            "balcony_module_id":      balcony_module_id,
-        }
 
-        logger.info(f"🏗️ Параметры здания: {building_params}")
+def _generate_house(payload: Dict[str, Any],
+                    progress: Optional[ProgressHook] = None) -> Dict[str, Any]:
+    """Тело /api/generate-house; вызывается напрямую или из фоновой задачи."""
+    house_name = payload.get("house_name", "Дом")
+
+    # === ПОЛУЧАЕМ ПАРАМЕТРЫ WALL, WINDOW И BALCONY ===
+    wall_module_id = payload.get("wall_module_id")
+    window_module_id = payload.get("window_module_id")
+    door_module_id = payload.get("door_module_id")
+    balcony_module_id = payload.get("balcony_module_id") or None
+    wall_dimensions = {"width": 4.0, "height": 3.0}
+
+    wall_params = None
+    window_params = None
+
+    # Ищем wall, window и balcony в реестре
+    wall_module = MODULES_REGISTRY.get(wall_module_id)
+    if wall_module is not None:
+        wall_params = wall_module.get("params", {})
+        if "dimensions" in wall_module:
+            wall_dimensions = wall_module["dimensions"]
+        logger.info(f"✓ Wall параметры: {wall_params}")
+
+    window_module = MODULES_REGISTRY.get(window_module_id)
+    if window_module is not None:
+        window_params = window_module.get("params", {})
+        logger.info(f"✓ Window параметры: {window_params}")
+
+    if balcony_module_id and MODULES_REGISTRY.get(balcony_module_id) is not None:
+        logger.info(f"✓ Balcony module найден в реестре: {balcony_module_id}")
+
+    # === REQUIRE BOTH WALL AND WINDOW ===
+    if not wall_params:
+        raise ApiError("Wall module not found in registry")
+    if not window_params:
+        raise ApiError("Window module not found in registry")
+
+    # === COMBINE WALL + WINDOW → WALL_WINDOW via procedural_batch_runner ===
+    # Готовый вариант берётся из реестра; новый генерируется в фоне, пока
+    # ассемблер загружает остальные модули и планирует фасады.
+    logger.info("🔗 Combining wall + window → wall_window via batch runner...")
+    wall_window_future = ensure_wall_window_module(wall_params, window_params,
+                                                   progress=progress)
+
+    house_id = str(uuid.uuid4())[:8]
+    house_dir = MODULES_DIR / "houses" / house_id
+    house_dir.mkdir(parents=True, exist_ok=True)
+
+    # === ПАРАМЕТРЫ ДЛЯ АССЕМБЛЕРА ===
+    building_params = {
+        "floors": payload.get("floors", 5),
+        "columns": payload.get("width", 18),
+        "sections": payload.get("sections", 3),
+        "module_width": wall_dimensions.get("width", 4.0),
+        "module_height": wall_dimensions.get("height", 3.0),
+        "depth": payload.get("depth", 2),
+        "texture_scale": payload.get("texture_scale", 1),
+        "balcony_rate": payload.get("balcony_rate", 0.25),
+        # has_balcony: True if the user selected a balcony module
+        "has_balcony": bool(payload.get("has_balconies", False)) and balcony_module_id is not None,
+        # Specific UUIDs so the assembler loads freshly generated modules
+        # rather than an arbitrary first alphabetical match from disk.
+        "wall_module_id":         wall_module_id,
+        "window_module_id":       window_module_id,
+        # wall_window_module_id дописывает ассемблер, когда вариант готов
+        "entrance_module_id":     door_module_id,
+        "balcony_module_id":      balcony_module_id,
+        # Нарезка на чанки (этажи × колонки): стриминг во вьюер и
+        # инкрементальное обновление дома. 0 в обоих полях — без чанков.
+        "chunk_floors":  int(payload.get("chunk_floors", HOUSE_CHUNK_FLOORS) or 0),
+        "chunk_columns": int(payload.get("chunk_columns", HOUSE_CHUNK_COLUMNS) or 0),
+    }
 
-        # Вызываем ассемблер
-        output_path = house_dir / "house.obj"
-        success = assemble_building(
-            building_params,
-            MODULES_DIR,
-            output_path
+    logger.info(f"🏗️ Параметры здания: {building_params}")
+
+    # Вызываем ассемблер
+    output_path = house_dir / "house.obj"
+    from src.generator.assembler import assemble_building
+    success = assemble_building(
+        building_params,
+        MODULES_DIR,
+        output_path,
+        progress=progress,
+        pending={"wall_window": wall_window_future},
+    )
+    if building_params.get("wall_window_module_id"):
+        logger.info(f"✓ Wall_window: {building_params['wall_window_module_id']}")
+    else:
+        logger.warning(
+            "⚠️ Wall_window generation failed. "
+            "Assembly proceeded using plain walls for window cells."
         )
 
-        if not success:
-            raise Exception("Ошибка сборки дома")
+    if not success:
+        raise Exception("Ошибка сборки дома")
 
-        logger.info(f"✓ Дом собран: {house_id}")
+    render_obj_thumbnail(output_path, "houses", progress=progress)
+    with stage(progress, "precompress"):
+        precompress_dir(house_dir)
 
-        house_record = {
-            "house_id": house_id,
-            "house_name": house_name,
-            "params": building_params,
-            "obj_url": f"/modules/houses/{house_id}/house.obj",
-            "created_at": datetime.now().isoformat()
-        }
+    logger.info(f"✓ Дом собран: {house_id}")
 
-        houses = load_houses_registry()
-        houses.append(house_record)
-        save_houses_registry(houses)
+    house_record = {
+        "house_id": house_id,
+        "house_name": house_name,
+        "params": building_params,
+        "obj_url": f"/modules/houses/{house_id}/house.obj",
+        "created_at": datetime.now().isoformat()
+    }
+    if (house_dir / "chunks.json").exists():
+        house_record["chunks_url"] = f"/modules/houses/{house_id}/chunks.json"
 
-        return {
-            "status": "success",
-            "house_id": house_id,
-            "house_name": house_name,
-            "obj_url": f"/modules/houses/{house_id}/house.obj"
-        }
+    with stage(progress, "registry"):
+        HOUSES_REGISTRY.put(house_record)
 
+    response = {
+        "status": "success",
+        "house_id": house_id,
+        "house_name": house_name,
+        "obj_url": f"/modules/houses/{house_id}/house.obj"
+    }
+    if "chunks_url" in house_record:
+        response["chunks_url"] = house_record["chunks_url"]
+    return response
+
+@app.post("/api/houses/{house_id}/update")
+async def update_house(house_id: str, request: Request):
+    """
+    🔹 ВКЛАДКА 3: ИНКРЕМЕНТАЛЬНОЕ ОБНОВЛЕНИЕ ДОМА
+
+    Входные данные — только изменённые поля, как в /api/generate-house:
+    {
+        "balcony_module_id": "...",
+        "balcony_rate": 0.5,
+        "texture_scale": 4
+    }
+
+    Пересобираются и переэкспортируются только чанки, у которых изменились
+    ячейки плана или используемые модули; остальные берутся с диска.
+    """
+    try:
+        payload = await request.json()
+        return await _run_admitted("house", _update_house, house_id, payload)
+
+    except Rejected as e:
+        return _rejected_response(e)
+    except ApiError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code)
     except Exception as e:
-        logger.error(f"Ошибка создания дома: {e}", exc_info=True)
+        logger.error(f"Ошибка обновления дома: {e}", exc_info=True)
         return JSONResponse({"error": str(e)}, status_code=500)
 
+
+# Обновления одного дома выполняются по очереди: иначе два параллельных
+# запроса читают одну и ту же запись, экспортируют чанки в один каталог
+# и последний put() затирает изменения первого.
+_house_locks_guard = threading.Lock()
+_house_locks: Dict[str, List[Any]] = {}   # house_id → [замок, число ожидающих]
+
+
+@contextmanager
+def _house_update_lock(house_id: str):
+    with _house_locks_guard:
+        entry = _house_locks.setdefault(house_id, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _house_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _house_locks[house_id]
+
+
+def _update_house(house_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Тело /api/houses/{house_id}/update; выполняется в пуле потоков."""
+    with _house_update_lock(house_id):
+        return _update_house_locked(house_id, payload)
+
+
+def _update_house_locked(house_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    house = HOUSES_REGISTRY.get(house_id)
+    if not house:
+        raise ApiError("Дом не найден", status_code=404)
+
+    unsupported = sorted(set(payload) - set(_HOUSE_UPDATE_FIELDS) - set(_HOUSE_UPDATE_SPECIAL))
+    if unsupported:
+        raise ApiError(f"Поля нельзя изменить обновлением: {', '.join(unsupported)}")
+
+    params = dict(house.get("params", {}))
+    for field, key in _HOUSE_UPDATE_FIELDS.items():
+        if field in payload:
+            params[key] = payload[field]
+    if not params.get("chunk_floors") and not params.get("chunk_columns"):
+        # Дом собран без чанков — первое обновление полное, дальше инкрементальные
+        params["chunk_floors"] = HOUSE_CHUNK_FLOORS
+        params["chunk_columns"] = HOUSE_CHUNK_COLUMNS
+
+    # Смена стены или окна требует нового wall_window
+    if "wall_module_id" in payload or "window_module_id" in payload:
+        wall_id = payload.get("wall_module_id", params.get("wall_module_id"))
+        window_id = payload.get("window_module_id", params.get("window_module_id"))
+        wall = MODULES_REGISTRY.get(wall_id)
+        window = MODULES_REGISTRY.get(window_id)
+        if not wall:
+            raise ApiError("Wall module not found in registry")
+        if not window:
+            raise ApiError("Window module not found in registry")
+        params["wall_module_id"] = wall_id
+        params["window_module_id"] = window_id
+        params["wall_window_module_id"] = ensure_wall_window_module(
+            wall.get("params", {}), window.get("params", {})
+        ).result()
+        if "dimensions" in wall:
+            params["module_width"] = wall["dimensions"].get("width", 4.0)
+            params["module_height"] = wall["dimensions"].get("height", 3.0)
+
+    output_path = MODULES_DIR / "houses" / house_id / "house.obj"
+    from src.generator.assembler import update_building
+    stats = update_building(params, MODULES_DIR, output_path)
+    if stats is None:
+        raise Exception("Ошибка обновления дома")
+    render_obj_thumbnail(output_path, "houses")
+    precompress_dir(output_path.parent)
+
+    house = {
+        **house,
+        "params": params,
+        "updated_at": datetime.now().isoformat(),
+        "chunks_url": f"/modules/houses/{house_id}/chunks.json",
+    }
+    HOUSES_REGISTRY.put(house)
+
+    logger.info(f"✓ Дом обновлён: {house_id} ({stats})")
+    return {
+        "status": "success",
+        "house_id": house_id,
+        "house_name": house.get("house_name"),
+        "obj_url": house["obj_url"],
+        "chunks_url": house["chunks_url"],
+        "chunks": stats,
+    }
+
+
 @app.get("/api/houses")
 async def get_all_houses():
     """
@@ -1180,8 +2261,7 @@ async def get_house(house_id: str):
     🔹 ВКЛАДКА 3: ДЕТАЛИ ДОМА
     """
     try:
-        houses = load_houses_registry()
-        house = next((h for h in houses if h["house_id"] == house_id), None)
+        house = HOUSES_REGISTRY.get(house_id)
 
         if not house:
             return JSONResponse(
@@ -1201,8 +2281,50 @@ async def get_house(house_id: str):
             status_code=500
         )
 
+@app.get("/api/houses/{house_id}/thumbnail")
+async def house_thumbnail(house_id: str):
+    """
+    🔹 ВКЛАДКА 3: ПРЕВЬЮ ДОМА (PNG ~256², прозрачный фон)
+    """
+    try:
+        if not HOUSES_REGISTRY.get(house_id):
+            return JSONResponse({"error": "Дом не найден"}, status_code=404)
+        return await _thumbnail_response(MODULES_DIR / "houses" / house_id / "house.obj", "houses")
+
+    except Exception as e:
+        logger.error(f"Ошибка превью дома: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
 # ======================= СТАРЫЙ ENDPOINT (для совместимости) =======================
 
+@app.get("/api/houses/{house_id}/download")
+async def download_house(house_id: str, chunks: bool = False):
+    """
+    🔹 ВКЛАДКА 3: СКАЧИВАНИЕ ДОМА ZIP (потоково)
+
+    house.obj, MTL и все текстуры дома + config.json с записью реестра.
+    Чанки (дублируют геометрию house.obj) — только с ?chunks=true.
+    """
+    try:
+        house = HOUSES_REGISTRY.get(house_id)
+        if not house:
+            return JSONResponse({"error": "Дом не найден"}, status_code=404)
+
+        house_dir = MODULES_DIR / "houses" / house_id
+        if not (house_dir / "house.obj").exists():
+            return JSONResponse({"error": "Файлы дома не найдены"}, status_code=404)
+
+        ACCESS_LOG.touch(house_id)
+        exclude = (THUMBNAIL_FILE,) if chunks else (THUMBNAIL_FILE, "chunks", "chunks.json", "plan.json")
+        entries = dir_zip_entries(house_dir, exclude=exclude)
+        entries.append(("config.json", json.dumps(house, indent=2, ensure_ascii=False).encode("utf-8")))
+        return _zip_download(entries, f"house_{house_id}.zip")
+
+    except Exception as e:
+        logger.error(f"Ошибка скачивания дома: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
 @app.post("/api/generate-building")
 async def generate_building_legacy(request: Request):
     """
@@ -1238,15 +2360,15 @@ async def generate_building_legacy(request: Request):
 # ======================= СТАТИКА =======================
 
 if MODULES_DIR.exists():
-    app.mount("/modules", StaticFiles(directory=MODULES_DIR), name="modules")
+    app.mount("/modules", PrecompressedStaticFiles(directory=MODULES_DIR), name="modules")
     logger.info(f"✓ Модули доступны по /modules")
 
 if TEXTURES_DIR.exists():
-    app.mount("/textures", StaticFiles(directory=TEXTURES_DIR), name="textures")
+    app.mount("/textures", PrecompressedStaticFiles(directory=TEXTURES_DIR), name="textures")
     logger.info(f"✓ Текстуры доступны по /textures")
 
 if FRONTEND_DIR.exists():
-    app.mount("/", StaticFiles(directory=FRONTEND_DIR, html=True), name="frontend")
+    app.mount("/", PrecompressedStaticFiles(directory=FRONTEND_DIR, html=True), name="frontend")
     logger.info(f"✓ Фронтенд подключен: {FRONTEND_DIR}")
 else:
     logger.warning(f"⚠️ Папка фронтенда не найдена: {FRONTEND_DIR}")
@@ -0,0 +1,305 @@
+"""
+api/static.py — Раздача статики с предсжатыми копиями, strong ETag и Range
+
+Текстовые ассеты (OBJ/MTL/JSON/JS/CSS/HTML) сжимаются один раз — при экспорте
+модуля или дома и при старте сервера для фронтенда — в соседние файлы
+``<имя>.gz`` (и ``<имя>.br``, если установлен пакет ``brotli``).  При запросе
+выбирается лучшая кодировка из Accept-Encoding, для которой есть свежая копия
+(не старше оригинала); иначе отдаётся оригинал.
+
+ETag строится из хэша содержимого оригинала плюс кодировки, поэтому он не
+меняется при перезаписи тех же байтов и отличается у gzip/br/identity.
+Хэши всех файлов каталога (включая картинки) считаются при экспорте и
+сохраняются рядом в ``.etags.json`` — после рестарта их не нужно считать
+заново.  Недостающий хэш считается в потоке вместе с lookup_path, не в
+event loop; если его всё же нет, ETag строится из mtime и размера.
+If-None-Match и Range обрабатывает FileResponse/StaticFiles из Starlette —
+Range применяется к выбранному представлению.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import stat
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+try:
+    import brotli  # необязательная зависимость
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Что имеет смысл сжимать (картинки уже сжаты)
+COMPRESSIBLE_SUFFIXES = {".obj", ".mtl", ".json", ".js", ".mjs", ".css", ".html",
+                         ".svg", ".txt", ".map"}
+# Меньше этого сжимать не стоит — заголовки дороже выигрыша
+MIN_COMPRESS_BYTES = 1024
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# (суффикс файла, значение Content-Encoding) в порядке предпочтения
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_ETAG_CACHE_MAX = 4096
+_etag_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_etag_lock = threading.Lock()
+
+# Хэши файлов каталога: {имя: [mtime_ns, размер, хэш]}; пишется precompress_dir
+ETAG_SIDECAR = ".etags.json"
+_SIDECAR_CACHE_MAX = 256
+_sidecar_cache: "OrderedDict[str, Tuple[int, Dict[str, List]]]" = OrderedDict()
+
+
+def _is_compressible(path: Path) -> bool:
+    return path.suffix.lower() in COMPRESSIBLE_SUFFIXES
+
+
+def _cache_key(path: Path, st: os.stat_result) -> Tuple[str, int, int]:
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _remember(key: Tuple[str, int, int], digest: str) -> None:
+    with _etag_lock:
+        _etag_cache[key] = digest
+        _etag_cache.move_to_end(key)
+        while len(_etag_cache) > _ETAG_CACHE_MAX:
+            _etag_cache.popitem(last=False)
+
+
+def cached_digest(path: Path, st: os.stat_result) -> Optional[str]:
+    """Хэш из памяти без чтения диска (None, если ещё не посчитан)."""
+    key = _cache_key(path, st)
+    with _etag_lock:
+        digest = _etag_cache.get(key)
+        if digest is not None:
+            _etag_cache.move_to_end(key)
+        return digest
+
+
+def _load_sidecar(directory: Path) -> Dict[str, List]:
+    sidecar = directory / ETAG_SIDECAR
+    try:
+        mtime = sidecar.stat().st_mtime_ns
+    except OSError:
+        return {}
+    with _etag_lock:
+        cached = _sidecar_cache.get(str(directory))
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    try:
+        entries = json.loads(sidecar.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        entries = {}
+    if not isinstance(entries, dict):
+        entries = {}
+    with _etag_lock:
+        _sidecar_cache[str(directory)] = (mtime, entries)
+        while len(_sidecar_cache) > _SIDECAR_CACHE_MAX:
+            _sidecar_cache.popitem(last=False)
+    return entries
+
+
+def content_digest(path: Path, st: Optional[os.stat_result] = None) -> str:
+    """
+    Хэш содержимого файла, кэшируется по (путь, mtime_ns, размер).
+    Сначала память, затем .etags.json каталога, и только потом чтение файла.
+    """
+    path = Path(path)
+    st = st or os.stat(path)
+    digest = cached_digest(path, st)
+    if digest is not None:
+        return digest
+    key = _cache_key(path, st)
+
+    entry = _load_sidecar(path.parent).get(path.name)
+    if (isinstance(entry, list) and len(entry) == 3
+            and entry[0] == st.st_mtime_ns and entry[1] == st.st_size):
+        digest = entry[2]
+    else:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+
+    _remember(key, digest)
+    return digest
+
+
+def stat_etag(st: os.stat_result) -> str:
+    """Запасной ETag без чтения содержимого: mtime_ns и размер."""
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def _fresh_sibling(path: Path, suffix: str, src_stat: os.stat_result) -> Optional[os.stat_result]:
+    try:
+        st = os.stat(f"{path}{suffix}")
+    except OSError:
+        return None
+    return st if st.st_mtime_ns >= src_stat.st_mtime_ns else None
+
+
+def _write_atomic(target: Path, data: bytes) -> None:
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+
+
+def precompress_file(path: Path) -> int:
+    """
+    Создаёт/обновляет .gz (и .br) рядом с файлом, если они устарели.
+    Возвращает число записанных копий.
+    """
+    path = Path(path)
+    if not _is_compressible(path):
+        return 0
+    src_stat = path.stat()
+    if src_stat.st_size < MIN_COMPRESS_BYTES:
+        return 0
+
+    written = 0
+    data: Optional[bytes] = None
+    for encoding, suffix in _ENCODINGS:
+        if encoding == "br" and brotli is None:
+            continue
+        if _fresh_sibling(path, suffix, src_stat) is not None:
+            continue
+        if data is None:
+            data = path.read_bytes()
+        if encoding == "br":
+            packed = brotli.compress(data, quality=BROTLI_QUALITY)
+        else:
+            packed = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+        _write_atomic(Path(f"{path}{suffix}"), packed)
+        written += 1
+    return written
+
+
+def _write_sidecar(directory: Path, entries: Dict[str, List]) -> None:
+    """Перезаписывает .etags.json каталога, если хэши изменились."""
+    if _load_sidecar(directory) == entries:
+        return
+    sidecar = directory / ETAG_SIDECAR
+    if not entries:
+        sidecar.unlink(missing_ok=True)
+        return
+    _write_atomic(sidecar, json.dumps(entries, sort_keys=True).encode("utf-8"))
+
+
+def precompress_dir(root: Path) -> int:
+    """
+    Предсжатие всех текстовых ассетов каталога; удаляет копии без оригинала.
+    Для всех файлов (и картинок) сохраняет хэши ETag в .etags.json по каталогам.
+    """
+    root = Path(root)
+    if not root.is_dir():
+        return 0
+    written = 0
+    digests: Dict[Path, Dict[str, List]] = {}
+    for path in root.rglob("*"):
+        if not path.is_file():
+            continue
+        if path.suffix in (".gz", ".br"):
+            original = path.with_suffix("")
+            if _is_compressible(original) and not original.exists():
+                path.unlink(missing_ok=True)
+            continue
+        if any(part.startswith(".") for part in path.relative_to(root).parts):
+            # .etags.json, временные файлы _write_atomic, служебные каталоги
+            continue
+        try:
+            written += precompress_file(path)
+            st = path.stat()
+            digests.setdefault(path.parent, {})[path.name] = [
+                st.st_mtime_ns, st.st_size, content_digest(path, st),
+            ]
+        except OSError as exc:
+            logger.warning(f"Не удалось сжать {path}: {exc}")
+    for directory, entries in digests.items():
+        try:
+            _write_sidecar(directory, entries)
+        except OSError as exc:
+            logger.warning(f"Не удалось сохранить ETag в {directory}: {exc}")
+    if written:
+        logger.info(f"✓ Предсжато {written} файлов в {root}")
+    return written
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles, отдающий предсжатые копии и ETag по содержимому."""
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        # get_response вызывает lookup_path в пуле потоков — там же готовим
+        # хэш для ETag, чтобы file_response (в event loop) не читал файл
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+            try:
+                content_digest(Path(full_path), stat_result)
+            except OSError as exc:
+                logger.warning(f"Не удалось посчитать ETag {full_path}: {exc}")
+        return full_path, stat_result
+
+    def file_response(self,
+                      full_path,
+                      stat_result: os.stat_result,
+                      scope,
+                      status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        path = Path(full_path)
+        media_type = mimetypes.guess_type(path.name)[0] or "text/plain"
+
+        served_path, served_stat, encoding = path, stat_result, None
+        compressible = _is_compressible(path)
+        if compressible:
+            accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+            for enc, suffix in _ENCODINGS:
+                if accepted.get(enc, 0.0) <= 0.0:
+                    continue
+                sibling_stat = _fresh_sibling(path, suffix, stat_result)
+                if sibling_stat is not None:
+                    served_path, served_stat, encoding = Path(f"{path}{suffix}"), sibling_stat, enc
+                    break
+
+        digest = cached_digest(path, stat_result) or stat_etag(stat_result)
+        headers = {"ETag": f'"{digest}-{encoding}"' if encoding else f'"{digest}"'}
+        if compressible:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        response = FileResponse(served_path, status_code=status_code, stat_result=served_stat,
+                                headers=headers, media_type=media_type)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
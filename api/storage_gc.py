@@ -0,0 +1,405 @@
+"""
+api/storage_gc.py — Фоновая уборка сгенерированных модулей и домов
+
+Что лежит на диске (MODULES_DIR = output/modules):
+
+  <type>/<module_id>/     файлы модуля (wall, window, door, balcony, wall_window…)
+  <type>_<module_id>.zip  архив модуля (запись реестра → zip_file)
+  houses/<house_id>/      файлы дома
+
+Проход GC:
+
+1. Сверка реестров с диском: записи без файлов удаляются из реестра;
+   папки и ZIP без записи (упавшие сборки, недописанные файлы, удалённые
+   через API модули) — сироты.  Сирота удаляется, только если не менялась
+   дольше ``orphan_grace_seconds``: идущая сборка пишет файлы раньше реестра.
+2. Политика хранения (всё выключено по умолчанию): возраст, число модулей и
+   домов, общий объём.  «Возраст» — время последнего использования: создание,
+   обновление дома или последнее скачивание (см. AccessLog).  Модули, на
+   которые ссылаются оставшиеся дома, не вытесняются.
+3. Удаление атомарно: сначала запись уходит из реестра, затем папка одним
+   rename переносится в ``output/.trash`` и только потом стирается.
+   Прерванный проход оставляет мусор лишь в .trash — он чистится следующим.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.generator.progress import stage
+from src.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Поля параметров дома со ссылками на модули (дверь хранится как
+# entrance_module_id, ассемблер принимает и door_module_id)
+HOUSE_MODULE_REFS = ("wall_module_id", "window_module_id", "entrance_module_id",
+                     "door_module_id", "balcony_module_id", "wall_window_module_id")
+
+GC_RECLAIMED = REGISTRY.counter(
+    "storage_gc_reclaimed_bytes_total", "Bytes freed by output garbage collection",
+)
+GC_DELETED = REGISTRY.counter(
+    "storage_gc_deleted_total", "Items removed by output garbage collection", ("kind",),
+)
+
+RegistryUpdate = Callable[[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]], None]
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.environ.get(name, "").strip()
+    return float(value) if value else None
+
+
+@dataclass
+class RetentionPolicy:
+    """Лимиты хранения; None — без ограничения."""
+    max_age_days: Optional[float] = None
+    max_modules: Optional[int] = None
+    max_houses: Optional[int] = None
+    max_bytes: Optional[int] = None
+    orphan_grace_seconds: float = 3600.0
+    interval_seconds: float = 3600.0        # период фонового прохода; 0 — выключен
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        """GC_MAX_AGE_DAYS, GC_MAX_MODULES, GC_MAX_HOUSES, GC_MAX_BYTES, GC_ORPHAN_GRACE, GC_INTERVAL."""
+        policy = cls()
+        max_age = _env_float("GC_MAX_AGE_DAYS")
+        max_modules = _env_float("GC_MAX_MODULES")
+        max_houses = _env_float("GC_MAX_HOUSES")
+        max_bytes = _env_float("GC_MAX_BYTES")
+        grace = _env_float("GC_ORPHAN_GRACE")
+        interval = _env_float("GC_INTERVAL")
+        policy.max_age_days = max_age
+        policy.max_modules = int(max_modules) if max_modules is not None else None
+        policy.max_houses = int(max_houses) if max_houses is not None else None
+        policy.max_bytes = int(max_bytes) if max_bytes is not None else None
+        if grace is not None:
+            policy.orphan_grace_seconds = grace
+        if interval is not None:
+            policy.interval_seconds = interval
+        return policy
+
+
+class AccessLog:
+    """Время последнего скачивания модулей и домов (id → unix time), в памяти + файл."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._times: Dict[str, float] = {}
+        self._dirty = False
+        try:
+            self._times = {str(k): float(v) for k, v in json.loads(self.path.read_text("utf-8")).items()}
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def touch(self, item_id: str) -> None:
+        with self._lock:
+            self._times[item_id] = time.time()
+            self._dirty = True
+
+    def get(self, item_id: str) -> Optional[float]:
+        with self._lock:
+            return self._times.get(item_id)
+
+    def forget(self, ids: Set[str]) -> None:
+        with self._lock:
+            for item_id in ids:
+                if self._times.pop(item_id, None) is not None:
+                    self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._times, ensure_ascii=False)
+            self._dirty = False
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def path_size(path: Path) -> int:
+    """Размер файла или папки целиком (байты)."""
+    try:
+        if path.is_file():
+            return path.stat().st_size
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.stat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+    except OSError:
+        return 0
+
+
+def _latest_mtime(path: Path) -> float:
+    """Последнее изменение папки или чего-либо в ней (для периода отсрочки сирот)."""
+    try:
+        latest = path.stat().st_mtime
+    except OSError:
+        return 0.0
+    if path.is_dir():
+        for root, dirs, files in os.walk(path):
+            for name in dirs + files:
+                try:
+                    latest = max(latest, os.stat(os.path.join(root, name)).st_mtime)
+                except OSError:
+                    pass
+    return latest
+
+
+def _parse_time(value: Any) -> float:
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class OutputGC:
+    """Сверка реестров с output/modules и вытеснение по политике хранения."""
+
+    def __init__(self,
+                 modules_dir: Path,
+                 trash_dir: Path,
+                 load_modules: Callable[[], List[Dict[str, Any]]],
+                 update_modules: RegistryUpdate,
+                 load_houses: Callable[[], List[Dict[str, Any]]],
+                 update_houses: RegistryUpdate,
+                 access_log: AccessLog,
+                 policy: Optional[RetentionPolicy] = None):
+        self.modules_dir = Path(modules_dir)
+        self.trash_dir = Path(trash_dir)
+        self._load_modules = load_modules
+        self._update_modules = update_modules
+        self._load_houses = load_houses
+        self._update_houses = update_houses
+        self.access_log = access_log
+        self.policy = policy or RetentionPolicy()
+        self._run_lock = threading.Lock()
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.total_reclaimed = 0
+        self.runs = 0
+
+    # ── Атомарное удаление ────────────────────────────────────────
+
+    def remove(self, path: Path) -> int:
+        """Переносит файл/папку в корзину одним rename и стирает; возвращает байты."""
+        path = Path(path)
+        if not path.exists():
+            return 0
+        size = path_size(path)
+        self.trash_dir.mkdir(parents=True, exist_ok=True)
+        target = self.trash_dir / f"{uuid.uuid4().hex[:8]}-{path.name}"
+        os.rename(path, target)
+        self._purge(target)
+        return size
+
+    def _purge(self, path: Path) -> None:
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+    def _empty_trash(self) -> int:
+        if not self.trash_dir.is_dir():
+            return 0
+        freed = 0
+        for leftover in self.trash_dir.iterdir():
+            freed += path_size(leftover)
+            self._purge(leftover)
+        return freed
+
+    # ── Проход ────────────────────────────────────────────────────
+
+    def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Один проход GC; при dry_run только отчёт о том, что было бы удалено."""
+        with self._run_lock, stage(None, "storage_gc"):
+            t0 = time.perf_counter()
+            report = self._run(dry_run)
+            report["duration"] = round(time.perf_counter() - t0, 3)
+            if not dry_run:
+                self.runs += 1
+                self.total_reclaimed += report["reclaimed_bytes"]
+                self.last_report = report
+            logger.info(
+                f"🧹 GC{' (dry run)' if dry_run else ''}: освобождено "
+                f"{report['reclaimed_bytes'] / 1e6:.1f} МБ, {report['deleted']}"
+            )
+            return report
+
+    def _run(self, dry_run: bool) -> Dict[str, Any]:
+        now = time.time()
+        deleted = {"orphan_dirs": 0, "orphan_zips": 0, "records": 0, "modules": 0, "houses": 0}
+        reclaimed = 0 if dry_run else self._empty_trash()
+
+        modules = self._load_modules()
+        houses = self._load_houses()
+        houses_dir = self.modules_dir / "houses"
+
+        # === 1. Записи без файлов ===
+        stale_modules = {
+            m.get("module_id") for m in modules
+            if not (self.modules_dir / str(m.get("module_type")) / str(m.get("module_id"))).is_dir()
+            and not (self.modules_dir / str(m.get("zip_file") or "")).is_file()
+        }
+        stale_houses = {h.get("house_id") for h in houses
+                        if not (houses_dir / str(h.get("house_id"))).is_dir()}
+        modules = [m for m in modules if m.get("module_id") not in stale_modules]
+        houses = [h for h in houses if h.get("house_id") not in stale_houses]
+        deleted["records"] = len(stale_modules) + len(stale_houses)
+
+        # === 2. Вытеснение по политике (сначала дома — они держат модули) ===
+        evict_houses = self._select(
+            [(h["house_id"], self._last_used(h["house_id"], h.get("created_at"), h.get("updated_at")))
+             for h in houses],
+            self.policy.max_houses, now,
+        )
+        houses = [h for h in houses if h.get("house_id") not in evict_houses]
+        pinned: Set[str] = {str(h.get("params", {}).get(ref)) for h in houses
+                            for ref in HOUSE_MODULE_REFS if h.get("params", {}).get(ref)}
+        evict_modules = self._select(
+            [(m["module_id"], self._last_used(m["module_id"], m.get("created_at")))
+             for m in modules if m.get("module_id") not in pinned],
+            self.policy.max_modules, now,
+        )
+        evict_houses, evict_modules = self._apply_byte_budget(
+            houses, modules, pinned, evict_houses, evict_modules)
+        houses = [h for h in houses if h.get("house_id") not in evict_houses]
+        modules = [m for m in modules if m.get("module_id") not in evict_modules]
+        deleted["houses"] = len(evict_houses)
+        deleted["modules"] = len(evict_modules)
+
+        # === 3. Сначала реестры, потом файлы ===
+        drop_modules = stale_modules | evict_modules
+        drop_houses = stale_houses | evict_houses
+        if not dry_run:
+            if drop_modules:
+                self._update_modules(lambda ms: [m for m in ms if m.get("module_id") not in drop_modules])
+            if drop_houses:
+                self._update_houses(lambda hs: [h for h in hs if h.get("house_id") not in drop_houses])
+            self.access_log.forget({str(i) for i in drop_modules | drop_houses})
+            # Реестр мог измениться, пока мы считали: живые — по свежему чтению
+            modules = self._load_modules()
+            houses = self._load_houses()
+
+        # === 4. Сироты и файлы вытесненных ===
+        live_dirs: Set[Path] = {self.modules_dir / str(m.get("module_type")) / str(m.get("module_id"))
+                                for m in modules}
+        live_dirs |= {houses_dir / str(h.get("house_id")) for h in houses}
+        # Модули, на которые ссылаются дома, нужны для их обновления — даже без записи
+        referenced = {str(h.get("params", {}).get(ref)) for h in houses
+                      for ref in HOUSE_MODULE_REFS if h.get("params", {}).get(ref)}
+        live_zips = {str(m.get("zip_file")) for m in modules if m.get("zip_file")}
+
+        for path in self._module_dirs():
+            if path in live_dirs or (path.parent != houses_dir and path.name in referenced):
+                continue
+            evicted = path.name in evict_modules or path.name in evict_houses
+            if not evicted and now - _latest_mtime(path) < self.policy.orphan_grace_seconds:
+                continue
+            reclaimed += path_size(path) if dry_run else self.remove(path)
+            if not evicted:
+                deleted["orphan_dirs"] += 1
+
+        for path in self.modules_dir.glob("*.zip"):
+            if path.name in live_zips:
+                continue
+            evicted = path.stem.rsplit("_", 1)[-1] in evict_modules
+            if not evicted and now - _latest_mtime(path) < self.policy.orphan_grace_seconds:
+                continue
+            reclaimed += path_size(path) if dry_run else self.remove(path)
+            if not evicted:
+                deleted["orphan_zips"] += 1
+
+        if not dry_run:
+            self.access_log.flush()
+            GC_RECLAIMED.inc(reclaimed)
+            for kind, n in deleted.items():
+                if n:
+                    GC_DELETED.inc(n, kind=kind)
+
+        return {
+            "dry_run": dry_run,
+            "finished_at": datetime.now().isoformat(),
+            "reclaimed_bytes": reclaimed,
+            "deleted": deleted,
+            "evicted_module_ids": sorted(evict_modules),
+            "evicted_house_ids": sorted(evict_houses),
+        }
+
+    def _module_dirs(self) -> List[Path]:
+        """Папки вида <type>/<id> (включая houses/<id>)."""
+        dirs: List[Path] = []
+        for type_dir in self.modules_dir.iterdir():
+            if type_dir.is_dir() and not type_dir.name.startswith("."):
+                dirs.extend(p for p in type_dir.iterdir() if p.is_dir())
+        return dirs
+
+    def _last_used(self, item_id: str, *stamps: Any) -> float:
+        used = max((_parse_time(s) for s in stamps if s), default=0.0)
+        return max(used, self.access_log.get(item_id) or 0.0)
+
+    def _select(self, items: List[Tuple[str, float]], max_count: Optional[int], now: float) -> Set[str]:
+        """id для вытеснения по возрасту и числу; items — (id, last_used)."""
+        evict: Set[str] = set()
+        if self.policy.max_age_days is not None:
+            cutoff = now - self.policy.max_age_days * 86400
+            evict |= {item[0] for item in items if item[1] < cutoff}
+        if max_count is not None:
+            kept = sorted((i for i in items if i[0] not in evict), key=lambda i: i[1], reverse=True)
+            evict |= {item[0] for item in kept[max_count:]}
+        return evict
+
+    def _apply_byte_budget(self, houses, modules, pinned, evict_houses, evict_modules):
+        """Вытесняет давно не использованные дома и модули, пока объём выше max_bytes."""
+        if self.policy.max_bytes is None:
+            return evict_houses, evict_modules
+        houses_dir = self.modules_dir / "houses"
+        candidates: List[Tuple[float, str, str, int]] = []
+        total = 0
+        for h in houses:
+            if h["house_id"] in evict_houses:
+                continue
+            size = path_size(houses_dir / h["house_id"])
+            total += size
+            candidates.append((self._last_used(h["house_id"], h.get("created_at"), h.get("updated_at")),
+                               "house", h["house_id"], size))
+        for m in modules:
+            if m["module_id"] in evict_modules:
+                continue
+            size = path_size(self.modules_dir / m["module_type"] / m["module_id"])
+            if m.get("zip_file"):
+                size += path_size(self.modules_dir / m["zip_file"])
+            total += size
+            if m["module_id"] not in pinned:
+                candidates.append((self._last_used(m["module_id"], m.get("created_at")),
+                                   "module", m["module_id"], size))
+        evict_houses, evict_modules = set(evict_houses), set(evict_modules)
+        for _, kind, item_id, size in sorted(candidates):
+            if total <= self.policy.max_bytes:
+                break
+            (evict_houses if kind == "house" else evict_modules).add(item_id)
+            total -= size
+        return evict_houses, evict_modules
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "policy": asdict(self.policy),
+            "runs": self.runs,
+            "total_reclaimed_bytes": self.total_reclaimed,
+            "last_report": self.last_report,
+        }
@@ -0,0 +1,118 @@
+"""Chamfer micro-benchmark: dense cdist vs tiled chamfer_distance (forward + backward).
+
+For each point count, times both implementations on random clouds and reports
+the peak memory of one step (measured on CUDA; the size of the largest
+distance block otherwise).  Values and gradients of both are compared with the
+dense version evaluated in float64 (float32 cdist alone is only accurate to
+~1e-3 for close points); the error is relative, in L2 norm over the batch.
+The dense version is skipped above --dense-max points, where its B × N × N
+matrix stops fitting.  Exits non-zero when the tiled error exceeds --tol.
+
+    python scripts/bench_chamfer.py --points 1024 2048 4096 16384 --batch 8
+    python scripts/bench_chamfer.py --device cuda --tile 2048
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+_REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_REPO))
+
+import torch  # noqa: E402
+
+from src.generator.ai.chamfer import CHAMFER_TILE, chamfer_distance, chamfer_distance_dense  # noqa: E402
+
+
+def _sync(device: torch.device) -> None:
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+def _step(fn, a: torch.Tensor, b: torch.Tensor, device: torch.device):
+    """One forward + backward; returns (seconds, peak bytes or None, value, grads)."""
+    a = a.detach().requires_grad_(True)
+    b = b.detach().requires_grad_(True)
+    if device.type == "cuda":
+        torch.cuda.reset_peak_memory_stats(device)
+    _sync(device)
+    t0 = time.perf_counter()
+    value = fn(a, b)
+    value.mean().backward()
+    _sync(device)
+    elapsed = time.perf_counter() - t0
+    peak = torch.cuda.max_memory_allocated(device) if device.type == "cuda" else None
+    return elapsed, peak, value.detach(), (a.grad, b.grad)
+
+
+def _bench(fn, a, b, device, runs: int):
+    _step(fn, a, b, device)  # warm-up (allocator, kernels)
+    results = [_step(fn, a, b, device) for _ in range(runs)]
+    return statistics.median(r[0] for r in results), results[-1]
+
+
+def _rel_diff(x: torch.Tensor, ref: torch.Tensor) -> float:
+    ref = ref.double()
+    return ((x.double() - ref).norm() / ref.norm().clamp_min(1e-300)).item()
+
+
+def _error(value, grads, ref_value, ref_grads) -> float:
+    return max(_rel_diff(value, ref_value), *(_rel_diff(g, r) for g, r in zip(grads, ref_grads)))
+
+
+def _mb(nbytes: float) -> str:
+    return f"{nbytes / 2**20:,.0f} MB"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--points", type=int, nargs="+", default=[1024, 2048, 4096, 16384],
+                    help="points per cloud (N = M)")
+    ap.add_argument("--batch", type=int, default=8)
+    ap.add_argument("--tile", type=int, default=CHAMFER_TILE)
+    ap.add_argument("--runs", type=int, default=3, help="timed runs per case (median)")
+    ap.add_argument("--dense-max", type=int, default=4096,
+                    help="skip the dense version above this many points")
+    ap.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    ap.add_argument("--tol", type=float, default=1e-3,
+                    help="max relative error of the tiled values/gradients vs float64 dense")
+    args = ap.parse_args()
+
+    device = torch.device(args.device)
+    torch.manual_seed(0)
+    tiled = lambda a, b: chamfer_distance(a, b, args.tile)  # noqa: E731
+    failed = False
+
+    print(f"device {device}, batch {args.batch}, tile {args.tile}, runs {args.runs}")
+    for n in args.points:
+        a = torch.rand(args.batch, n, 3, device=device) * 2 - 1
+        b = torch.rand(args.batch, n, 3, device=device) * 2 - 1
+
+        t_tiled, (_, peak, value, grads) = _bench(tiled, a, b, device, args.runs)
+        block = args.batch * min(n, args.tile) ** 2 * a.element_size()
+        line = (f"N={n:>6}: tiled {t_tiled * 1000:8.1f} ms, "
+                f"peak {_mb(peak) if peak is not None else '~' + _mb(block)}")
+
+        if n <= args.dense_max:
+            t_dense, (_, d_peak, d_value, d_grads) = _bench(chamfer_distance_dense, a, b, device, args.runs)
+            _, _, ref_value, ref_grads = _step(chamfer_distance_dense, a.double(), b.double(), device)
+            matrix = args.batch * n * n * a.element_size()
+            err = _error(value, grads, ref_value, ref_grads)
+            d_err = _error(d_value, d_grads, ref_value, ref_grads)
+            line += (f" | dense {t_dense * 1000:8.1f} ms, "
+                     f"peak {_mb(d_peak) if d_peak is not None else '~' + _mb(matrix)}"
+                     f" | rel err tiled {err:.1e}, dense {d_err:.1e}")
+            if err > args.tol:
+                line += "  FAIL"
+                failed = True
+        else:
+            line += " | dense skipped"
+        print(line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
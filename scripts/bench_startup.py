@@ -0,0 +1,78 @@
+"""Cold-start benchmark: time `import api.server` in fresh interpreters.
+
+Guards against regressions where a heavy library (trimesh, numpy, PIL, torch,
+open3d, ...) sneaks back into the server's import path.  Exits non-zero when
+the median import time exceeds --max-seconds or a forbidden module is loaded.
+
+    python scripts/bench_startup.py --runs 5 --max-seconds 1.5
+    python scripts/bench_startup.py --warmup      # also time api.server.warm_up()
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+_REPO = Path(__file__).resolve().parents[1]
+
+# Must stay out of the server's import path; they load on first generation.
+HEAVY_MODULES = ("torch", "open3d", "trimesh", "numpy", "PIL", "scipy", "networkx",
+                 "matplotlib", "requests")
+
+_PROBE = """
+import json, logging, sys, time
+logging.disable(logging.CRITICAL)
+t0 = time.perf_counter()
+import api.server
+result = {"import": time.perf_counter() - t0,
+          "loaded": [m for m in HEAVY if m in sys.modules]}
+if WARMUP:
+    t0 = time.perf_counter()
+    result["warmup_steps"] = api.server.warm_up()
+    result["warmup"] = time.perf_counter() - t0
+print(json.dumps(result))
+"""
+
+
+def _probe(warmup: bool) -> dict:
+    code = f"HEAVY = {HEAVY_MODULES!r}\nWARMUP = {warmup!r}\n{_PROBE}"
+    env = {**os.environ, "PYTHONPATH": str(_REPO), "SERVER_WARMUP": "off"}
+    out = subprocess.run([sys.executable, "-c", code], cwd=_REPO, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5, help="fresh interpreters to time")
+    ap.add_argument("--max-seconds", type=float, default=None,
+                    help="fail if the median import time is above this")
+    ap.add_argument("--warmup", action="store_true", help="also time warm_up() in each run")
+    args = ap.parse_args()
+
+    runs = [_probe(args.warmup) for _ in range(max(1, args.runs))]
+    imports = [r["import"] for r in runs]
+    median = statistics.median(imports)
+    print(f"import api.server: median {median * 1000:.0f} ms "
+          f"(min {min(imports) * 1000:.0f}, max {max(imports) * 1000:.0f}, runs {len(runs)})")
+    if args.warmup:
+        warm = statistics.median(r["warmup"] for r in runs)
+        print(f"warm_up(): median {warm * 1000:.0f} ms, last run steps {runs[-1]['warmup_steps']}")
+
+    failed = False
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    if loaded:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(loaded)}")
+        failed = True
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"FAIL: median import {median:.3f}s > {args.max_seconds:.3f}s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
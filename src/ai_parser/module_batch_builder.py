@@ -2,14 +2,15 @@
 Сборка секции конфига процедурного оркестратора из params API/UI.
 Полная схема: docs/procedural_orchestrator_params.txt
 Поддерживаемые ключи экспортёров передаются плоским dict и/или через вложенный ``texture``.
+Шаблоны берутся из кэша ``src.config.templates.TEMPLATES`` (без разбора файла на вызов).
 """
 from __future__ import annotations
 
-import copy
-import json
 from pathlib import Path
 from typing import Any, Callable, Dict, Mapping, Optional, Tuple
 
+from src.config.templates import BALCONY_CERAMIC_TEMPLATE, GENERATOR_TEMPLATE, TEMPLATES, deep_merge, thaw
+
 ALL_BATCH_SECTIONS = ("balcony", "entrance", "entrance_textured", "window", "wall", "wall_window", "roof")
 
 __all__ = [
@@ -21,16 +22,6 @@ __all__ = [
 ]
 
 
-def deep_merge(base: Mapping[str, Any], overlay: Mapping[str, Any]) -> Dict[str, Any]:
-    out: Dict[str, Any] = dict(base)
-    for k, v in overlay.items():
-        if isinstance(v, dict) and isinstance(out.get(k), dict):
-            out[k] = deep_merge(out[k], v)
-        else:
-            out[k] = copy.deepcopy(v) if isinstance(v, (dict, list)) else v
-    return out
-
-
 API_TO_BATCH_SECTION: Dict[str, str] = {
     "wall": "wall",
     "window": "window",
@@ -43,10 +34,10 @@ API_TO_BATCH_SECTION: Dict[str, str] = {
 
 
 def _split_overlay(params: Mapping[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
-    flat = {k: copy.deepcopy(v) for k, v in params.items() if k != "texture"}
+    flat = {k: thaw(v) for k, v in params.items() if k != "texture"}
     tex = params.get("texture")
     if isinstance(tex, dict):
-        return flat, copy.deepcopy(tex)
+        return flat, thaw(tex)
     return flat, None
 
 
@@ -56,10 +47,9 @@ def _maybe_hex_rgb(hex_to_rgb: Callable[[str], list], hex_str: Optional[str]) ->
     return hex_to_rgb(hex_str.strip())
 
 
-def _load_json(p: Path) -> Dict[str, Any]:
-    if not p.is_file():
-        return {}
-    return json.loads(p.read_text(encoding="utf-8"))
+def _load_template(p: Path) -> Mapping[str, Any]:
+    """Замороженный шаблон из кэша; {} если файла нет."""
+    return TEMPLATES.get_optional(p) or {}
 
 
 def build_section_for_api_module(
@@ -75,11 +65,9 @@ def build_section_for_api_module(
     if not section_key:
         raise ValueError(f"Unknown API module_type: {module_type_api}")
 
-    cfg_path = batch_defaults_path or (
-        project_root / "scripts" / "balcony_examples" / "batch_generators_config.json"
-    )
-    tpl_root = _load_json(cfg_path)
-    sub = copy.deepcopy(tpl_root[section_key]) if isinstance(tpl_root.get(section_key), dict) else {}
+    cfg_path = batch_defaults_path or (project_root / "scripts" / "balcony_examples" / GENERATOR_TEMPLATE.name)
+    tpl_root = _load_template(cfg_path)
+    sub = thaw(tpl_root[section_key]) if isinstance(tpl_root.get(section_key), Mapping) else {}
     overlay_flat, overlay_tex = _split_overlay(params)
     sub_wo_ent = {
         k: v
@@ -169,8 +157,8 @@ def build_section_for_api_module(
             section["texture"] = deep_merge(section.get("texture") or {}, overlay_tex)
 
     elif module_type_api == "balcony":
-        ceramic = project_root / "scripts" / "balcony_examples" / "batch_balcony_ceramic_tile.json"
-        tpl_b = copy.deepcopy(_load_json(ceramic).get("balcony") or {})
+        ceramic = project_root / "scripts" / "balcony_examples" / BALCONY_CERAMIC_TEMPLATE.name
+        tpl_b = thaw(_load_template(ceramic).get("balcony") or {})
         defaults = {"enabled": True, "out_dir": str(output_dir), "no_view": True}
         section = deep_merge(tpl_b, {})
         section = deep_merge(section, defaults)
@@ -3,12 +3,13 @@ parser_modules.py — DeepSeek интеграция для парсинга ОТ
 Переписано для извлечения параметров модулей (стена, окно, дверь, балкон, вход)
 """
 
-import requests
 import json
 import re
 import logging
 from typing import Dict, Any, Optional
 
+from src.tracing import span
+
 logger = logging.getLogger(__name__)
 
 # ⚠️ ВАЖНО: Замени на твой реальный API ключ
@@ -133,15 +134,18 @@ def send_module_text_to_deepseek(text: str, module_type: Optional[str] = None) -
         "max_tokens": 500
     }
 
+    import requests  # грузится только при реальном обращении к API
+
     try:
         logger.info(f"DeepSeek: парсим модуль '{text[:50]}...'")
 
-        response = requests.post(
-            DEEPSEEK_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
+        with span("deepseek", cat="http", request="module", module_type=module_type):
+            response = requests.post(
+                DEEPSEEK_API_URL,
+                headers=headers,
+                json=payload,
+                timeout=30
+            )
 
         if response.status_code == 402:
             logger.warning("DeepSeek: недостаточно средств на балансе (402) — module parse")
@@ -286,9 +290,12 @@ User description: "{text}"
         "max_tokens": 400,
     }
 
+    import requests  # грузится только при реальном обращении к API
+
     try:
         logger.info(f"DeepSeek: парсим здание '{text[:60]}'")
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=20)
+        with span("deepseek", cat="http", request="building"):
+            response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=20)
 
         if response.status_code == 402:
             logger.warning("DeepSeek: недостаточно средств на балансе (402) — используется regex fallback")
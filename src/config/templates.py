@@ -0,0 +1,172 @@
+"""
+templates.py — Cached, validated, frozen generator config templates
+
+The procedural batch runner is driven by JSON templates
+(``scripts/balcony_examples/*.json``).  Every module generation used to
+re-open and re-parse them and deep-copy the result; ``TemplateStore`` loads
+each file once, validates it, freezes it (read-only mappings and tuples) and
+hands out the same frozen object until the file's mtime/size changes, at
+which point it is reloaded.  A reload that fails validation keeps serving the
+last good version.
+
+Per-request configs are built from the frozen template with ``thaw`` (a plain
+recursive copy, several times cheaper than ``copy.deepcopy``) and
+``deep_merge``, which only descends into subtrees the overlay actually
+touches and leaves everything else shared with the base.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from src.config.paths import ROOT
+from src.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = ROOT / "scripts" / "balcony_examples"
+GENERATOR_TEMPLATE = TEMPLATES_DIR / "batch_generators_config.json"
+BALCONY_CERAMIC_TEMPLATE = TEMPLATES_DIR / "batch_balcony_ceramic_tile.json"
+
+TEMPLATE_LOADS = REGISTRY.counter(
+    "template_loads_total", "Generator template (re)loads from disk", ("template", "result"),
+)
+
+Validator = Callable[[Mapping[str, Any]], None]
+
+
+class TemplateError(ValueError):
+    """A template file is not a valid generator config."""
+
+
+def freeze(value: Any) -> Any:
+    """Read-only view of a JSON value: dicts → mappingproxy, lists → tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+# Exact-type dispatch: isinstance() against the Mapping ABC dominates the
+# cost of copying small JSON trees.
+_MAPPINGS = frozenset((dict, MappingProxyType))
+_SEQUENCES = frozenset((list, tuple))
+_CONTAINERS = _MAPPINGS | _SEQUENCES
+
+
+def _is_mapping(value: Any) -> bool:
+    return type(value) in _MAPPINGS or isinstance(value, Mapping)
+
+
+def thaw(value: Any) -> Any:
+    """Mutable copy of a (possibly frozen) JSON value."""
+    t = type(value)
+    if t in _MAPPINGS:
+        return {k: thaw(v) if type(v) in _CONTAINERS else v for k, v in value.items()}
+    if t in _SEQUENCES:
+        return [thaw(v) if type(v) in _CONTAINERS else v for v in value]
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    return value
+
+
+def deep_merge(base: Mapping[str, Any], overlay: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    ``base`` with ``overlay`` merged in, recursively for nested mappings.
+
+    Only keys present in ``overlay`` are visited; subtrees of ``base`` that
+    the overlay does not touch (or sets to the very same object) are shared
+    with the result, not copied.  Values taken from ``overlay`` are copied.
+    """
+    out: Dict[str, Any] = dict(base)
+    for k, v in overlay.items():
+        current = out.get(k)
+        if v is current:
+            continue
+        if _is_mapping(v) and _is_mapping(current):
+            out[k] = deep_merge(current, v)
+        elif type(v) in _CONTAINERS or isinstance(v, Mapping):
+            out[k] = thaw(v)
+        else:
+            out[k] = v
+    return out
+
+
+def validate_generator_template(data: Mapping[str, Any]) -> None:
+    """A batch runner config: {section: {... "enabled": bool, "texture": {...}}}."""
+    if not isinstance(data, Mapping):
+        raise TemplateError("top level must be an object of generator sections")
+    for name, section in data.items():
+        if not isinstance(section, Mapping):
+            raise TemplateError(f"section '{name}' must be an object")
+        if "enabled" in section and not isinstance(section["enabled"], bool):
+            raise TemplateError(f"section '{name}': 'enabled' must be true/false")
+        if "texture" in section and not isinstance(section["texture"], Mapping):
+            raise TemplateError(f"section '{name}': 'texture' must be an object")
+
+
+class _Entry:
+    __slots__ = ("signature", "value")
+
+    def __init__(self, signature: Tuple[int, int], value: Mapping[str, Any]):
+        self.signature = signature
+        self.value = value
+
+
+class TemplateStore:
+    """Frozen templates by path, reloaded when the file changes on disk."""
+
+    def __init__(self, validator: Optional[Validator] = validate_generator_template):
+        self.validator = validator
+        self._lock = threading.Lock()
+        self._entries: Dict[Path, _Entry] = {}
+
+    def get(self, path: Path, label: str = "Template") -> Mapping[str, Any]:
+        """Frozen template; FileNotFoundError if the file is missing."""
+        path = Path(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            raise FileNotFoundError(f"{label} not found: {path}") from None
+        signature = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry.value
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                return entry.value
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if self.validator is not None:
+                    self.validator(data)
+            except (ValueError, OSError) as exc:
+                TEMPLATE_LOADS.inc(template=path.name, result="invalid")
+                if entry is None:
+                    raise TemplateError(f"{label} {path}: {exc}") from exc
+                logger.error(f"{label} {path} is invalid ({exc}); keeping the previous version")
+                # Remember the bad signature so the file is not re-parsed on every call
+                entry.signature = signature
+                return entry.value
+            entry = _Entry(signature, freeze(data))
+            self._entries[path] = entry
+            TEMPLATE_LOADS.inc(template=path.name, result="ok")
+            logger.info(f"Template loaded: {path.name}")
+            return entry.value
+
+    def get_optional(self, path: Path, label: str = "Template") -> Optional[Mapping[str, Any]]:
+        """Like get(), but None when the file does not exist."""
+        try:
+            return self.get(path, label)
+        except FileNotFoundError:
+            return None
+
+
+TEMPLATES = TemplateStore()
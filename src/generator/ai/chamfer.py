@@ -0,0 +1,79 @@
+# chamfer.py
+# Chamfer distance for point-cloud batches: dense, memory-bounded tiled, and KD-tree (evaluation).
+
+import torch
+
+# Points per tile on each side: the search never holds more than
+# B × CHAMFER_TILE × CHAMFER_TILE distances at once (8 × 1024² × 4 B = 32 MB).
+CHAMFER_TILE = 1024
+
+
+def chamfer_distance_dense(A, B):
+    """Chamfer Distance между двумя облаками точек (A, B: (B, N, 3)); полная матрица cdist."""
+    # Расстояния от A к B
+    dist1 = torch.cdist(A, B).min(dim=2)[0].mean(dim=1)  # (B,)
+    # Расстояния от B к A
+    dist2 = torch.cdist(B, A).min(dim=2)[0].mean(dim=1)  # (B,)
+    return dist1 + dist2
+
+
+def nearest_indices(A, B, tile=CHAMFER_TILE):
+    """
+    Index into B of the nearest neighbour of every point of A, (B, N) long.
+    Computed tile by tile without autograd, so memory is O(B × tile²).
+    """
+    with torch.no_grad():
+        batch, n, _ = A.shape
+        m = B.shape[1]
+        idx = torch.empty(batch, n, dtype=torch.long, device=A.device)
+        for i in range(0, n, tile):
+            a = A[:, i:i + tile]
+            best = torch.full(a.shape[:2], float("inf"), dtype=A.dtype, device=A.device)
+            best_idx = torch.zeros(a.shape[:2], dtype=torch.long, device=A.device)
+            for j in range(0, m, tile):
+                d, k = torch.cdist(a, B[:, j:j + tile]).min(dim=2)
+                closer = d < best          # strict: ties keep the lower index, like min()
+                best = torch.where(closer, d, best)
+                best_idx = torch.where(closer, k + j, best_idx)
+            idx[:, i:i + tile] = best_idx
+        return idx
+
+
+def _nearest_distances(A, B, tile):
+    idx = nearest_indices(A.detach(), B.detach(), tile)
+    nearest = torch.gather(B, 1, idx.unsqueeze(-1).expand(-1, -1, B.shape[2]))
+    # Only the winning pairs enter the graph: the same terms (and gradients)
+    # the dense min() selects, without the B × N × M matrix
+    return (A - nearest).norm(dim=2)
+
+
+def chamfer_distance(A, B, tile=CHAMFER_TILE):
+    """
+    Chamfer Distance (A, B: (B, N, 3) / (B, M, 3)) → (B,), differentiable in A and B.
+
+    Up to tile × tile points it is the dense version; beyond that the
+    nearest-neighbour search runs in tiles and only the selected pairs are
+    differentiated, so values and gradients match the dense version while
+    memory stays O(B × tile²). tile=None forces the dense version.
+    """
+    if tile is None or A.shape[1] * B.shape[1] <= tile * tile:
+        return chamfer_distance_dense(A, B)
+    return _nearest_distances(A, B, tile).mean(dim=1) + _nearest_distances(B, A, tile).mean(dim=1)
+
+
+def chamfer_distance_kdtree(A, B):
+    """
+    Evaluation-only Chamfer Distance via scipy's cKDTree (no gradients, CPU),
+    O((N + M) log M) per cloud. Accepts tensors or arrays, returns a (B,) tensor.
+    """
+    import numpy as np
+    from scipy.spatial import cKDTree
+
+    a = A.detach().cpu().numpy() if torch.is_tensor(A) else np.asarray(A)
+    b = B.detach().cpu().numpy() if torch.is_tensor(B) else np.asarray(B)
+    out = np.empty(len(a), dtype=np.float64)
+    for i in range(len(a)):
+        d1, _ = cKDTree(b[i]).query(a[i], k=1)
+        d2, _ = cKDTree(a[i]).query(b[i], k=1)
+        out[i] = d1.mean() + d2.mean()
+    return torch.from_numpy(out)
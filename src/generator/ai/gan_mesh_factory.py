@@ -1,4 +1,9 @@
 # gan_mesh_factory.py
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
 import torch
 import numpy as np
 from src.generator.ai.uv_export import apply_uv
@@ -8,40 +13,95 @@ from src.generator.ai.reconstruct_meshes import Generator, FITTERS, LATENT_DIM,
 
 
 # ===============================
-# Функция генерации точек + фиттинг
+# Реестр моделей генератора
 # ===============================
-def generate_mesh_from_points(shape_name: str):
+class GeneratorRegistry:
+    """
+    Генераторы cGAN, загруженные один раз на процесс.
+
+    Ключ — (путь, mtime чекпойнта): новый файл модели подхватывается при
+    следующем вызове, прежняя версия выбрасывается.  Модель в eval-режиме и
+    без градиентов, поэтому одну и ту же можно звать из нескольких потоков.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[Tuple[str, int], Generator] = {}
+
+    def get(self, path=MODEL_PATH) -> Generator:
+        path = Path(path).resolve()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            raise FileNotFoundError(f"[GAN] Модель не найдена: {path}") from None
+        key = (str(path), mtime)
+        model = self._models.get(key)
+        if model is not None:
+            return model
 
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+            model = Generator(LATENT_DIM, COND_DIM, NUM_POINTS, len(CLASSES)).to(DEVICE)
+            ckpt = torch.load(path, map_location=DEVICE)
+            model.load_state_dict(ckpt["G"] if "G" in ckpt else ckpt)
+            model.eval()
+            model.requires_grad_(False)
+            # Старые версии того же файла больше не нужны
+            for old in [k for k in self._models if k[0] == key[0]]:
+                del self._models[old]
+            self._models[key] = model
+            print(f"[GAN] Модель загружена: {path.name}")
+            return model
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+MODELS = GeneratorRegistry()
+
+
+def class_id_for(shape_name: Optional[str]) -> int:
+    """id класса по имени формы ('cube', 'sphere', ...)."""
     if not shape_name:
         raise ValueError("[GAN] shape_name = None (ошибка вызова API)")
     shape_name = shape_name.lower()
-    """
-    shape_name: 'cube', 'sphere', 'torus' и т.д.
-    Возвращает: open3d.geometry.TriangleMesh
-    """
-
-    # ищем id класса
-    class_id = None
     for k, n in CLASSES.items():
         if n == shape_name:
-            class_id = k
-            break
+            return k
+    raise ValueError(f"[GAN] Нет класса: {shape_name}")
+
 
-    if class_id is None:
-        raise ValueError(f"[GAN] Нет класса: {shape_name}")
+def generate_batch(class_ids: Sequence[int], n: int = 1, path=MODEL_PATH) -> np.ndarray:
+    """
+    Облака точек для каждого класса из class_ids, по n штук, за один прямой проход.
+    Возвращает массив (len(class_ids), n, NUM_POINTS, 3).
+    """
+    if n < 1 or not class_ids:
+        return np.zeros((len(class_ids), max(n, 0), NUM_POINTS, 3), dtype=np.float32)
+    generator = MODELS.get(path)
+    labels = torch.as_tensor(list(class_ids), dtype=torch.long, device=DEVICE).repeat_interleave(n)
+    with torch.inference_mode():
+        z = torch.randn(len(labels), LATENT_DIM, device=DEVICE)
+        pts = generator(z, labels).cpu().numpy()
+    return pts.reshape(len(class_ids), n, NUM_POINTS, 3)
 
-    # загружаем модель
-    generator = Generator(LATENT_DIM, COND_DIM, NUM_POINTS, len(CLASSES)).to(DEVICE)
-    ckpt = torch.load(MODEL_PATH, map_location=DEVICE)
-    generator.load_state_dict(ckpt["G"] if "G" in ckpt else ckpt)
-    generator.eval()
 
-    # 1 генерируем точки
-    z = torch.randn(1, LATENT_DIM, device=DEVICE)
-    label = torch.tensor([class_id], dtype=torch.long, device=DEVICE)
+# ===============================
+# Функция генерации точек + фиттинг
+# ===============================
+def generate_mesh_from_points(shape_name: str):
+    """
+    shape_name: 'cube', 'sphere', 'torus' и т.д.
+    Возвращает: open3d.geometry.TriangleMesh
+    """
+    class_id = class_id_for(shape_name)
+    shape_name = shape_name.lower()
 
-    with torch.no_grad():
-        pts = generator(z, label).cpu().numpy()[0]
+    # 1 генерируем точки (модель — из MODELS, загружается один раз)
+    pts = generate_batch([class_id], 1)[0, 0]
 
     if pts.size == 0 or np.isnan(pts).any():
         raise RuntimeError("[GAN] Пустое облако точек!")
@@ -72,4 +132,4 @@ def create_shape(shape: str, color: str | list, texture: str | None):
     return result
 
 if __name__ == "__main__":
-    generate_mesh_from_points("cube")
\ No newline at end of file
+    generate_mesh_from_points("cube")
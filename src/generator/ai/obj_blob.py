@@ -0,0 +1,145 @@
+# obj_blob.py
+# In-memory reader for the OBJ BLOBs stored in objects_data.db (no temp files, no trimesh).
+
+import re
+
+import numpy as np
+
+# Only geometry matters here: "v x y z [...]" and "f a[/t[/n]] b c [...]".
+# Lines are classified and gathered on the raw byte array, so the only
+# per-number Python work left is numpy's string → number conversion.
+_IS_WS = np.zeros(256, dtype=bool)
+_IS_WS[[9, 10, 11, 12, 13, 32]] = True
+# Whitespace that may indent a line (everything but the newline)
+_IS_INDENT = _IS_WS.copy()
+_IS_INDENT[10] = False
+# "/vt/vn" suffixes of face tokens
+_F_REFS = re.compile(rb"/[^ \t\r\n]*")
+
+
+def _gather(buf, starts, ends, keep):
+    """Bytes of the kept lines (keyword blanked out) and the tokens per kept line."""
+    s = starts[keep]
+    lengths = ends[keep] - s + 1                    # up to and including the newline
+    if len(s) == 0:
+        return np.zeros(0, dtype=np.uint8), lengths
+    offsets = np.cumsum(lengths) - lengths
+    idx = np.repeat(s - offsets, lengths) + np.arange(lengths.sum())
+    text = buf[idx]
+    text[offsets] = 32                              # "v"/"f" → " "
+    return text, lengths
+
+
+def _tokens_per_line(text, lengths):
+    ws = _IS_WS[text]
+    token_start = ~ws & np.concatenate(([True], ws[:-1]))
+    line = np.repeat(np.arange(len(lengths)), lengths)
+    return np.bincount(line[token_start], minlength=len(lengths))
+
+
+def _blank_comments(buf, ends):
+    """Copy of buf with every "# ..." comment (up to the newline) blanked out."""
+    hashes = np.flatnonzero(buf == ord("#"))
+    line = np.searchsorted(ends, hashes)
+    first = np.concatenate(([True], line[1:] != line[:-1]))
+    # From the first "#" of each commented line up to (not including) its newline
+    begin = hashes[first]
+    lengths = ends[line[first]] - begin
+    offsets = np.cumsum(lengths) - lengths
+    buf = buf.copy()
+    buf[np.repeat(begin - offsets, lengths) + np.arange(lengths.sum())] = 32
+    return buf
+
+
+def _first3(flat, counts):
+    """(n, 3) from rows of varying length: first three numbers of each row."""
+    starts = np.cumsum(counts) - counts
+    return flat[starts[:, None] + np.arange(3)]
+
+
+def parse_obj_arrays(obj_blob):
+    """
+    Vertices (V, 3) float64 and triangle faces (F, 3) int64 (0-based) of an OBJ BLOB.
+
+    "v" and "f" lines are located and gathered vectorised on the byte array and
+    parsed in one pass each; "#" comments and indentation are ignored,
+    polygons are fan-triangulated and negative (relative) indices resolved.
+    """
+    if isinstance(obj_blob, str):
+        obj_blob = obj_blob.encode("utf-8")
+    obj_blob = bytes(obj_blob)
+    if not obj_blob.endswith(b"\n"):
+        obj_blob += b"\n"
+    buf = np.frombuffer(obj_blob, dtype=np.uint8)
+    ends = np.flatnonzero(buf == 10)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    if b"#" in obj_blob:
+        buf = _blank_comments(buf, ends)
+    if _IS_INDENT[buf[starts]].any():
+        # Indented lines: classify by their first non-blank byte (the newline at
+        # the latest), so they are neither skipped nor shift later face indices
+        solid = np.flatnonzero(~_IS_INDENT[buf])
+        starts = solid[np.searchsorted(solid, starts)]
+    # Keyword must be exactly "v"/"f" followed by whitespace ("vt"/"vn" are skipped)
+    head = buf[starts]
+    second = buf[np.minimum(starts + 1, len(buf) - 1)]
+    sep = _IS_WS[second] & (second != 10)
+
+    text, lengths = _gather(buf, starts, ends, (head == ord("v")) & sep)
+    flat = np.array(text.tobytes().split(), dtype=np.float64)
+    n = len(lengths)
+    if n == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+    if flat.size == 3 * n:
+        vertices = flat.reshape(n, 3)
+    else:
+        # "v x y z w" / vertex colours / ragged rows
+        vertices = _first3(flat, _tokens_per_line(text, lengths))
+    vertices = np.ascontiguousarray(vertices, dtype=np.float64)
+
+    text, lengths = _gather(buf, starts, ends, (head == ord("f")) & sep)
+    n = len(lengths)
+    if n == 0:
+        return vertices, np.zeros((0, 3), dtype=np.int64)
+    flat = np.array(_F_REFS.sub(b"", text.tobytes()).split(), dtype=np.int64)
+    # 1-based → 0-based; negative indices count back from the end of the vertex list
+    flat = np.where(flat < 0, flat + len(vertices), flat - 1)
+
+    if flat.size == 3 * n:
+        faces = flat.reshape(n, 3)
+    else:
+        # Fan triangulation: polygon (a, b, c, d, ...) → (a, b, c), (a, c, d), ...
+        counts = _tokens_per_line(text, lengths)
+        first = np.cumsum(counts) - counts
+        tris = np.maximum(counts - 2, 0)
+        poly = np.repeat(np.arange(n), tris)
+        k = np.arange(len(poly)) - np.repeat(np.cumsum(tris) - tris, tris)
+        base = first[poly]
+        faces = np.stack([flat[base], flat[base + k + 1], flat[base + k + 2]], axis=1)
+
+    valid = ((faces >= 0) & (faces < len(vertices))).all(axis=1)
+    return vertices, np.ascontiguousarray(faces[valid], dtype=np.int64)
+
+
+def iter_obj_arrays(blobs):
+    """parse_obj_arrays over an iterable of BLOBs (e.g. a sqlite cursor column)."""
+    for blob in blobs:
+        yield parse_obj_arrays(blob)
+
+
+def sample_surface(vertices, faces, num_points, rng=None):
+    """Area-weighted uniform samples on the triangle surface, (num_points, 3)."""
+    rng = np.random.default_rng() if rng is None else rng
+    tris = vertices[faces]                                   # (F, 3, 3)
+    e1 = tris[:, 1] - tris[:, 0]
+    e2 = tris[:, 2] - tris[:, 0]
+    area = np.linalg.norm(np.cross(e1, e2), axis=1)
+    total = area.sum()
+    if not np.isfinite(total) or total <= 0:
+        raise ValueError("mesh has no surface area")
+    face = rng.choice(len(faces), size=num_points, p=area / total)
+    u, v = rng.random((2, num_points))
+    # Reflect points from the far half of the parallelogram back into the triangle
+    flip = u + v > 1
+    u[flip], v[flip] = 1 - u[flip], 1 - v[flip]
+    return tris[face, 0] + u[:, None] * e1[face] + v[:, None] * e2[face]
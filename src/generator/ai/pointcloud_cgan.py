@@ -2,25 +2,23 @@
 # pointcloud_cgan.py
 # Conditional GAN (WGAN-GP + Chamfer) for 3D point clouds with PointNet discriminator.
 
+import json
+import logging
 import os
 import sqlite3
+from collections import Counter
 import numpy as np
-import trimesh
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, get_worker_info
 from tqdm import tqdm
 import matplotlib.pyplot as plt
 
-# --- Chamfer Distance (замена EMD, без pytorch3d) ---
-def chamfer_distance(A, B):
-    """Chamfer Distance между двумя облаками точек (A, B: (B, N, 3))."""
-    # Расстояния от A к B
-    dist1 = torch.cdist(A, B).min(dim=2)[0].mean(dim=1)  # (B,)
-    # Расстояния от B к A
-    dist2 = torch.cdist(B, A).min(dim=2)[0].mean(dim=1)  # (B,)
-    return dist1 + dist2
+from src.generator.ai.obj_blob import parse_obj_arrays, sample_surface
+
+# --- Chamfer Distance (замена EMD, без pytorch3d; тайлами, память O(B × tile²)) ---
+from src.generator.ai.chamfer import CHAMFER_TILE, chamfer_distance
 
 try:
     from plyfile import PlyData, PlyElement
@@ -28,6 +26,12 @@ try:
 except Exception:
     PLY_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+# OBJ BLOBs that could not be sampled and were replaced by noise, by reason
+# (per process: DataLoader workers keep their own counts)
+OBJ_FALLBACKS = Counter()
+
 # -------------------------------
 # CONFIG
 # -------------------------------
@@ -56,10 +60,24 @@ CFG = {
     # Loss weights
     "GEO_LOSS_WEIGHT": 1.0,
     "CHAMFER_WEIGHT": 0.1,        # Замена EMD
+    "CHAMFER_TILE": CHAMFER_TILE, # None = полная матрица cdist
     "HEIGHT_LOSS_WEIGHT": 0.5,
 
     "MAX_ITEMS_FOR_RADII": 200,
-    "CLIP_GRAD": 1.0
+    "CLIP_GRAD": 1.0,
+
+    # Point-cloud cache: K sampled variants per object, built once, memory-mapped
+    "USE_PC_CACHE": True,
+    "CACHE_NAME": "pointcloud_cache",
+    "CACHE_VARIANTS": 8,
+    "CACHE_DTYPE": "float16",     # coordinates are in [-1, 1]; float16 error << jitter
+    "CACHE_JITTER": 0.005,
+
+    # DataLoader: sampling/collation in worker processes, overlapped with training
+    "NUM_WORKERS": min(8, os.cpu_count() or 1),
+    "PERSISTENT_WORKERS": True,
+    "PIN_MEMORY": torch.cuda.is_available(),
+    "PREFETCH_FACTOR": 4,
 }
 
 # --- EXPORT FOR VISUALIZER ---
@@ -74,6 +92,7 @@ if CFG["DATA_DIR"] is None:
 DB_PATH = os.path.join(CFG["DATA_DIR"], CFG["DB_NAME"])
 OUTPUT_DIR = os.path.join(CFG["DATA_DIR"], CFG["OUTPUT_SUBDIR"])
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+CACHE_PREFIX = os.path.join(OUTPUT_DIR, CFG["CACHE_NAME"])
 
 
 # -------------------------------
@@ -83,28 +102,30 @@ def ensure_dir(path):
     if path and not os.path.exists(path):
         os.makedirs(path, exist_ok=True)
 
-def obj_to_pointcloud(obj_blob, num_points=CFG["NUM_POINTS"]):
-    tmp = os.path.join(OUTPUT_DIR, "_tmp_obj.obj")
-    with open(tmp, "wb") as f:
-        f.write(obj_blob)
-    try:
-        mesh = trimesh.load(tmp, force="mesh")
-        if isinstance(mesh, trimesh.Scene):
-            geoms = [g for g in mesh.geometry.values()]
-            mesh = trimesh.util.concatenate(geoms)
-        pts, _ = trimesh.sample.sample_surface(mesh, num_points)
-    except Exception:
-        pts = np.random.normal(scale=0.05, size=(num_points, 3)).astype(np.float32)
-    finally:
-        try: os.remove(tmp)
-        except Exception: pass
-
+def normalize_pointcloud(pts):
     pts = pts - pts.mean(axis=0)
     norm = np.max(np.linalg.norm(pts, axis=1))
     if norm > 0:
         pts /= norm
     return pts.astype(np.float32)
 
+def obj_to_pointclouds(obj_blob, num_points=CFG["NUM_POINTS"], variants=1, rng=None):
+    """(variants, num_points, 3): the OBJ is parsed once and its surface sampled K times."""
+    rng = np.random.default_rng() if rng is None else rng
+    try:
+        vertices, faces = parse_obj_arrays(obj_blob)
+        clouds = [sample_surface(vertices, faces, num_points, rng) for _ in range(variants)]
+    except (ValueError, IndexError) as exc:
+        # Malformed numbers / rows or a mesh without surface: noise instead of the shape
+        OBJ_FALLBACKS[type(exc).__name__] += 1
+        logger.warning(f"OBJ → point cloud fallback to noise ({type(exc).__name__}: {exc}); "
+                       f"{sum(OBJ_FALLBACKS.values())} so far")
+        clouds = [rng.normal(scale=0.05, size=(num_points, 3)) for _ in range(variants)]
+    return np.stack([normalize_pointcloud(np.asarray(pts, dtype=np.float64)) for pts in clouds])
+
+def obj_to_pointcloud(obj_blob, num_points=CFG["NUM_POINTS"], rng=None):
+    return obj_to_pointclouds(obj_blob, num_points, 1, rng)[0]
+
 def save_pc_image(points, path, title=""):
     ensure_dir(os.path.dirname(path))
     fig = plt.figure(figsize=(4, 4))
@@ -135,30 +156,209 @@ def weights_init(m):
 # -------------------------------
 # Dataset
 # -------------------------------
-class ObjectsSQLiteDataset(Dataset):
+class WorkerLocalDataset(Dataset):
+    """
+    Base for datasets used with DataLoader workers. File handles (SQLite
+    connections, memmaps) are opened lazily in the process that uses them and
+    are never pickled or inherited across fork. Each worker gets its own
+    numpy RNG, seeded from torch's per-worker seed, so augmentation is
+    reproducible under torch.manual_seed and never repeats across workers.
+    """
+    _local_attrs = ()
+
+    def _local(self):
+        # Re-open everything after fork / in a freshly spawned worker
+        pid = os.getpid()
+        if getattr(self, "_pid", None) != pid:
+            for name in self._local_attrs:
+                setattr(self, name, None)
+            self._rng = None
+            self._pid = pid
+
+    @property
+    def rng(self):
+        self._local()
+        if self._rng is None:
+            info = get_worker_info()
+            self._rng = np.random.default_rng(info.seed if info is not None else torch.initial_seed())
+        return self._rng
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self._local_attrs + ("_rng", "_pid"):
+            state.pop(name, None)
+        return state
+
+
+class ObjectsSQLiteDataset(WorkerLocalDataset):
+    """Objects read from the DB on access: only row ids and labels are kept in memory."""
+    _local_attrs = ("_conn",)
+
     def __init__(self, db_path=DB_PATH, num_points=CFG["NUM_POINTS"], max_items=None):
+        query = ("SELECT o.id, o.shape_id, s.name "
+                 "FROM objects o JOIN shapes s ON o.shape_id = s.id "
+                 "WHERE o.obj_data IS NOT NULL ORDER BY o.id")
+        if max_items:
+            query += f" LIMIT {int(max_items)}"
         conn = sqlite3.connect(db_path)
-        c = conn.cursor()
-        c.execute(
-            "SELECT o.obj_data, o.shape_id, s.name "
+        try:
+            rows = conn.execute(query).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            raise RuntimeError("No objects found in DB.")
+        self.db_path = db_path
+        self.object_ids = [r[0] for r in rows]
+        self.shape_ids = [r[1] for r in rows]
+        self.shape_names = [r[2] for r in rows]
+        self.num_points = num_points
+
+    @property
+    def conn(self):
+        self._local()
+        if self._conn is None:
+            # Read-only: workers never contend for the write lock
+            uri = "file:" + os.path.abspath(self.db_path) + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return self._conn
+
+    def __len__(self): return len(self.object_ids)
+
+    def __getitem__(self, idx):
+        (obj_blob,) = self.conn.execute(
+            "SELECT obj_data FROM objects WHERE id = ?", (self.object_ids[idx],)
+        ).fetchone()
+        pts = obj_to_pointcloud(obj_blob, self.num_points, self.rng)
+        return torch.from_numpy(pts), torch.tensor(self.shape_ids[idx] - 1), self.shape_names[idx]
+
+
+def make_loader(ds, batch_size=CFG["BATCH_SIZE"], shuffle=True, drop_last=True,
+                num_workers=CFG["NUM_WORKERS"]):
+    """DataLoader with the worker / pinning / prefetch options from CFG."""
+    kwargs = {}
+    if num_workers > 0:
+        kwargs["persistent_workers"] = CFG["PERSISTENT_WORKERS"]
+        kwargs["prefetch_factor"] = CFG["PREFETCH_FACTOR"]
+    return DataLoader(ds, batch_size=batch_size, shuffle=shuffle, drop_last=drop_last,
+                      num_workers=num_workers, pin_memory=CFG["PIN_MEMORY"], **kwargs)
+
+
+# -------------------------------
+# Point-cloud cache
+# -------------------------------
+# <prefix>.npy  — (objects, variants, num_points, 3), opened with mmap_mode="r"
+# <prefix>.json — index: object ids / shape ids / shape names per row + build
+#                 parameters and the DB signature the cache was built from
+def _db_signature(db_path):
+    st = os.stat(db_path)
+    return [st.st_size, st.st_mtime_ns]
+
+def _cache_is_current(index, db_path, num_points, variants, dtype, max_items):
+    return (index.get("num_points") == num_points and index.get("variants") == variants
+            and index.get("dtype") == dtype and index.get("max_items") == max_items
+            and index.get("db_signature") == _db_signature(db_path))
+
+def build_pointcloud_cache(db_path=DB_PATH, cache_prefix=CACHE_PREFIX, num_points=CFG["NUM_POINTS"],
+                           variants=CFG["CACHE_VARIANTS"], dtype=CFG["CACHE_DTYPE"],
+                           max_items=None, rebuild=False):
+    """
+    Sample `variants` point clouds per object once and store them in a memory-mapped
+    .npy shard. Reused as long as the DB file and parameters are unchanged.
+    Returns the index dict.
+    """
+    data_path, index_path = cache_prefix + ".npy", cache_prefix + ".json"
+    if not rebuild and os.path.exists(data_path) and os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if _cache_is_current(index, db_path, num_points, variants, dtype, max_items):
+            return index
+
+    signature = _db_signature(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT o.id, o.shape_id, s.name "
             "FROM objects o JOIN shapes s ON o.shape_id = s.id "
-            "WHERE o.obj_data IS NOT NULL"
-        )
-        rows = c.fetchall()
-        conn.close()
+            "WHERE o.obj_data IS NOT NULL ORDER BY o.id"
+        ).fetchall()
         if max_items:
             rows = rows[:max_items]
         if not rows:
             raise RuntimeError("No objects found in DB.")
-        self.rows = rows
-        self.num_points = num_points
 
-    def __len__(self): return len(self.rows)
+        ensure_dir(os.path.dirname(data_path))
+        tmp_path = cache_prefix + ".tmp.npy"
+        shard = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.dtype(dtype),
+                                          shape=(len(rows), variants, num_points, 3))
+        fallbacks = sum(OBJ_FALLBACKS.values())
+        for i, (obj_id, _, _) in enumerate(tqdm(rows, desc="Point-cloud cache")):
+            (blob,) = conn.execute("SELECT obj_data FROM objects WHERE id = ?", (obj_id,)).fetchone()
+            shard[i] = obj_to_pointclouds(blob, num_points, variants)
+        fallbacks = sum(OBJ_FALLBACKS.values()) - fallbacks
+        shard.flush()
+        del shard
+    finally:
+        conn.close()
+    os.replace(tmp_path, data_path)
+
+    index = {
+        "num_points": num_points,
+        "variants": variants,
+        "dtype": dtype,
+        "max_items": max_items,
+        "db_signature": signature,
+        "object_ids": [r[0] for r in rows],
+        "shape_ids": [r[1] for r in rows],
+        "shape_names": [r[2] for r in rows],
+    }
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(index_path + ".tmp", index_path)
+    print(f"Point-cloud cache: {len(rows)} objects x {variants} variants -> {data_path}"
+          + (f" ({fallbacks} unreadable, replaced by noise)" if fallbacks else ""))
+    return index
+
+def load_pointcloud_cache(cache_prefix=CACHE_PREFIX):
+    """(read-only memmap of the shard, index dict)."""
+    with open(cache_prefix + ".json", "r", encoding="utf-8") as f:
+        index = json.load(f)
+    return np.load(cache_prefix + ".npy", mmap_mode="r"), index
+
+
+class CachedPointCloudDataset(WorkerLocalDataset):
+    """
+    Objects from the point-cloud cache: a random precomputed variant per access
+    plus small Gaussian jitter, so no OBJ is parsed during training.
+    """
+    _local_attrs = ("_points",)
+
+    def __init__(self, cache_prefix=CACHE_PREFIX, jitter=CFG["CACHE_JITTER"], augment=True):
+        self.cache_prefix = cache_prefix
+        with open(cache_prefix + ".json", "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self.shape_ids = index["shape_ids"]
+        self.shape_names = index["shape_names"]
+        self.variants = index["variants"]
+        self.jitter = jitter
+        self.augment = augment
+
+    @property
+    def points(self):
+        # Memmap per process: pickling a memmap would copy the whole shard
+        self._local()
+        if self._points is None:
+            self._points = np.load(self.cache_prefix + ".npy", mmap_mode="r")
+        return self._points
+
+    def __len__(self): return len(self.shape_ids)
 
     def __getitem__(self, idx):
-        obj_blob, shape_id, shape_name = self.rows[idx]
-        pts = obj_to_pointcloud(obj_blob, self.num_points)
-        return torch.tensor(pts), torch.tensor(shape_id - 1), shape_name
+        rng = self.rng
+        k = int(rng.integers(self.variants)) if self.augment else 0
+        pts = np.asarray(self.points[idx, k], dtype=np.float32)   # copy out of the memmap
+        if self.augment and self.jitter:
+            pts += rng.normal(scale=self.jitter, size=pts.shape).astype(np.float32)
+        return torch.from_numpy(pts), torch.tensor(self.shape_ids[idx] - 1), self.shape_names[idx]
 
 
 # -------------------------------
@@ -254,17 +454,17 @@ def compute_class_radii(db_path, num_points=512, max_items=None):
     shape_rows = c.fetchall()
     shape_map = {r[0]-1: r[1] for r in shape_rows}
     norms_per_class = {cid: [] for cid in shape_map}
-    c.execute("SELECT o.obj_data, o.shape_id FROM objects o WHERE o.obj_data IS NOT NULL")
-    objs = c.fetchall()
-    conn.close()
+    query = "SELECT o.obj_data, o.shape_id FROM objects o WHERE o.obj_data IS NOT NULL"
     if max_items:
-        objs = objs[:max_items]
-    for blob, sid in objs:
+        query += f" LIMIT {int(max_items)}"
+    # Streamed row by row: BLOBs are parsed in memory, never all held at once
+    for blob, sid in c.execute(query):
         try:
             pts = obj_to_pointcloud(blob, num_points)
             norms_per_class[sid-1].append(np.mean(np.linalg.norm(pts, axis=1)))
         except Exception:
             pass
+    conn.close()
     class_radius = {cid: float(np.mean(v)) if v else 0.5 for cid, v in norms_per_class.items()}
     return class_radius, shape_map
 
@@ -275,8 +475,12 @@ def compute_class_radii(db_path, num_points=512, max_items=None):
 def train():
     class_radius, shape_map = compute_class_radii(DB_PATH, CFG["NUM_POINTS"], CFG["MAX_ITEMS_FOR_RADII"])
     num_classes = len(shape_map)
-    ds = ObjectsSQLiteDataset(DB_PATH, CFG["NUM_POINTS"])
-    loader = DataLoader(ds, batch_size=CFG["BATCH_SIZE"], shuffle=True, drop_last=True)
+    if CFG["USE_PC_CACHE"]:
+        build_pointcloud_cache(DB_PATH, CACHE_PREFIX, CFG["NUM_POINTS"], CFG["CACHE_VARIANTS"])
+        ds = CachedPointCloudDataset(CACHE_PREFIX)
+    else:
+        ds = ObjectsSQLiteDataset(DB_PATH, CFG["NUM_POINTS"])
+    loader = make_loader(ds)
 
     G = Generator(CFG["LATENT_DIM"], CFG["COND_DIM"], CFG["NUM_POINTS"], num_classes).to(DEVICE)
     D = PointNetDiscriminator(CFG["NUM_POINTS"], num_classes, CFG["COND_DIM"]).to(DEVICE)
@@ -289,7 +493,8 @@ def train():
     iteration = 0
     for epoch in range(1, CFG["NUM_EPOCHS"] + 1):
         for real_pts, shape_ids, _ in tqdm(loader, desc=f"Epoch {epoch}/{CFG['NUM_EPOCHS']}"):
-            real_pts, shape_ids = real_pts.to(DEVICE), shape_ids.to(DEVICE)
+            real_pts = real_pts.to(DEVICE, non_blocking=True)
+            shape_ids = shape_ids.to(DEVICE, non_blocking=True)
             B = real_pts.size(0)
             iteration += 1
 
@@ -327,7 +532,7 @@ def train():
             loss_height = nn.functional.mse_loss(height_gen, height_real)
 
             # Chamfer Distance (замена EMD)
-            loss_chamfer = chamfer_distance(gen_pts, real_pts).mean()
+            loss_chamfer = chamfer_distance(gen_pts, real_pts, CFG["CHAMFER_TILE"]).mean()
 
             loss_G = (loss_adv +
                       CFG["GEO_LOSS_WEIGHT"] * loss_geo +
@@ -2,11 +2,12 @@
 # pointcloud_generator.py
 # Генерация 3D-хмар точок з Conditional GAN
 
-import torch
 import sqlite3
+from functools import lru_cache
+
+import torch
 import numpy as np
 from pathlib import Path
-import matplotlib.pyplot as plt
 
 # --- Импорт моделей и констант из тренера ---
 from pointcloud_cgan import (
@@ -26,13 +27,11 @@ ROOT = Path(__file__).resolve().parents[3]
 MODEL_PATH = ROOT / "data" / "point_cgan_pointnet_output" / "model_final.pt"
 DB_PATH = ROOT / "data" / "objects_data.db"
 
-if not MODEL_PATH.exists():
-    raise FileNotFoundError(f"❗ Модель не найдена: {MODEL_PATH}")
-
 
 # ==============================
 # 2. Классы из БД
 # ==============================
+@lru_cache(maxsize=1)
 def load_classes():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -47,26 +46,31 @@ def load_classes():
     return classes, inv
 
 
-CLASSES, INV_CLASSES = load_classes()
-print("✔ Классы из БД:", CLASSES)
-
-
 # ==============================
-# 3. Загружаем GAN
+# 3. Загружаем GAN (при первом вызове, не при импорте)
 # ==============================
-generator = Generator(
-    z_dim=LATENT_DIM,
-    cond_dim=COND_DIM,
-    num_points=NUM_POINTS,
-    num_classes=len(CLASSES)
-).to(DEVICE)
+@lru_cache(maxsize=1)
+def get_generator():
+    if not MODEL_PATH.exists():
+        raise FileNotFoundError(f"❗ Модель не найдена: {MODEL_PATH}")
+
+    classes, _ = load_classes()
+    print("✔ Классы из БД:", classes)
 
-ckpt = torch.load(MODEL_PATH, map_location=DEVICE)
-state = ckpt["G"] if "G" in ckpt else ckpt
-generator.load_state_dict(state)
-generator.eval()
+    generator = Generator(
+        z_dim=LATENT_DIM,
+        cond_dim=COND_DIM,
+        num_points=NUM_POINTS,
+        num_classes=len(classes)
+    ).to(DEVICE)
 
-print(f"✔ Генератор загружен из {MODEL_PATH.name}")
+    ckpt = torch.load(MODEL_PATH, map_location=DEVICE)
+    state = ckpt["G"] if "G" in ckpt else ckpt
+    generator.load_state_dict(state)
+    generator.eval()
+
+    print(f"✔ Генератор загружен из {MODEL_PATH.name}")
+    return generator
 
 
 # ==============================
@@ -77,13 +81,15 @@ def generate_pointcloud(shape_name: str) -> np.ndarray:
     shape_name — строка ("cube", "sphere" ...)
     Возвращает numpy array N×3
     """
-    if shape_name not in INV_CLASSES:
+    _, inv_classes = load_classes()
+    if shape_name not in inv_classes:
         raise ValueError(
             f"Форма '{shape_name}' не найдена.\n"
-            f"Доступно: {list(INV_CLASSES.keys())}"
+            f"Доступно: {list(inv_classes.keys())}"
         )
 
-    cid = INV_CLASSES[shape_name]
+    generator = get_generator()
+    cid = inv_classes[shape_name]
     z = torch.randn(1, LATENT_DIM, device=DEVICE)
     label = torch.tensor([cid], dtype=torch.long, device=DEVICE)
 
@@ -101,9 +107,12 @@ def show_all_classes():
     Визуализация всех классов одной фигурой (2x3 или 3xX)
     Каждая хмара точек — scatter plot
     """
+    import matplotlib.pyplot as plt
+
+    classes, _ = load_classes()
     fig = plt.figure(figsize=(15, 10))
 
-    for i, (cid, name) in enumerate(CLASSES.items()):
+    for i, (cid, name) in enumerate(classes.items()):
         pts = generate_pointcloud(name)
 
         ax = fig.add_subplot(2, 3, i + 1, projection="3d")
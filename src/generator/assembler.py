@@ -29,6 +29,13 @@ Per-facade pipeline (TWO PHASES):
     After all facades are assembled: a -90° X rotation is applied to the
     entire building scene, converting from internal Z-up to Three.js Y-up.
 
+  Chunked export (chunk_floors / chunk_columns set):
+    Meshes are grouped into facade × floor-band × column-band chunks, each
+    written to chunks/<id>.obj and listed in chunks.json with its bounding box
+    and a signature of the cells/modules it depends on.  plan.json stores the
+    facade plans; a later update rebuilds only chunks whose signature changed
+    and re-merges house.obj from the chunk files.
+
 Rules:
   • No standalone window module — wall_window is the only window representation
   • Door and balcony reservations happen BEFORE any window logic
@@ -38,18 +45,41 @@ Rules:
   • Assembler is placement-only — it does not generate geometry
 """
 
+import hashlib
+import json
 import logging
 import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
 from enum import Enum
 
 import trimesh
 import numpy as np
 
+from src.generator.obj_export import (
+    MaterialLibrary,
+    concatenate_obj_files,
+    export_scene_obj_streaming,
+    write_meshes_obj,
+)
+from src.generator.progress import ProgressHook, stage
+from src.generator.thumbnail import THUMBNAIL_NAME
+from src.metrics import REGISTRY as METRICS
+from src.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
+# Bump when placement logic changes so stored chunk signatures stop matching.
+PLAN_VERSION = 1
+PLAN_FILE = "plan.json"
+CHUNKS_MANIFEST = "chunks.json"
+
+
 # ========================= CELL STATE =========================
 
 class CellState(Enum):
@@ -68,9 +98,16 @@ class CellState(Enum):
         return self != CellState.DOOR
 
 
+# uint8 codes used by FacadeGrid — index into CELL_STATES.
+CELL_STATES: Tuple[CellState, ...] = tuple(CellState)
+CELL_CODE: Dict[CellState, int] = {st: i for i, st in enumerate(CELL_STATES)}
+_CELL_VALUES = np.array([st.value for st in CELL_STATES], dtype=object)
+
+
 class FacadeGrid:
     """
-    2D planning grid (cols × floors).
+    2D planning grid (cols × floors) backed by a compact uint8 array
+    (``codes[floor, col]``, values index CELL_STATES).
     Starts fully initialised as WALL.
     Structural reservations block window promotion but do NOT suppress wall meshes
     for BALCONY/BALCONY_UPPER cells.
@@ -79,13 +116,11 @@ class FacadeGrid:
     def __init__(self, cols: int, floors: int):
         self.cols   = cols
         self.floors = floors
-        self._state: List[List[CellState]] = [
-            [CellState.WALL] * cols for _ in range(floors)
-        ]
+        self.codes: np.ndarray = np.full((floors, cols), CELL_CODE[CellState.WALL], dtype=np.uint8)
 
     def state(self, col: int, floor: int) -> CellState:
         if 0 <= col < self.cols and 0 <= floor < self.floors:
-            return self._state[floor][col]
+            return CELL_STATES[self.codes[floor, col]]
         return CellState.DOOR  # out-of-bounds treated as reserved
 
     def is_wall(self, col: int, floor: int) -> bool:
@@ -93,35 +128,245 @@ class FacadeGrid:
         return self.state(col, floor) == CellState.WALL
 
     def can_reserve(self, cols_r: List[int], floors_r: List[int]) -> bool:
-        return all(self.state(c, f) == CellState.WALL
-                   for c in cols_r for f in floors_r)
-
+        if not cols_r or not floors_r:
+            return True
+        if (min(cols_r) < 0 or max(cols_r) >= self.cols
+                or min(floors_r) < 0 or max(floors_r) >= self.floors):
+            return False  # out-of-bounds treated as reserved
+        block = self.codes[np.ix_(floors_r, cols_r)]
+        return bool((block == CELL_CODE[CellState.WALL]).all())
 
     def reserve(self, cols_r: List[int], floors_r: List[int], state: CellState) -> None:
-        for c in cols_r:
-            for f in floors_r:
-                if 0 <= c < self.cols and 0 <= f < self.floors:
-                    self._state[f][c] = state
+        cols_in = [c for c in cols_r if 0 <= c < self.cols]
+        floors_in = [f for f in floors_r if 0 <= f < self.floors]
+        if cols_in and floors_in:
+            self.codes[np.ix_(floors_in, cols_in)] = CELL_CODE[state]
 
     def promote_to_wall_window(self, col: int, floor: int) -> None:
         if self.state(col, floor) == CellState.WALL:
-            self._state[floor][col] = CellState.WALL_WINDOW
+            self.codes[floor, col] = CELL_CODE[CellState.WALL_WINDOW]
+
+    def promote_where(self, mask: np.ndarray) -> int:
+        """Promote every WALL cell selected by a (floors, cols) mask; returns the count."""
+        hit = mask & (self.codes == CELL_CODE[CellState.WALL])
+        self.codes[hit] = CELL_CODE[CellState.WALL_WINDOW]
+        return int(np.count_nonzero(hit))
+
+    def counts(self) -> Dict[CellState, int]:
+        """Cell count per state (np.bincount over the code array)."""
+        binned = np.bincount(self.codes.ravel(), minlength=len(CELL_STATES))
+        return {st: int(binned[i]) for i, st in enumerate(CELL_STATES)}
+
+    def values(self, floors: slice = slice(None), cols: slice = slice(None)) -> List[List[str]]:
+        """State values of a sub-block, floor by floor — JSON-serialisable."""
+        return _CELL_VALUES[self.codes[floors, cols]].tolist()
+
+    def to_rows(self) -> List[List[str]]:
+        """State values floor by floor (row 0 = ground floor) — JSON-serialisable."""
+        return self.values()
+
+
+# ========================= MODULE MESH CACHE =========================
+
+# Upper bound for the process-wide module mesh cache (MiB of vertex/face/UV/texture data).
+MODULE_MESH_CACHE_MAX_BYTES = int(os.environ.get("MODULE_MESH_CACHE_MB", "256")) * 1024 * 1024
+
+
+def _mesh_nbytes(mesh: trimesh.Trimesh) -> int:
+    """Approximate resident size of a loaded mesh (geometry + UVs + texture image)."""
+    total = mesh.vertices.nbytes + mesh.faces.nbytes
+    visual = getattr(mesh, "visual", None)
+    uv = getattr(visual, "uv", None)
+    if uv is not None:
+        total += np.asarray(uv).nbytes
+    image = getattr(getattr(visual, "material", None), "image", None)
+    if image is not None and hasattr(image, "size"):
+        w, h = image.size
+        total += w * h * len(image.getbands())
+    return int(total)
+
+
+class ModuleMeshCache:
+    """
+    Process-wide LRU cache of loaded, oriented module meshes.
+
+    Keyed by (resolved OBJ path, mtime_ns, size): regenerating a module in place
+    changes the key, so stale entries are never served and simply age out.
+    Bounded by total bytes rather than entry count — a textured wall_window is
+    orders of magnitude larger than a plain wall.
+
+    Cached meshes are shared between all assemblers and must be treated as
+    read-only; every placement path in GridFacadeAssembler works on ``.copy()``.
+    """
+
+    def __init__(self, max_bytes: int = MODULE_MESH_CACHE_MAX_BYTES):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: "OrderedDict[Tuple[str, int, int], Tuple[List[trimesh.Trimesh], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(obj_path: Path) -> Optional[Tuple[str, int, int]]:
+        try:
+            st = obj_path.stat()
+        except OSError:
+            return None
+        return (str(obj_path.resolve()), st.st_mtime_ns, st.st_size)
+
+    def get_parts(self, obj_path: Path) -> Optional[List[trimesh.Trimesh]]:
+        """Return oriented mesh parts for *obj_path*, parsing the OBJ only on a miss."""
+        key = self._key(obj_path)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        parts = self._parse(obj_path)
+        if parts is None:
+            return None
+
+        nbytes = sum(_mesh_nbytes(p) for p in parts)
+        with self._lock:
+            # Drop entries for older revisions of the same file right away.
+            for stale in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._bytes -= self._entries.pop(stale)[1]
+            if key not in self._entries and nbytes <= self.max_bytes:
+                self._entries[key] = (parts, nbytes)
+                self._bytes += nbytes
+                while self._bytes > self.max_bytes and self._entries:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted
+        return parts
+
+    def warm(self, obj_paths: Iterable[Path]) -> int:
+        """Pre-load *obj_paths* into the cache; returns the number of modules loaded."""
+        loaded = 0
+        for path in obj_paths:
+            path = Path(path)
+            if path.is_file() and self.get_parts(path):
+                loaded += 1
+        return loaded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    @staticmethod
+    @traced("module_parse")
+    def _parse(obj_path: Path) -> Optional[List[trimesh.Trimesh]]:
+        try:
+            loaded = trimesh.load(str(obj_path), process=False)
+        except Exception as exc:
+            logger.error(f"Failed to load {obj_path}: {exc}", exc_info=True)
+            return None
+
+        # For multi-geometry Scenes, keep parts separate to preserve per-part materials.
+        if isinstance(loaded, trimesh.Scene):
+            parts = [g for g in loaded.geometry.values()
+                     if isinstance(g, trimesh.Trimesh)]
+        elif isinstance(loaded, trimesh.Trimesh):
+            parts = [loaded]
+        else:
+            logger.warning(f"Unexpected type for {obj_path}: {type(loaded)}")
+            return None
+        if not parts:
+            return None
+        # Material identity for exporters: a content hash computed once per
+        # parse (parts usually share one material object), so identical
+        # textures from different module files collapse into one material.
+        keys: Dict[int, str] = {}
+        for p in parts:
+            material = getattr(p.visual, "material", None)
+            if material is not None:
+                if id(material) not in keys:
+                    keys[id(material)] = _material_key(material)
+                p.metadata["material_key"] = keys[id(material)]
+        return [ModuleLoader._fix_orientation(p) for p in parts]
+
+
+def _material_key(material: Any) -> str:
+    """
+    Process-stable content hash of a trimesh material: texture pixels plus
+    every parameter except the name (which differs between otherwise equal
+    module materials).
+    """
+    digest = hashlib.sha1(type(material).__name__.encode("utf-8"))
+    for attr, value in sorted(vars(material).items()):
+        if attr in ("_name", "name"):
+            continue
+        digest.update(attr.encode("utf-8"))
+        if hasattr(value, "tobytes") and hasattr(value, "mode"):       # PIL image
+            digest.update(f"{value.mode}{value.size}".encode("utf-8"))
+            digest.update(value.tobytes())
+        elif isinstance(value, np.ndarray):
+            digest.update(f"{value.dtype}{value.shape}".encode("utf-8"))
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+    return f"sha1:{digest.hexdigest()}"
+
+
+# Shared by every GridFacadeAssembler in the process.
+MODULE_MESH_CACHE = ModuleMeshCache()
+
+METRICS.counter(
+    "module_mesh_cache_requests_total", "Module mesh cache lookups", ("result",),
+    fn=lambda: {("hit",): MODULE_MESH_CACHE.stats()["hits"],
+                ("miss",): MODULE_MESH_CACHE.stats()["misses"]},
+)
+METRICS.gauge("module_mesh_cache_bytes", "Approximate bytes held by the module mesh cache",
+              fn=lambda: MODULE_MESH_CACHE.stats()["bytes"])
+METRICS.gauge("module_mesh_cache_entries", "Module OBJs held by the module mesh cache",
+              fn=lambda: MODULE_MESH_CACHE.stats()["entries"])
 
 
 # ========================= MODULE LOADER =========================
 
 class ModuleLoader:
-    """Loads, orients, and caches trimesh objects from OBJ files."""
+    """Resolves module OBJ files and serves oriented meshes from the shared mesh cache."""
 
-    def __init__(self, modules_dir: Path, preferred_ids: Optional[Dict[str, str]] = None):
+    def __init__(self,
+                 modules_dir: Path,
+                 preferred_ids: Optional[Dict[str, str]] = None,
+                 mesh_cache: Optional[ModuleMeshCache] = None):
         self.modules_dir = Path(modules_dir)
         # Maps module_type → specific UUID subdirectory to load.
         # When set, the loader targets that UUID directory directly instead of
         # picking the first alphabetical match — critical for freshly generated
         # composites that must not be confused with older modules of the same type.
         self._preferred: Dict[str, str] = preferred_ids or {}
+        self._mesh_cache = mesh_cache if mesh_cache is not None else MODULE_MESH_CACHE
         self._cache: Dict[str, Optional[trimesh.Trimesh]] = {}
         self._parts_cache: Dict[str, List[trimesh.Trimesh]] = {}
+        self._sources: Dict[str, Path] = {}
+
+    def prefer(self, module_type: str, module_id: Optional[str]) -> None:
+        """Point *module_type* at a specific UUID (dropping anything already loaded)."""
+        if module_id:
+            self._preferred[module_type] = module_id
+        else:
+            self._preferred.pop(module_type, None)
+        self._cache.pop(module_type, None)
+        self._parts_cache.pop(module_type, None)
+        self._sources.pop(module_type, None)
 
     def load(self, module_type: str) -> Optional[trimesh.Trimesh]:
         if module_type not in self._cache:
@@ -145,7 +390,19 @@ class ModuleLoader:
         b = mesh.bounds
         return (b[1][0] - b[0][0], b[1][1] - b[0][1], b[1][2] - b[0][2])
 
-    def _from_disk(self, module_type: str) -> Optional[trimesh.Trimesh]:
+    def fingerprint(self, module_type: str) -> Optional[List[Any]]:
+        """(relative OBJ path, mtime_ns, size) of the loaded module, None if absent."""
+        self.load(module_type)
+        src = self._sources.get(module_type)
+        if src is None:
+            return None
+        try:
+            st = src.stat()
+        except OSError:
+            return None
+        return [src.relative_to(self.modules_dir).as_posix(), st.st_mtime_ns, st.st_size]
+
+    def _find_obj_file(self, module_type: str) -> Optional[Path]:
         module_dir = self.modules_dir / module_type
         if not module_dir.exists():
             logger.warning(f"Module dir not found: {module_dir}")
@@ -156,58 +413,40 @@ class ModuleLoader:
         if preferred_id:
             preferred_path = module_dir / preferred_id / f"{module_type}.obj"
             if preferred_path.exists():
-                obj_files = [preferred_path]
                 logger.debug(f"Using preferred module {module_type}/{preferred_id}")
-            else:
-                logger.warning(
-                    f"Preferred module {module_type}/{preferred_id} not found at "
-                    f"{preferred_path}; falling back to alphabetical search."
-                )
-                obj_files = sorted(module_dir.glob(f"*/{module_type}.obj"))
-        else:
-            obj_files = sorted(module_dir.glob(f"*/{module_type}.obj"))
+                return preferred_path
+            logger.warning(
+                f"Preferred module {module_type}/{preferred_id} not found at "
+                f"{preferred_path}; falling back to alphabetical search."
+            )
 
+        obj_files = sorted(module_dir.glob(f"*/{module_type}.obj"))
         if not obj_files:
             logger.warning(f"No OBJ for module '{module_type}'")
             return None
+        return obj_files[0]
 
-        try:
-            loaded = trimesh.load(str(obj_files[0]), process=False)
-        except Exception as exc:
-            logger.error(f"Failed to load {module_type}: {exc}", exc_info=True)
+    def _from_disk(self, module_type: str) -> Optional[trimesh.Trimesh]:
+        obj_file = self._find_obj_file(module_type)
+        if obj_file is None:
             return None
 
-        # For multi-geometry Scenes, keep parts separate to preserve per-part materials.
-        if isinstance(loaded, trimesh.Scene):
-            parts = [g for g in loaded.geometry.values()
-                     if isinstance(g, trimesh.Trimesh)]
-            if not parts:
-                return None
-            if len(parts) > 1:
-                fixed = [self._fix_orientation(p) for p in parts]
-                self._parts_cache[module_type] = fixed
-                ww, wd, wh = fixed[0].bounds[1] - fixed[0].bounds[0]
-                logger.info(
-                    f"Loaded '{module_type}' ({len(fixed)} parts): "
-                    f"{obj_files[0].parent.name}/{obj_files[0].name} "
-                    f"[{ww:.2f}×{wd:.2f}×{wh:.2f}m]"
-                )
-                return fixed[0]
-            loaded = parts[0]
-
-        if not isinstance(loaded, trimesh.Trimesh):
-            logger.warning(f"Unexpected type for {module_type}: {type(loaded)}")
+        parts = self._mesh_cache.get_parts(obj_file)
+        if not parts:
             return None
+        self._sources[module_type] = obj_file
 
-        mesh = self._fix_orientation(loaded)
+        if len(parts) > 1:
+            self._parts_cache[module_type] = parts
+        mesh = parts[0]
         ww, wd, wh = mesh.bounds[1] - mesh.bounds[0]
+        suffix = f" ({len(parts)} parts)" if len(parts) > 1 else ""
         logger.info(
-            f"Loaded '{module_type}': {obj_files[0].parent.name}/{obj_files[0].name} "
+            f"Loaded '{module_type}'{suffix}: {obj_file.parent.name}/{obj_file.name} "
             f"[{ww:.2f}×{wd:.2f}×{wh:.2f}m]"
         )
         return mesh
 
-
     @staticmethod
     def _fix_orientation(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
         """Rotate so Z is the vertical (height) axis — internal Z-up convention."""
@@ -267,6 +506,13 @@ def _position(mesh: trimesh.Trimesh,
     ])
 
 
+def _tag_cell(mesh: trimesh.Trimesh, facade: str, col: int, floor: int) -> trimesh.Trimesh:
+    """Record the grid cell a mesh belongs to (used to group meshes into chunks)."""
+    mesh.metadata["facade"] = facade
+    mesh.metadata["cell"] = (int(col), int(floor))
+    return mesh
+
+
 def _flip_facing(mesh: trimesh.Trimesh) -> None:
     """
     Rotate 180° around Z axis so the module faces the other Y direction.
@@ -294,10 +540,25 @@ class GridFacadeAssembler:
     replacement for plain wall panels, never as an overlay.
 
     Final output: a trimesh.Scene in Y-up orientation (Three.js compatible).
+
+    An optional *progress* hook receives start/end events for the stages
+    module_loading, planning, module_wait, facade (per facade), texture_packing
+    and export.
+
+    *pending* maps a module type to a Future of the module id that is still
+    being generated (e.g. the wall_window variant).  Such modules are not
+    preloaded; planning runs first and the futures are only awaited right
+    before the first pass that needs their meshes.
     """
 
-    def __init__(self, params: Dict[str, Any], modules_dir: Path):
+    def __init__(self,
+                 params: Dict[str, Any],
+                 modules_dir: Path,
+                 progress: Optional[ProgressHook] = None,
+                 pending: Optional[Dict[str, "Future[Optional[str]]"]] = None):
         self.params = params
+        self.progress = progress
+        self._pending: Dict[str, "Future[Optional[str]]"] = dict(pending or {})
 
         preferred_ids: Dict[str, str] = {}
         if params.get("wall_module_id"):
@@ -308,8 +569,11 @@ class GridFacadeAssembler:
             preferred_ids["wall_window"] = params["wall_window_module_id"]
         if params.get("balcony_module_id"):
             preferred_ids["balcony"] = params["balcony_module_id"]
-        if params.get("door_module_id"):
-            preferred_ids["door"] = params["door_module_id"]
+        # The server stores the door as entrance_module_id (door_module_id is
+        # the request field name, still accepted here)
+        door_id = params.get("entrance_module_id") or params.get("door_module_id")
+        if door_id:
+            preferred_ids["door"] = door_id
 
         self.loader = ModuleLoader(Path(modules_dir), preferred_ids=preferred_ids)
 
@@ -320,11 +584,25 @@ class GridFacadeAssembler:
         self.texture_scale: int = max(1, min(8, int(params.get("texture_scale", 3))))
         self.balcony_rate: float = max(0.0, min(1.0,
                                        float(params.get("balcony_rate", 0.25))))
-
-
-        wall = self.loader.load("wall")
-        if wall is None:
-            raise RuntimeError("Wall module is required but could not be loaded.")
+        # Optional spatial chunking of the export (0 = disabled).  A missing
+        # dimension spans the whole facade, e.g. chunk_floors=5 alone gives
+        # horizontal bands of five floors.
+        self.chunk_floors:  int = max(0, int(params.get("chunk_floors")  or 0))
+        self.chunk_columns: int = max(0, int(params.get("chunk_columns") or 0))
+        self.last_export_stats: Optional[Dict[str, int]] = None
+
+        with stage(self.progress, "module_loading"):
+            wall = self.loader.load("wall")
+            if wall is None:
+                raise RuntimeError("Wall module is required but could not be loaded.")
+            # Everything else the plan/build passes will ask for, so the
+            # stage timing covers all module I/O.
+            if "wall_window" not in self._pending:
+                self.loader.load("wall_window")
+            if self.sections > 0:
+                self.loader.load("door")
+            if self.balcony_rate > 0:
+                self.loader.load("balcony")
 
         ww, wd, wh     = self.loader.bbox("wall")
         self.cell_width:  float = ww if ww > 0.01 else 4.0
@@ -426,53 +704,69 @@ class GridFacadeAssembler:
         h_span    = max(1, math.ceil(bw / self.cell_width))
         v_span    = 2 if bh > self.cell_height else 1
 
-        blocked   = set(entrance_cols)
         bal_step  = max(1, round(1.0 / self.balcony_rate))
 
+        # Candidate spans start every h_span columns; a span is blocked when it
+        # overlaps an entrance column.  The stagger runs over the *unblocked*
+        # candidates, so their rank (not their column) feeds the position test.
+        starts = np.arange(0, self.cols - h_span + 1, h_span)
+        if starts.size == 0:
+            return placements
+        blocked_cols = np.zeros(self.cols + 1, dtype=np.int32)
+        for c in entrance_cols:
+            if 0 <= c < self.cols:
+                blocked_cols[c + 1] = 1
+        blocked_prefix = np.cumsum(blocked_cols)
+        unblocked = (blocked_prefix[starts + h_span] - blocked_prefix[starts]) == 0
+        rank = np.cumsum(unblocked) - 1
+        span_cols = starts[:, None] + np.arange(h_span)[None, :]   # (n_cand, h_span)
+        wall_code = CELL_CODE[CellState.WALL]
+
         for floor in range(1, self.floors):
             if v_span == 2 and floor + 1 >= self.floors:
                 continue
 
+            offset = (bal_step // 2) * (floor % 2)
+            chosen = unblocked & (((rank + offset) % bal_step) == 0)
+            # Spans on one floor never overlap, so the free-cell test is
+            # independent per candidate; upper-floor reservations from the
+            # previous floor are already in the grid.
+            free = (grid.codes[floor:floor + v_span][:, span_cols] == wall_code).all(axis=(0, 2))
+            chosen &= free
+            if not chosen.any():
+                continue
 
-            candidates = [
-                col for col in range(0, self.cols - h_span + 1, max(1, h_span))
-                if not any(c in blocked for c in range(col, col + h_span))
-            ]
-
-            for idx, col in enumerate(candidates):
-                if not self._is_balcony_position(idx, floor, bal_step):
-                    continue
-
-                cols_r  = list(range(col, col + h_span))
-                floor_r = [floor, floor + 1] if v_span == 2 else [floor]
-
-                if not grid.can_reserve(cols_r, floor_r):
-                    continue
-
-                grid.reserve(cols_r, [floor], CellState.BALCONY)
-                if v_span == 2:
-                    grid.reserve(cols_r, [floor + 1], CellState.BALCONY_UPPER)
+            cells = span_cols[chosen].ravel()
+            grid.codes[floor, cells] = CELL_CODE[CellState.BALCONY]
+            if v_span == 2:
+                grid.codes[floor + 1, cells] = CELL_CODE[CellState.BALCONY_UPPER]
 
+            for col in starts[chosen].tolist():
                 placements.append((col, floor, h_span, v_span))
-                logger.debug(f"Balcony reserved: cols={cols_r}, floor={floor}, v_span={v_span}")
+            logger.debug(
+                f"Balconies reserved: floor={floor}, cols={starts[chosen].tolist()}, "
+                f"h_span={h_span}, v_span={v_span}"
+            )
 
         return placements
 
     def _plan_step4_windows(self, grid: FacadeGrid, entrance_cols: List[int]) -> None:
         density = self._window_density(self.texture_scale)
         step    = max(1, round(1.0 / density))
-        blocked = set(entrance_cols)
 
-        promoted = 0
-        for floor in range(self.floors):
-            for col in range(self.cols):
-                if floor == 0 and col in blocked:
-                    continue
-                if not grid.is_wall(col, floor):
-                    continue
-                if self._is_window_col(col, floor, step):
-                    grid.promote_to_wall_window(col, floor)
-                    promoted += 1
+        # Same rule as _is_window_col, over the whole grid at once:
+        # (col + (step // 2) * (floor % 2)) % step == 0
+        floors = np.arange(self.floors)[:, None]
+        cols   = np.arange(self.cols)[None, :]
+        if step <= 1:
+            mask = np.ones((self.floors, self.cols), dtype=bool)
+        else:
+            mask = ((cols + (step // 2) * (floors % 2)) % step) == 0
+        blocked = [c for c in entrance_cols if 0 <= c < self.cols]
+        if blocked:
+            mask[0, blocked] = False
+
+        promoted = grid.promote_where(mask)
 
         logger.info(
             f"Window step4: density={density:.2f}, interval={step} cols, "
@@ -496,6 +790,29 @@ class GridFacadeAssembler:
 
         return grid, door_placements, bal_placements
 
+    def _plan_facades(self,
+                      entrance_cols: List[int]
+                      ) -> Dict[str, Tuple[FacadeGrid, List, List]]:
+        """Plans of the front and back facades (side facades are walls only)."""
+        with stage(self.progress, "planning"):
+            return {
+                "front": self._plan_facade(True, entrance_cols),
+                "back":  self._plan_facade(False, entrance_cols),
+            }
+
+    def _resolve_pending(self) -> None:
+        """Wait for modules still being generated and switch the loader to them."""
+        for module_type, future in list(self._pending.items()):
+            with stage(self.progress, "module_wait", module_type=module_type):
+                try:
+                    module_id = future.result()
+                except Exception as exc:
+                    logger.warning(f"Pending {module_type} failed ({exc}); using fallback module")
+                    module_id = None
+            self.loader.prefer(module_type, module_id)
+            self.params[f"{module_type}_module_id"] = module_id
+            del self._pending[module_type]
+
     # ========================
     # PHASE 2 — BUILD
     # ========================
@@ -505,10 +822,15 @@ class GridFacadeAssembler:
                          door_placements: List[Tuple[int, int]],
                          bal_placements: List[Tuple[int, int, int, int]],
                          y_center: float,
-                         is_front: bool) -> List[trimesh.Trimesh]:
+                         is_front: bool,
+                         keep: Optional[Callable[[int, int], bool]] = None
+                         ) -> List[trimesh.Trimesh]:
         """
         Build meshes from the completed plan.
 
+        ``keep(col, floor)`` restricts the build to meshes anchored in the given
+        cells (incremental re-export of changed chunks); None builds everything.
+
         Every non-DOOR cell gets a wall or wall_window mesh.
         BALCONY/BALCONY_UPPER cells get a plain wall mesh (the balcony overlaid
         on top of it is placed as a separate overlay mesh with a Y offset so it
@@ -517,6 +839,7 @@ class GridFacadeAssembler:
         Front-facade modules are flipped 180° around Z so they face outward.
         """
         meshes: List[trimesh.Trimesh] = []
+        facade = "front" if is_front else "back"
 
         wall_orig = self.loader.load("wall")
         ww_orig   = self.loader.load("wall_window")   # wall_window composite
@@ -526,11 +849,14 @@ class GridFacadeAssembler:
         # ── Per-cell wall / wall_window meshes ────────────────────
         for floor in range(self.floors):
             z_bottom = floor * self.cell_height
+            row = grid.codes[floor]
             for col in range(self.cols):
-                s = grid.state(col, floor)
+                s = CELL_STATES[row[col]]
 
                 if s == CellState.DOOR:
                     continue  # handled as span mesh below
+                if keep is not None and not keep(col, floor):
+                    continue
 
                 if s == CellState.WALL_WINDOW:
                     ww_parts = self.loader.load_parts("wall_window")
@@ -567,6 +893,7 @@ class GridFacadeAssembler:
                         ])
                         for m in copies:
                             m.apply_translation(t)
+                            _tag_cell(m, facade, col, floor)
                         meshes.extend(copies)
                         continue
                     src = ww_parts[0] if ww_parts else (ww_orig if ww_orig is not None else wall_orig)
@@ -585,25 +912,29 @@ class GridFacadeAssembler:
                     _flip_facing(m)
                 _scale_fit(m, self.cell_width, self.cell_height)
                 _position(m, (col + 0.5) * self.cell_width, z_bottom, y_center)
-                meshes.append(m)
+                meshes.append(_tag_cell(m, facade, col, floor))
 
         # ── Door span meshes ──────────────────────────────────────
         # Wall behind each door cell so the wall surface is visible through/around doors.
         if wall_orig is not None:
             for start_col, h_span in door_placements:
                 for dc in range(h_span):
+                    if keep is not None and not keep(start_col + dc, 0):
+                        continue
                     wall_behind = wall_orig.copy()
                     if not is_front:
                         _flip_facing(wall_behind)
                     _scale_fit(wall_behind, self.cell_width, self.cell_height)
                     _position(wall_behind, (start_col + dc + 0.5) * self.cell_width, 0.0, y_center)
-                    meshes.append(wall_behind)
+                    meshes.append(_tag_cell(wall_behind, facade, start_col + dc, 0))
 
         # Door mesh offset slightly forward so it protrudes from the wall face.
         _door_y_offset = 1.24  # metres
         door_y = y_center - _door_y_offset if is_front else y_center + _door_y_offset
         if door_orig is not None:
             for start_col, h_span in door_placements:
+                if keep is not None and not keep(start_col, 0):
+                    continue
                 door = door_orig.copy()
                 c = _bbox_center(door)
                 door.apply_translation(-c)
@@ -614,7 +945,7 @@ class GridFacadeAssembler:
                     _flip_facing(door)
                 cx = (start_col + h_span / 2) * self.cell_width
                 _position(door, cx, 0.0, door_y)
-                meshes.append(door)
+                meshes.append(_tag_cell(door, facade, start_col, 0))
 
         # ── Balcony overlay meshes (placed IN FRONT of wall) ─────
         if bal_orig is not None and bal_placements:
@@ -625,6 +956,8 @@ class GridFacadeAssembler:
             bal_y = y_center + outward * (self.wall_depth / 2.0 + max(bd, 0.01) / 2.0 - 1.45)
 
             for start_col, floor, h_span, v_span in bal_placements:
+                if keep is not None and not keep(start_col, floor):
+                    continue
                 bal      = bal_orig.copy()
                 span_w   = h_span * self.cell_width
                 z_bottom = floor  * self.cell_height
@@ -646,34 +979,23 @@ class GridFacadeAssembler:
 
                 cx = (start_col + h_span / 2) * self.cell_width
                 _position(bal, cx, z_bottom, bal_y)
-                meshes.append(bal)
+                meshes.append(_tag_cell(bal, facade, start_col, floor))
 
         return meshes
 
     # ── Front / back facade (full pipeline) ──────────────────────
 
     def _build_facade(self,
+                      plan: Tuple[FacadeGrid, List, List],
                       y_center: float,
-                      is_front: bool,
-                      entrance_cols: List[int]) -> List[trimesh.Trimesh]:
-        grid, door_pl, bal_pl = self._plan_facade(is_front, entrance_cols)
-
-        wall_count = sum(
-            1 for f in range(self.floors) for c in range(self.cols)
-            if grid.state(c, f) == CellState.WALL
-        )
-        ww_count = sum(
-            1 for f in range(self.floors) for c in range(self.cols)
-            if grid.state(c, f) == CellState.WALL_WINDOW
-        )
-        door_cells = sum(
-            1 for f in range(self.floors) for c in range(self.cols)
-            if grid.state(c, f) == CellState.DOOR
-        )
-        bal_cells = sum(
-            1 for f in range(self.floors) for c in range(self.cols)
-            if grid.state(c, f) in (CellState.BALCONY, CellState.BALCONY_UPPER)
-        )
+                      is_front: bool) -> List[trimesh.Trimesh]:
+        grid, door_pl, bal_pl = plan
+
+        counts = grid.counts()
+        wall_count = counts[CellState.WALL]
+        ww_count   = counts[CellState.WALL_WINDOW]
+        door_cells = counts[CellState.DOOR]
+        bal_cells  = counts[CellState.BALCONY] + counts[CellState.BALCONY_UPPER]
         label = "front" if is_front else "back"
         logger.info(
             f"{label.capitalize()} facade plan: "
@@ -687,7 +1009,11 @@ class GridFacadeAssembler:
 
     # ── Side facades (walls only) ─────────────────────────────────
 
-    def _build_side_facade(self, x_pos: float, is_left: bool) -> List[trimesh.Trimesh]:
+    def _build_side_facade(self,
+                           x_pos: float,
+                           is_left: bool,
+                           keep: Optional[Callable[[int, int], bool]] = None
+                           ) -> List[trimesh.Trimesh]:
         meshes: List[trimesh.Trimesh] = []
         wall_orig = self.loader.load("wall")
         if wall_orig is None:
@@ -695,11 +1021,14 @@ class GridFacadeAssembler:
             return meshes
 
         angle = -np.pi / 2 if is_left else np.pi / 2
+        facade = "left" if is_left else "right"
 
 
         for floor in range(self.floors):
             z_bottom = floor * self.cell_height
             for d in range(self.depth_cells):
+                if keep is not None and not keep(d, floor):
+                    continue
                 w = wall_orig.copy()
                 _scale_exact(w, self.cell_width, self.cell_height)
 
@@ -716,7 +1045,7 @@ class GridFacadeAssembler:
                     (d + 0.5) * self.cell_width       - (b[0][1] + b[1][1]) * 0.5,
                     z_bottom                          - b[0][2],
                 ])
-                meshes.append(w)
+                meshes.append(_tag_cell(w, facade, d, floor))
 
         label = "left" if is_left else "right"
         logger.info(f"{label.capitalize()} side facade: {len(meshes)} walls")
@@ -724,14 +1053,10 @@ class GridFacadeAssembler:
 
     # ── Main assembly ─────────────────────────────────────────────
 
-    def assemble_building(self) -> Optional[trimesh.Scene]:
-        """
-        Assemble all facade meshes into a trimesh.Scene in Y-up orientation.
-
-        Internal assembly uses Z-up (height = Z).  A -90° rotation around X
-        is applied to every mesh at the end to convert to Three.js Y-up so the
-        exported OBJ renders upright without further client-side transforms.
-        """
+    def _assemble_meshes(self,
+                         plans: Optional[Dict[str, Tuple[FacadeGrid, List, List]]] = None
+                         ) -> List[trimesh.Trimesh]:
+        """All building meshes, cell-tagged and already rotated to Y-up."""
         entrance_cols = self._entrance_cols()
         logger.info(
             f"Assembly start — entrance cols: {entrance_cols}, "
@@ -740,6 +1065,9 @@ class GridFacadeAssembler:
             f"(window density: {self._window_density(self.texture_scale):.2f})"
         )
 
+        if plans is None:
+            plans = self._plan_facades(entrance_cols)
+        self._resolve_pending()
         all_meshes: List[trimesh.Trimesh] = []
 
         # Solid structural base volume
@@ -751,28 +1079,308 @@ class GridFacadeAssembler:
             self.building_depth  / 2,
             self.building_height / 2,
         ])
+        base.metadata["facade"] = "base"
         all_meshes.append(base)
 
         # Front facade (y=0, has doors, modules flipped to face outward)
-        all_meshes.extend(self._build_facade(0.0,                 True,  entrance_cols))
+        with stage(self.progress, "facade", facade="front"):
+            all_meshes.extend(self._build_facade(plans["front"], 0.0, True))
         # Back facade (y=depth, no doors, default outward orientation is correct)
-        all_meshes.extend(self._build_facade(self.building_depth, False, entrance_cols))
+        with stage(self.progress, "facade", facade="back"):
+            all_meshes.extend(self._build_facade(plans["back"], self.building_depth, False))
         # Side facades (walls only, rotated 90° around Z)
-        all_meshes.extend(self._build_side_facade(0.0,                 is_left=True))
-        all_meshes.extend(self._build_side_facade(self.building_width, is_left=False))
+        with stage(self.progress, "facade", facade="left"):
+            all_meshes.extend(self._build_side_facade(0.0,                 is_left=True))
+        with stage(self.progress, "facade", facade="right"):
+            all_meshes.extend(self._build_side_facade(self.building_width, is_left=False))
 
         # Convert from internal Z-up to Three.js Y-up by rotating -90° around X.
         rot_yup = trimesh.transformations.rotation_matrix(-np.pi / 2, [1, 0, 0])
+        for mesh in all_meshes:
+            mesh.apply_transform(rot_yup)
+        return all_meshes
 
+    @staticmethod
+    @traced()
+    def _to_scene(meshes: List[trimesh.Trimesh]) -> trimesh.Scene:
         scene = trimesh.Scene()
-        for i, mesh in enumerate(all_meshes):
-            mesh.apply_transform(rot_yup)
+        for i, mesh in enumerate(meshes):
             scene.add_geometry(mesh, node_name=f'mesh_{i:04d}')
+        return scene
+
+    def assemble_building(self) -> Optional[trimesh.Scene]:
+        """
+        Assemble all facade meshes into a trimesh.Scene in Y-up orientation.
 
-        total = len(all_meshes)
-        logger.info(f"Assembly complete — {total} mesh components in scene")
+        Internal assembly uses Z-up (height = Z).  A -90° rotation around X
+        is applied to every mesh at the end to convert to Three.js Y-up so the
+        exported OBJ renders upright without further client-side transforms.
+        """
+        scene = self._to_scene(self._assemble_meshes())
+        logger.info(f"Assembly complete — {len(scene.geometry)} mesh components in scene")
         return scene
 
+    # ── Chunked / incremental export ──────────────────────────────
+
+    @property
+    def chunked(self) -> bool:
+        return self.chunk_floors > 0 or self.chunk_columns > 0
+
+    def _chunk_key_for(self, facade: str, col: int, floor: int) -> Tuple[str, int, int]:
+        """(facade, floor_band, column_band) of the chunk containing a cell."""
+        return (
+            facade,
+            floor // self.chunk_floors if self.chunk_floors else 0,
+            col // self.chunk_columns if self.chunk_columns else 0,
+        )
+
+    def _chunk_key(self, mesh: trimesh.Trimesh) -> Tuple[str, int, int]:
+        facade = mesh.metadata.get("facade", "base")
+        cell = mesh.metadata.get("cell")
+        if cell is None:
+            return (facade, 0, 0)
+        return self._chunk_key_for(facade, *cell)
+
+    @staticmethod
+    def _chunk_id(key: Tuple[str, int, int]) -> str:
+        facade, f_band, c_band = key
+        return facade if facade == "base" else f"{facade}_f{f_band:02d}_c{c_band:02d}"
+
+    def _chunk_keys(self) -> List[Tuple[str, int, int]]:
+        """Every chunk of the building, in export order."""
+        keys: List[Tuple[str, int, int]] = [("base", 0, 0)]
+        f_step = self.chunk_floors or self.floors
+        for facade, n_cols in (("front", self.cols), ("back", self.cols),
+                               ("left", self.depth_cells), ("right", self.depth_cells)):
+            c_step = self.chunk_columns or n_cols
+            for f_band in range(math.ceil(self.floors / f_step)):
+                for c_band in range(math.ceil(n_cols / c_step)):
+                    keys.append((facade, f_band, c_band))
+        return keys
+
+    def _chunk_extent(self, facade: str, floor_band: int, col_band: int) -> Dict[str, List[int]]:
+        """Inclusive floor / column ranges covered by a chunk."""
+        if facade == "base":
+            return {"floors": [0, self.floors - 1], "cols": [0, self.cols - 1]}
+        n_cols = self.depth_cells if facade in ("left", "right") else self.cols
+        f_step = self.chunk_floors or self.floors
+        c_step = self.chunk_columns or n_cols
+        return {
+            "floors": [floor_band * f_step, min(self.floors, (floor_band + 1) * f_step) - 1],
+            "cols":   [col_band * c_step,   min(n_cols,      (col_band + 1) * c_step) - 1],
+        }
+
+    def _layout(self) -> Dict[str, Any]:
+        """Building-wide values every chunk's geometry depends on."""
+        return {
+            "version": PLAN_VERSION,
+            "grid": [self.cols, self.floors, self.depth_cells],
+            "cell": [round(self.cell_width, 6), round(self.cell_height, 6),
+                     round(self.wall_depth, 6)],
+            "chunk": [self.chunk_floors, self.chunk_columns],
+        }
+
+    def _chunk_signature(self,
+                         key: Tuple[str, int, int],
+                         plans: Dict[str, Tuple[FacadeGrid, List, List]],
+                         fingerprints: Dict[str, Any]) -> str:
+        """
+        Digest of everything a chunk's meshes depend on: layout, the cell
+        states and placements anchored in it, and the source files of the
+        modules it actually uses.  Equal digests ⇒ the chunk OBJ can be reused.
+        """
+        facade = key[0]
+        extent = self._chunk_extent(*key)
+        payload: Dict[str, Any] = {
+            "layout": self._layout(),
+            "key": list(key),
+            "extent": extent,
+        }
+        if facade != "base":
+            payload["wall"] = fingerprints.get("wall")
+        if facade in plans:
+            grid, doors, bals = plans[facade]
+            f0, f1 = extent["floors"]
+            c0, c1 = extent["cols"]
+            states = grid.values(slice(f0, f1 + 1), slice(c0, c1 + 1))
+            own_doors = [list(p) for p in doors
+                         if self._chunk_key_for(facade, p[0], 0) == key]
+            own_bals = [list(p) for p in bals
+                        if self._chunk_key_for(facade, p[0], p[1]) == key]
+            payload.update(states=states, doors=own_doors, balconies=own_bals)
+            if any(CellState.WALL_WINDOW.value in row for row in states):
+                payload["wall_window"] = fingerprints.get("wall_window")
+            if own_doors:
+                payload["door"] = fingerprints.get("door")
+            if own_bals:
+                payload["balcony"] = fingerprints.get("balcony")
+        blob = json.dumps(payload, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(blob).hexdigest()[:16]
+
+    @traced()
+    def _build_chunks(self,
+                      plans: Dict[str, Tuple[FacadeGrid, List, List]],
+                      dirty: set) -> Dict[Tuple[str, int, int], List[trimesh.Trimesh]]:
+        """Build (Y-up) meshes for the *dirty* chunk keys only, grouped by chunk."""
+        def keep_for(facade: str) -> Callable[[int, int], bool]:
+            return lambda col, floor: self._chunk_key_for(facade, col, floor) in dirty
+
+        facades = {k[0] for k in dirty}
+        meshes: List[trimesh.Trimesh] = []
+        if "base" in facades:
+            base = trimesh.creation.box(
+                extents=[self.building_width, self.building_depth, self.building_height]
+            )
+            base.apply_translation([
+                self.building_width  / 2,
+                self.building_depth  / 2,
+                self.building_height / 2,
+            ])
+            base.metadata["facade"] = "base"
+            meshes.append(base)
+        for facade, y_center, is_front in (("front", 0.0, True),
+                                           ("back", self.building_depth, False)):
+            if facade in facades:
+                grid, door_pl, bal_pl = plans[facade]
+                with stage(self.progress, "facade", facade=facade):
+                    meshes.extend(self._build_from_plan(grid, door_pl, bal_pl, y_center,
+                                                        is_front, keep=keep_for(facade)))
+        for facade, x_pos, is_left in (("left", 0.0, True),
+                                       ("right", self.building_width, False)):
+            if facade in facades:
+                with stage(self.progress, "facade", facade=facade):
+                    meshes.extend(self._build_side_facade(x_pos, is_left,
+                                                          keep=keep_for(facade)))
+
+        rot_yup = trimesh.transformations.rotation_matrix(-np.pi / 2, [1, 0, 0])
+        groups: Dict[Tuple[str, int, int], List[trimesh.Trimesh]] = {k: [] for k in dirty}
+        for mesh in meshes:
+            mesh.apply_transform(rot_yup)
+            groups.setdefault(self._chunk_key(mesh), []).append(mesh)
+        return groups
+
+    @staticmethod
+    def load_previous_export(output_dir: Path) -> Optional[Dict[str, Any]]:
+        """Stored plan + chunk manifest of an earlier export, or None."""
+        plan_path = Path(output_dir) / PLAN_FILE
+        manifest_path = Path(output_dir) / CHUNKS_MANIFEST
+        if not plan_path.exists() or not manifest_path.exists():
+            return None
+        try:
+            plan = json.loads(plan_path.read_text(encoding="utf-8"))
+            plan["manifest"] = json.loads(manifest_path.read_text(encoding="utf-8"))
+            return plan
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Ignoring unreadable previous export in {output_dir}: {exc}")
+            return None
+
+    def export_chunked(self,
+                       output_path: Path,
+                       previous: Optional[Dict[str, Any]] = None,
+                       plans: Optional[Dict[str, Tuple[FacadeGrid, List, List]]] = None
+                       ) -> Dict[str, int]:
+        """
+        Chunked export with reuse: plan every facade, digest every chunk and
+        rebuild only chunks whose digest differs from *previous* (as returned
+        by ``load_previous_export``).  Writes ``chunks/*.obj``, ``chunks.json``,
+        ``plan.json``, the shared ``material.mtl`` and a merged ``house.obj``.
+        """
+        output_dir = Path(output_path).parent
+        chunk_dir = output_dir / "chunks"
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+
+        if plans is None:
+            plans = self._plan_facades(self._entrance_cols())
+        self._resolve_pending()
+        fingerprints = {m: self.loader.fingerprint(m)
+                        for m in ("wall", "wall_window", "door", "balcony")}
+
+        keys = self._chunk_keys()
+        signatures = {k: self._chunk_signature(k, plans, fingerprints) for k in keys}
+
+        old_entries = {c["id"]: c for c in ((previous or {}).get("manifest") or {}).get("chunks", [])}
+        dirty = set()
+        for k in keys:
+            old = old_entries.get(self._chunk_id(k))
+            if (old is None or old.get("signature") != signatures[k]
+                    or not (output_dir / old["file"]).exists()):
+                dirty.add(k)
+
+        materials = MaterialLibrary.from_state(output_dir, (previous or {}).get("materials"))
+        groups = self._build_chunks(plans, dirty) if dirty else {}
+
+        with stage(self.progress, "export", rebuilt=len(dirty)):
+            entries: List[Dict[str, Any]] = []
+            for k in keys:
+                chunk_id = self._chunk_id(k)
+                if k not in dirty:
+                    entries.append(old_entries[chunk_id])
+                    continue
+                group = groups.get(k, [])
+                file_name = f"chunks/{chunk_id}.obj"
+                write_meshes_obj(
+                    ((f"{chunk_id}_{i:04d}", m) for i, m in enumerate(group)),
+                    output_dir / file_name,
+                    materials,
+                    mtllib="../material.mtl",
+                )
+                entry: Dict[str, Any] = {
+                    "id": chunk_id,
+                    "file": file_name,
+                    "facade": k[0],
+                    **self._chunk_extent(*k),
+                    "meshes": len(group),
+                    "signature": signatures[k],
+                }
+                if group:
+                    bb_min = np.min([m.bounds[0] for m in group], axis=0)
+                    bb_max = np.max([m.bounds[1] for m in group], axis=0)
+                    entry["bbox"] = {"min": (bb_min.round(4) + 0.0).tolist(),
+                                     "max": (bb_max.round(4) + 0.0).tolist()}
+                entries.append(entry)
+
+            # Chunk files left over from a different layout
+            live = {e["file"] for e in entries}
+            for stale in chunk_dir.glob("*.obj"):
+                if f"chunks/{stale.name}" not in live:
+                    stale.unlink()
+
+            manifest = {
+                "chunk_floors": self.chunk_floors,
+                "chunk_columns": self.chunk_columns,
+                "floors": self.floors,
+                "columns": self.cols,
+                "depth": self.depth_cells,
+                "chunks": entries,
+            }
+            (output_dir / CHUNKS_MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+            materials.write(output_dir / "material.mtl")
+
+            plan = {
+                "version": PLAN_VERSION,
+                "params": {k: v for k, v in self.params.items() if isinstance(v, (str, int, float, bool, type(None)))},
+                "layout": self._layout(),
+                "modules": fingerprints,
+                "facades": {
+                    name: {"states": grid.to_rows(),
+                           "doors": [list(p) for p in door_pl],
+                           "balconies": [list(p) for p in bal_pl]}
+                    for name, (grid, door_pl, bal_pl) in plans.items()
+                },
+                "materials": materials.to_state(),
+            }
+            (output_dir / PLAN_FILE).write_text(json.dumps(plan, indent=2), encoding="utf-8")
+
+            concatenate_obj_files((output_dir / e["file"] for e in entries),
+                                  output_path, mtllib="material.mtl")
+
+        stats = {"chunks": len(keys), "rebuilt": len(dirty), "reused": len(keys) - len(dirty)}
+        logger.info(
+            f"Chunked export: {stats['chunks']} chunks "
+            f"({stats['rebuilt']} rebuilt, {stats['reused']} reused) → {output_path}"
+        )
+        return stats
+
     def _prepare_for_export(self, output_path: Path) -> None:
         """Copy all textures and create combined MTL with correct paths."""
         import shutil
@@ -781,17 +1389,32 @@ class GridFacadeAssembler:
         texture_dir = output_dir / "textures"
         texture_dir.mkdir(exist_ok=True)
 
-        # Copy ALL PNG textures from all module types
+        # Copy ALL PNG textures from all module types.  copy2 keeps mtime, so a
+        # destination with the same size and mtime is already up to date —
+        # re-exports (house updates) only stat the files.
         copied = set()
+        written = 0
         for module_type in ["wall", "window", "door", "balcony", "wall_window"]:
             type_dir = self.loader.modules_dir / module_type
             if type_dir.exists():
                 for png in type_dir.rglob("*.png"):
-                    if png.name not in copied:
-                        shutil.copy2(png, texture_dir / png.name)
-                        copied.add(png.name)
-
-        logger.info(f"Copied {len(copied)} textures to {texture_dir}")
+                    # Catalogue previews are not textures
+                    if png.name in copied or png.name == THUMBNAIL_NAME:
+                        continue
+                    copied.add(png.name)
+                    target = texture_dir / png.name
+                    src_stat = png.stat()
+                    try:
+                        dst_stat = target.stat()
+                        if (dst_stat.st_size == src_stat.st_size
+                                and dst_stat.st_mtime_ns == src_stat.st_mtime_ns):
+                            continue
+                    except FileNotFoundError:
+                        pass
+                    shutil.copy2(png, target)
+                    written += 1
+
+        logger.info(f"Textures in {texture_dir}: {len(copied)} ({written} copied)")
 
         # Create combined MTL with correct paths
         mtl_path = output_dir / "house.mtl"
@@ -807,18 +1430,46 @@ class GridFacadeAssembler:
                     content = content.replace("map_Pr ", "map_Pr textures/")
                     mtl_content += content + "\n"
 
-        if mtl_content:
+        if mtl_content and not (mtl_path.exists() and mtl_path.read_text() == mtl_content):
             mtl_path.write_text(mtl_content)
             logger.info(f"Created MTL: {mtl_path}")
 
+    @traced()
     def export_to_obj(self, output_path: Path) -> bool:
-        scene = self.assemble_building()
-        if scene is None:
+        if self.chunked:
+            return self.update_export(output_path, previous=None)
+        # Plan while pending modules are still generating, then wait for them
+        meshes = self._assemble_meshes(self._plan_facades(self._entrance_cols()))
+        if not meshes:
             logger.error("Assembly failed — nothing to export.")
             return False
+        scene = self._to_scene(meshes)
+        logger.info(f"Assembly complete — {len(meshes)} mesh components in scene")
+        try:
+            with stage(self.progress, "texture_packing"):
+                self._prepare_for_export(output_path)  # ← ДОБАВИТЬ
+            # Stream node by node instead of scene.export(): peak memory stays
+            # bounded by the largest single mesh rather than the whole building.
+            with stage(self.progress, "export"):
+                export_scene_obj_streaming(scene, output_path)
+            logger.info(f"Exported: {output_path}")
+            return True
+        except Exception as exc:
+            logger.error(f"Export failed: {exc}", exc_info=True)
+            return False
+
+
+    @traced()
+    def update_export(self,
+                      output_path: Path,
+                      previous: Optional[Dict[str, Any]] = None) -> bool:
+        """Chunked (re-)export; only chunks that differ from *previous* are rebuilt."""
         try:
-            self._prepare_for_export(output_path)  # ← ДОБАВИТЬ
-            scene.export(str(output_path))
+            plans = self._plan_facades(self._entrance_cols())
+            self._resolve_pending()
+            with stage(self.progress, "texture_packing"):
+                self._prepare_for_export(output_path)
+            self.last_export_stats = self.export_chunked(output_path, previous, plans)
             logger.info(f"Exported: {output_path}")
             return True
         except Exception as exc:
@@ -828,7 +1479,44 @@ class GridFacadeAssembler:
 
 # ========================= PUBLIC API =========================
 
-def assemble_building(params: Dict[str, Any], models_dir: Path, output_path: Path) -> bool:
-    """Entry point called by server.py — signature unchanged."""
-    assembler = GridFacadeAssembler(params, models_dir)
+def assemble_building(params: Dict[str, Any],
+                      models_dir: Path,
+                      output_path: Path,
+                      progress: Optional[ProgressHook] = None,
+                      pending: Optional[Dict[str, "Future[Optional[str]]"]] = None) -> bool:
+    """
+    Entry point called by server.py; *progress* receives stage events.
+    *pending* — module ids still being generated (see GridFacadeAssembler);
+    once resolved they are written back into *params*.
+    """
+    assembler = GridFacadeAssembler(params, models_dir, progress=progress, pending=pending)
     return assembler.export_to_obj(output_path)
+
+
+def update_building(params: Dict[str, Any],
+                    models_dir: Path,
+                    output_path: Path,
+                    progress: Optional[ProgressHook] = None) -> Optional[Dict[str, int]]:
+    """
+    Re-export an existing house after a parameter change, reusing every chunk
+    whose cells and modules are unchanged.  Returns chunk statistics
+    (``chunks`` / ``rebuilt`` / ``reused``) or None on failure.
+    """
+    assembler = GridFacadeAssembler(params, models_dir, progress=progress)
+    if not assembler.chunked:
+        raise ValueError("Incremental update requires chunk_floors and/or chunk_columns.")
+    previous = GridFacadeAssembler.load_previous_export(Path(output_path).parent)
+    if not assembler.update_export(output_path, previous):
+        return None
+    return assembler.last_export_stats
+
+
+def warm_module_cache(obj_paths: Iterable[Path]) -> int:
+    """Pre-load module OBJs into the shared mesh cache (e.g. at server startup)."""
+    loaded = MODULE_MESH_CACHE.warm(obj_paths)
+    stats = MODULE_MESH_CACHE.stats()
+    logger.info(
+        f"Module mesh cache warmed: {loaded} modules, "
+        f"{stats['bytes'] / (1024 * 1024):.1f} MiB"
+    )
+    return loaded
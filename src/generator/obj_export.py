@@ -0,0 +1,267 @@
+"""
+obj_export.py — Streaming Wavefront OBJ writer for assembled scenes
+
+trimesh's ``scene.export("house.obj")`` renders the complete OBJ text in memory
+before writing it, so peak memory grows with the whole building.  This writer
+walks the scene node by node, formats one mesh at a time and writes it to a
+buffered file handle, keeping running vertex / UV offsets so face indices stay
+global.  Peak memory is bounded by the largest single mesh.
+
+Output layout matches trimesh's exporter (``mtllib material.mtl``, one ``o``
+block per node, ``usemtl`` per textured mesh, texture images written next to
+the OBJ), so viewers and the frontend loader see the same files as before.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import trimesh
+from trimesh import util
+
+from src.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Write buffer for the OBJ handle — large enough to batch many small meshes.
+OBJ_WRITE_BUFFER = 1 << 20
+
+
+def _has_uv(mesh: trimesh.Trimesh) -> bool:
+    uv = getattr(mesh.visual, "uv", None)
+    return uv is not None and len(np.shape(uv)) == 2 and len(uv) == len(mesh.vertices)
+
+
+def _format_faces(faces_v: np.ndarray, faces_vt: Optional[np.ndarray] = None) -> str:
+    """``f`` lines for triangle faces; vertex and UV indices may differ."""
+    if faces_vt is None:
+        row = "f {} {} {}"
+        values = faces_v.ravel()
+    else:
+        row = "f {}/{} {}/{} {}/{}"
+        values = np.stack([faces_v, faces_vt], axis=2).ravel()
+    return "\n".join([row] * len(faces_v)).format(*values.tolist())
+
+
+class MaterialLibrary:
+    """
+    Dedupes materials by content hash and writes their images exactly once.
+
+    One library can be shared by several OBJ files (e.g. a house and its
+    chunks) so they all reference the same material names and image files.
+    Meshes carrying ``metadata["material_key"]`` (set by the assembler's module
+    cache) are deduped by that key; others fall back to trimesh's content hash.
+    Keyed entries survive ``to_state()`` / ``from_state()`` round trips, so an
+    incremental re-export keeps the material names of untouched files valid.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self._by_key: Dict[Union[str, int], str] = {}
+        self._names: set = set()
+        self._written_files: set = set()
+        self.mtl_chunks: List[bytes] = []
+
+    def name_for(self, mesh: trimesh.Trimesh) -> Optional[str]:
+        material = getattr(mesh.visual, "material", None)
+        if material is None:
+            return None
+        key = mesh.metadata.get("material_key")
+        if key is not None and key in self._by_key:
+            return self._by_key[key]
+
+        if hasattr(material, "to_simple"):
+            material = material.to_simple()
+        if key is None:
+            key = hash(material)
+            name = self._by_key.get(key)
+            if name is not None:
+                return name
+
+        name = util.unique_name(material.name, self._names)
+        self._names.add(name)
+        self._by_key[key] = name
+
+        data, _ = material.to_obj(name=name)
+        for file_name, file_data in data.items():
+            if file_name.lower().endswith(".mtl"):
+                self.mtl_chunks.append(file_data)
+            elif file_name not in self._written_files:
+                (self.output_dir / file_name).write_bytes(file_data)
+                self._written_files.add(file_name)
+        return name
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot (only process-stable string keys are kept)."""
+        return {
+            "keys": {k: v for k, v in self._by_key.items() if isinstance(k, str)},
+            "names": sorted(self._names),
+            "files": sorted(self._written_files),
+            "mtl": [chunk.decode("utf-8") for chunk in self.mtl_chunks],
+        }
+
+    @classmethod
+    def from_state(cls, output_dir: Path, state: Optional[Dict[str, Any]]) -> "MaterialLibrary":
+        lib = cls(output_dir)
+        if not state:
+            return lib
+        lib._by_key.update(state.get("keys", {}))
+        lib._names.update(state.get("names", []))
+        # Only trust image files that are still on disk.
+        lib._written_files.update(
+            f for f in state.get("files", []) if (lib.output_dir / f).exists()
+        )
+        lib.mtl_chunks = [m.encode("utf-8") for m in state.get("mtl", [])]
+        return lib
+
+    def write(self, mtl_path: Path) -> Optional[Path]:
+        """Write the collected ``newmtl`` blocks; returns None when nothing was textured."""
+        if not self.mtl_chunks:
+            return None
+        Path(mtl_path).write_bytes(b"\n\n".join(self.mtl_chunks))
+        return Path(mtl_path)
+
+
+@traced(cat="export")
+def write_meshes_obj(named_meshes: Iterable[Tuple[str, trimesh.Trimesh]],
+                     output_path: Path,
+                     materials: MaterialLibrary,
+                     mtllib: Optional[str] = None,
+                     digits: int = 8) -> int:
+    """
+    Stream ``(name, mesh)`` pairs into one OBJ file; returns the vertex count.
+
+    Meshes are written in world space as given.  *mtllib* is the reference
+    written at the top of the file (relative to the OBJ); the caller writes the
+    library itself once all files sharing it are done.
+    """
+    v_offset = 0
+    vt_offset = 0
+    with open(output_path, "w", encoding="utf-8", buffering=OBJ_WRITE_BUFFER) as f:
+        if mtllib:
+            f.write(f"mtllib {mtllib}\n")
+
+        for name, mesh in named_meshes:
+            if len(mesh.vertices) == 0:
+                continue
+            f.write(f"\no {name}\n")
+
+            has_uv = _has_uv(mesh)
+            mat_name = materials.name_for(mesh) if has_uv else None
+            if mat_name is not None:
+                f.write(f"usemtl {mat_name}\n")
+
+            f.write("v ")
+            f.write(util.array_to_string(mesh.vertices, col_delim=" ",
+                                         row_delim="\nv ", digits=digits))
+            f.write("\n")
+
+            faces_v = mesh.faces + 1 + v_offset
+            if has_uv:
+                f.write("vt ")
+                f.write(util.array_to_string(mesh.visual.uv, col_delim=" ",
+                                             row_delim="\nvt ", digits=digits))
+                f.write("\n")
+                faces_vt = mesh.faces + 1 + vt_offset
+                f.write(_format_faces(faces_v, faces_vt))
+                vt_offset += len(mesh.visual.uv)
+            else:
+                f.write(_format_faces(faces_v))
+            f.write("\n")
+
+            v_offset += len(mesh.vertices)
+    return v_offset
+
+
+@traced(cat="export")
+def concatenate_obj_files(paths: Iterable[Path],
+                          output_path: Path,
+                          mtllib: Optional[str] = None) -> Path:
+    """
+    Merge OBJ files written by ``write_meshes_obj`` into one file.
+
+    Face indices are shifted by the running vertex / UV counts; ``mtllib``
+    lines of the inputs are dropped in favour of a single *mtllib* header.
+    Only one input file is held in memory at a time.
+    """
+    v_offset = 0
+    vt_offset = 0
+    with open(output_path, "w", encoding="utf-8", buffering=OBJ_WRITE_BUFFER) as out:
+        if mtllib:
+            out.write(f"mtllib {mtllib}\n")
+        for path in paths:
+            n_v = 0
+            n_vt = 0
+            with open(path, "r", encoding="utf-8") as src:
+                for line in src:
+                    if line.startswith("v "):
+                        n_v += 1
+                    elif line.startswith("vt "):
+                        n_vt += 1
+                    elif line.startswith("f "):
+                        if v_offset or vt_offset:
+                            line = "f " + " ".join(
+                                _shift_face_vertex(tok, v_offset, vt_offset)
+                                for tok in line[2:].split()
+                            ) + "\n"
+                    elif line.startswith("mtllib "):
+                        continue
+                    out.write(line)
+            v_offset += n_v
+            vt_offset += n_vt
+    return Path(output_path)
+
+
+def _shift_face_vertex(token: str, v_offset: int, vt_offset: int) -> str:
+    parts = token.split("/")
+    parts[0] = str(int(parts[0]) + v_offset)
+    if len(parts) > 1 and parts[1]:
+        parts[1] = str(int(parts[1]) + vt_offset)
+    return "/".join(parts)
+
+
+def _scene_nodes(scene: trimesh.Scene) -> Iterable[Tuple[str, trimesh.Trimesh]]:
+    for node in scene.graph.nodes_geometry:
+        transform, geom_name = scene.graph[node]
+        mesh = scene.geometry.get(geom_name)
+        if not isinstance(mesh, trimesh.Trimesh):
+            continue
+        if not np.allclose(transform, np.eye(4)):
+            mesh = mesh.copy()
+            mesh.apply_transform(transform)
+        yield node, mesh
+
+
+@traced(cat="export")
+def export_scene_obj_streaming(scene: trimesh.Scene,
+                               output_path: Path,
+                               mtl_name: str = "material.mtl",
+                               materials: Optional[MaterialLibrary] = None,
+                               digits: int = 8) -> Path:
+    """
+    Write *scene* to *output_path* as OBJ, one node at a time.
+
+    Node transforms are applied to a per-node copy only when they differ from
+    identity (the assembler bakes transforms into the meshes, so normally no
+    copy is made).  When *materials* is given the caller owns the library and
+    must ``write()`` it; otherwise *mtl_name* is written next to the OBJ.
+    """
+    output_path = Path(output_path)
+    own_library = materials is None
+    if own_library:
+        materials = MaterialLibrary(output_path.parent)
+
+    textured = any(_has_uv(m) for m in scene.geometry.values()
+                   if isinstance(m, trimesh.Trimesh))
+    n_vertices = write_meshes_obj(_scene_nodes(scene), output_path, materials,
+                                  mtllib=mtl_name if textured else None, digits=digits)
+
+    if own_library:
+        materials.write(output_path.parent / mtl_name)
+
+    logger.info(
+        f"Streamed OBJ: {output_path.name} — {len(scene.graph.nodes_geometry)} nodes, "
+        f"{n_vertices} vertices, {len(materials.mtl_chunks)} materials"
+    )
+    return output_path
@@ -32,6 +32,7 @@
 from __future__ import annotations
 
 import argparse
+import contextvars
 import json
 import math
 import re
@@ -70,6 +71,7 @@ from src.generator.procedural.procedural_texture_maps.procedural_color_texture i
     make_vertical_stripes_texture,
     make_wood_plank_color_texture,
 )
+from src.tracing import traced
 
 
 # Плитки атласа (слева направо): низ | верх | рама | стекло | бок корзина | бок у окна | перегородка | крыша
@@ -83,8 +85,14 @@ BALCONY_TILE_SIDE_JAMB = 5
 BALCONY_TILE_SIDE_SEPARATOR = 6
 BALCONY_TILE_ROOF = 7
 
-# Сторона квадрата тайла атласа (px); задаётся в export_balcony для inset в _scale_uv_to_tile.
-_BALCONY_ATLAS_TILE_PX: int = 512
+# Сторона квадрата тайла атласа (px) по умолчанию — для inset в _scale_uv_to_tile.
+BALCONY_ATLAS_TILE_PX_DEFAULT: int = 512
+# Тайл текущей сборки: build_balcony_meshes(tile_px=...) выставляет его на время
+# вызова в своём контексте, поэтому параллельные сборки (пул потоков сервера)
+# с разным atlas_tile не видят inset друг друга.
+_ATLAS_TILE_PX: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "balcony_atlas_tile_px", default=BALCONY_ATLAS_TILE_PX_DEFAULT
+)
 
 
 USER_BALCONY: dict[str, Any] = {
@@ -661,10 +669,9 @@ def _scale_uv_to_tile(
     Без inset соседние тайлы в атласе соприкасаются вплотную; билинейная фильтрация на границах
     (u = k/N) подмешивает соседний материал и даёт «радужные» артефакты в Open3D / других вьюерах.
     """
-    global _BALCONY_ATLAS_TILE_PX
     n = float(BALCONY_ATLAS_NUM_TILES)
     w = 1.0 / n
-    tp = int(tile_px if tile_px is not None else _BALCONY_ATLAS_TILE_PX)
+    tp = int(tile_px if tile_px is not None else _ATLAS_TILE_PX.get())
     tw = float(max(tp, 64))
     half_u_local = (0.5 / tw) * w
     half_v_local = 0.5 / tw
@@ -2079,6 +2086,22 @@ def _balcony_procedural_window_parts(
 
 
 def build_balcony_meshes(
+    *,
+    tile_px: int = BALCONY_ATLAS_TILE_PX_DEFAULT,
+    **params: Any,
+) -> Tuple[List[Tuple[str, trimesh.Trimesh]], List[Tuple[str, trimesh.Trimesh]]]:
+    """
+    Меши балкона (стены, окна) с UV в тайлах атласа со стороной tile_px.
+    Параметры геометрии — как у _build_balcony_meshes.
+    """
+    token = _ATLAS_TILE_PX.set(max(int(tile_px), 64))
+    try:
+        return _build_balcony_meshes(**params)
+    finally:
+        _ATLAS_TILE_PX.reset(token)
+
+
+def _build_balcony_meshes(
     *,
     width_back: float,
     width_front: float,
@@ -2744,6 +2767,7 @@ def build_balcony_meshes(
     return wall_parts, window_parts
 
 
+@traced(cat="export")
 def export_balcony(
     out_dir: Path | None = None,
     *,
@@ -2801,9 +2825,9 @@ def export_balcony(
     u = USER_BALCONY
     p = {**u, **kw_rest}
     ph = p.get("parapet_height")
-    global _BALCONY_ATLAS_TILE_PX
-    _BALCONY_ATLAS_TILE_PX = max(int(atlas_tile), 64)
+    tile_px = max(int(atlas_tile), 64)
     wall_parts, win_parts = build_balcony_meshes(
+        tile_px=tile_px,
         width_back=float(p["width_back"]),
         width_front=float(p["width_front"]),
         depth=float(p["depth"]),
@@ -2913,7 +2937,7 @@ def export_balcony(
             tile_i = BALCONY_TILE_ROOF
         else:
             tile_i = BALCONY_TILE_WALL_LOWER
-        m2.visual = trimesh.visual.texture.TextureVisuals(uv=_scale_uv_to_tile(uv, tile_i))
+        m2.visual = trimesh.visual.texture.TextureVisuals(uv=_scale_uv_to_tile(uv, tile_i, tile_px=tile_px))
         mesh_blocks.append(m2)
 
     for name, m in win_parts:
@@ -2923,9 +2947,9 @@ def export_balcony(
         is_door_glass = name.startswith("door_") and "glass" in name
         is_door_solid = name.startswith("door_") and not is_door_glass
         if name == "frame" or is_door_solid:
-            uv_t = _scale_uv_to_tile(uv, BALCONY_TILE_FRAME)
+            uv_t = _scale_uv_to_tile(uv, BALCONY_TILE_FRAME, tile_px=tile_px)
         else:
-            uv_t = _scale_uv_to_tile(uv, BALCONY_TILE_GLASS)
+            uv_t = _scale_uv_to_tile(uv, BALCONY_TILE_GLASS, tile_px=tile_px)
         m2.visual = trimesh.visual.texture.TextureVisuals(uv=uv_t)
         if name == "glass" or is_door_glass:
             m2 = _double_sided_copy_uv(m2)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from src.generator.procedural.open3d_preview import preview_window_obj_open3d
 from src.generator.procedural.procedural_balcony import export_balcony
@@ -13,6 +13,7 @@ from src.generator.procedural.procedural_window import (
     export_window_demo,
     export_window_demo_with_procedural_texture_maps,
 )
+from src.generator.progress import ProgressHook, stage
 
 
 def _no_view_from_json(raw: Any, *, default: bool = True) -> bool:
@@ -193,7 +194,12 @@ def _prepare_call(
     return out_dir, cfg
 
 
-def run_all_generators(config: Dict[str, Any], *, default_out_root: Path) -> dict[str, Path]:
+def run_all_generators(
+    config: Dict[str, Any],
+    *,
+    default_out_root: Path,
+    progress: Optional[ProgressHook] = None,
+) -> dict[str, Path]:
     """
     Оркестратор: только вызовы экспорт-функций процедурных генераторов.
     Ожидает словарь конфигурации с ключами:
@@ -203,79 +209,89 @@ def run_all_generators(config: Dict[str, Any], *, default_out_root: Path) -> dic
     При no_view: false — превью через ``open3d_preview``; опционально другой бэкенд: переменная
     ``PROCEDURAL_MESH_PREVIEW=plotly`` (браузер) или ``system`` (``.obj`` в приложении ОС). Для Open3D: ``pip install open3d``.
     Балкон на Windows: стабильное ``draw_geometries``; Filament для балкона: ``OPEN3D_BALCONY_FILAMENT_PREVIEW=1``.
+
+    ``progress`` — необязательный хук (см. ``src.generator.progress``): каждая
+    включённая секция сообщается как стадия ``generator`` с полем ``section``.
     """
     out: dict[str, Path] = {}
 
     balcony_cfg = config.get("balcony")
     if isinstance(balcony_cfg, dict) and balcony_cfg.get("enabled", True):
-        out_dir, kwargs = _prepare_call(balcony_cfg, default_out_root=default_out_root, default_name="balcony")
-        kwargs.pop("enabled", None)
-        _merge_texture_block(kwargs, section="balcony")
-        out["balcony"] = export_balcony(out_dir=out_dir, **kwargs)
+        with stage(progress, "generator", section="balcony"):
+            out_dir, kwargs = _prepare_call(balcony_cfg, default_out_root=default_out_root, default_name="balcony")
+            kwargs.pop("enabled", None)
+            _merge_texture_block(kwargs, section="balcony")
+            out["balcony"] = export_balcony(out_dir=out_dir, **kwargs)
 
     entrance_cfg = config.get("entrance")
     if isinstance(entrance_cfg, dict) and entrance_cfg.get("enabled", True):
-        out_dir, kwargs = _prepare_call(entrance_cfg, default_out_root=default_out_root, default_name="entrance")
-        kwargs.pop("enabled", None)
-        out["entrance"] = export_entrance(out_dir=out_dir, **kwargs)
+        with stage(progress, "generator", section="entrance"):
+            out_dir, kwargs = _prepare_call(entrance_cfg, default_out_root=default_out_root, default_name="entrance")
+            kwargs.pop("enabled", None)
+            out["entrance"] = export_entrance(out_dir=out_dir, **kwargs)
 
     entrance_textured_cfg = config.get("entrance_textured")
     if isinstance(entrance_textured_cfg, dict) and entrance_textured_cfg.get("enabled", True):
-        out_dir, kwargs = _prepare_call(
-            entrance_textured_cfg,
-            default_out_root=default_out_root,
-            default_name="entrance_textured",
-        )
-        kwargs.pop("enabled", None)
-        _merge_texture_block(kwargs, section="entrance_textured")
-        out["entrance_textured"] = export_entrance_textured(out_dir=out_dir, **kwargs)
+        with stage(progress, "generator", section="entrance_textured"):
+            out_dir, kwargs = _prepare_call(
+                entrance_textured_cfg,
+                default_out_root=default_out_root,
+                default_name="entrance_textured",
+            )
+            kwargs.pop("enabled", None)
+            _merge_texture_block(kwargs, section="entrance_textured")
+            out["entrance_textured"] = export_entrance_textured(out_dir=out_dir, **kwargs)
 
     window_cfg = config.get("window")
     if isinstance(window_cfg, dict) and window_cfg.get("enabled", True):
-        out_dir, kwargs = _prepare_call(window_cfg, default_out_root=default_out_root, default_name="window")
-        kwargs.pop("enabled", None)
-        _merge_texture_block(kwargs, section="window")
-        no_view = _no_view_from_json(kwargs.pop("no_view", True))
-        use_proc = bool(kwargs.pop("use_procedural_maps", False))
-        if use_proc:
-            obj_path = export_window_demo_with_procedural_texture_maps(out_dir=out_dir, **kwargs)
-        else:
-            obj_path = export_window_demo(out_dir=out_dir, **kwargs)
-        out["window"] = obj_path
-        if not no_view:
-            preview_window_obj_open3d(obj_path)
+        with stage(progress, "generator", section="window"):
+            out_dir, kwargs = _prepare_call(window_cfg, default_out_root=default_out_root, default_name="window")
+            kwargs.pop("enabled", None)
+            _merge_texture_block(kwargs, section="window")
+            no_view = _no_view_from_json(kwargs.pop("no_view", True))
+            use_proc = bool(kwargs.pop("use_procedural_maps", False))
+            if use_proc:
+                obj_path = export_window_demo_with_procedural_texture_maps(out_dir=out_dir, **kwargs)
+            else:
+                obj_path = export_window_demo(out_dir=out_dir, **kwargs)
+            out["window"] = obj_path
+            if not no_view:
+                preview_window_obj_open3d(obj_path)
 
     wall_window_cfg = config.get("wall_window")
     if isinstance(wall_window_cfg, dict) and wall_window_cfg.get("enabled", True):
-        out_dir, kwargs = _prepare_call(wall_window_cfg, default_out_root=default_out_root, default_name="wall_window")
-        kwargs.pop("enabled", None)
-        _merge_texture_block(kwargs, section="wall_window")
-        no_view = _no_view_from_json(kwargs.pop("no_view", True))
-        obj_path = export_wall_with_window(out_dir=out_dir, **kwargs)
-        out["wall_window"] = obj_path
-        if not no_view:
-            preview_window_obj_open3d(obj_path)
+        with stage(progress, "generator", section="wall_window"):
+            out_dir, kwargs = _prepare_call(wall_window_cfg, default_out_root=default_out_root, default_name="wall_window")
+            kwargs.pop("enabled", None)
+            _merge_texture_block(kwargs, section="wall_window")
+            no_view = _no_view_from_json(kwargs.pop("no_view", True))
+            obj_path = export_wall_with_window(out_dir=out_dir, **kwargs)
+            out["wall_window"] = obj_path
+            if not no_view:
+                preview_window_obj_open3d(obj_path)
 
     wall_cfg = config.get("wall")
     if isinstance(wall_cfg, dict) and wall_cfg.get("enabled", True):
-        out_dir, kwargs = _prepare_call(wall_cfg, default_out_root=default_out_root, default_name="wall")
-        kwargs.pop("enabled", None)
-        _merge_texture_block(kwargs, section="wall")
-        no_view = _no_view_from_json(kwargs.pop("no_view", True))
-        obj_path = export_wall(out_dir=out_dir, **kwargs)
-        out["wall"] = obj_path
-        if not no_view:
-            preview_window_obj_open3d(obj_path)
+        with stage(progress, "generator", section="wall"):
+            out_dir, kwargs = _prepare_call(wall_cfg, default_out_root=default_out_root, default_name="wall")
+            kwargs.pop("enabled", None)
+            _merge_texture_block(kwargs, section="wall")
+            no_view = _no_view_from_json(kwargs.pop("no_view", True))
+            obj_path = export_wall(out_dir=out_dir, **kwargs)
+            out["wall"] = obj_path
+            if not no_view:
+                preview_window_obj_open3d(obj_path)
 
     roof_cfg = config.get("roof")
     if isinstance(roof_cfg, dict) and roof_cfg.get("enabled", True):
-        out_dir, kwargs = _prepare_call(roof_cfg, default_out_root=default_out_root, default_name="roof")
-        kwargs.pop("enabled", None)
-        _merge_texture_block(kwargs, section="roof")
-        no_view = _no_view_from_json(kwargs.pop("no_view", True))
-        obj_path = export_roof(out_dir=out_dir, **kwargs)
-        out["roof"] = obj_path
-        if not no_view:
-            preview_window_obj_open3d(obj_path)
+        with stage(progress, "generator", section="roof"):
+            out_dir, kwargs = _prepare_call(roof_cfg, default_out_root=default_out_root, default_name="roof")
+            kwargs.pop("enabled", None)
+            _merge_texture_block(kwargs, section="roof")
+            no_view = _no_view_from_json(kwargs.pop("no_view", True))
+            obj_path = export_roof(out_dir=out_dir, **kwargs)
+            out["roof"] = obj_path
+            if not no_view:
+                preview_window_obj_open3d(obj_path)
 
     return out
@@ -41,6 +41,7 @@ from src.generator.procedural.procedural_door import (
     build_simple_door_slab,
 )
 from src.generator.procedural.texturing.pbr_map_utils import make_normal_map_from_albedo, make_roughness_map_from_albedo
+from src.tracing import traced
 
 _REPO_ROOT = Path(__file__).resolve().parents[3]
 if str(_REPO_ROOT) not in sys.path:
@@ -494,6 +495,7 @@ def build_entrance_meshes(
     return parts
 
 
+@traced(cat="export")
 def export_entrance(
     out_dir: Path | None = None,
     *,
@@ -627,6 +629,7 @@ def _collect_entrance_named_parts(merged: dict[str, Any]) -> List[Tuple[str, tri
     )
 
 
+@traced(cat="export")
 def export_entrance_textured(
     out_dir: Path | None = None,
     *,
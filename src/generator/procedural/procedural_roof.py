@@ -36,6 +36,7 @@ from src.generator.procedural.texturing.pbr_map_utils import make_roughness_map_
 from src.generator.procedural.texturing.surface_texture_assets import make_roof_shingles_pack
 from src.generator.procedural.texturing.window_texture_assets import resolve_texture_path
 from src.generator.procedural.unfolding import faceted_triplanar_uv
+from src.tracing import traced
 
 _REPO_ROOT = Path(__file__).resolve().parents[3]
 if str(_REPO_ROOT) not in sys.path:
@@ -281,6 +282,7 @@ def _resolve_roof_textures(
     return roof_tex_name, roof_normal_name, roof_roughness_name
 
 
+@traced(cat="export")
 def export_roof(
     out_dir: Path | None = None,
     *,
@@ -10,6 +10,8 @@ from typing import Tuple
 import numpy as np
 from PIL import Image
 
+from src.tracing import traced
+
 
 def _ensure_size(size: int) -> int:
     return max(64, int(size))
@@ -74,6 +76,7 @@ def _value_noise_2d(s: int, grid: int, rng: np.random.Generator) -> np.ndarray:
     return (a * (1 - sy) + b * sy).astype(np.float64)
 
 
+@traced(cat="texture")
 def make_stucco_like_normal_map(
     size: int = 512,
     *,
@@ -94,6 +97,7 @@ def make_stucco_like_normal_map(
     return normals_from_scalar_slopes(h, strength=strength, invert_green=invert_green)
 
 
+@traced(cat="texture")
 def make_fine_noise_normal_map(
     size: int = 512,
     *,
@@ -110,6 +114,7 @@ def make_fine_noise_normal_map(
     return normals_from_scalar_slopes(h, strength=strength, invert_green=invert_green)
 
 
+@traced(cat="texture")
 def make_wood_grain_normal_map(
     size: int = 512,
     *,
@@ -159,6 +164,7 @@ def make_wood_grain_normal_map(
     return normals_from_scalar_slopes(h, strength=float(slope_strength), invert_green=invert_green)
 
 
+@traced(cat="texture")
 def make_ceramic_tile_normal_map(
     size: int = 512,
     *,
@@ -211,6 +217,7 @@ def make_ceramic_tile_normal_map(
     return normals_from_scalar_slopes(h, strength=float(slope_strength), invert_green=invert_green)
 
 
+@traced(cat="texture")
 def make_soft_frosted_glass_normal_map(
     size: int = 512,
     *,
@@ -223,6 +230,7 @@ def make_soft_frosted_glass_normal_map(
     return make_fine_noise_normal_map(size, strength=strength, grid=grid, seed=seed, invert_green=invert_green)
 
 
+@traced(cat="texture")
 def make_neutral_flat_normal_map(
     size: int = 512,
     *,
@@ -10,11 +10,14 @@ from typing import Tuple
 import numpy as np
 from PIL import Image
 
+from src.tracing import traced
+
 
 def _ensure_size(size: int) -> int:
     return max(64, int(size))
 
 
+@traced(cat="texture")
 def make_uniform_noise_texture(
     size: int = 512,
     *,
@@ -31,6 +34,7 @@ def make_uniform_noise_texture(
     return Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8), mode="RGB")
 
 
+@traced(cat="texture")
 def make_plaster_facade_texture(
     size: int = 512,
     *,
@@ -72,6 +76,7 @@ def make_plaster_facade_texture(
     return Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8), mode="RGB")
 
 
+@traced(cat="texture")
 def make_vertical_stripes_texture(
     size: int = 512,
     *,
@@ -95,6 +100,7 @@ def make_vertical_stripes_texture(
     return Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8), mode="RGB")
 
 
+@traced(cat="texture")
 def make_wood_plank_color_texture(
     size: int = 512,
     *,
@@ -125,6 +131,7 @@ def make_wood_plank_color_texture(
     return Image.fromarray(np.clip(rgb, 0.0, 255.0).astype(np.uint8), mode="RGB")
 
 
+@traced(cat="texture")
 def make_ceramic_tile_color_texture(
     size: int = 512,
     *,
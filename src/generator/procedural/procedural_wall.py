@@ -25,6 +25,7 @@ from src.generator.procedural.texturing.color_tint import apply_texture_color_ti
 from src.generator.procedural.texturing.pbr_map_utils import make_roughness_map_from_albedo
 from src.generator.procedural.texturing.window_texture_assets import resolve_texture_path
 from src.generator.procedural.unfolding.wall_triplanar import wall_mesh_expanded_uv
+from src.tracing import traced
 
 _REPO_ROOT = Path(__file__).resolve().parents[3]
 _DEFAULT_WALL_DIR = _REPO_ROOT / "data" / "wall_export"
@@ -100,6 +101,7 @@ def _infer_companion_map(base: Path, suffix: str) -> Path | None:
     return None
 
 
+@traced(cat="export")
 def export_wall(
         out_dir: Path | None = None,
         *,
@@ -58,6 +58,7 @@ from src.generator.procedural.procedural_texture_maps.procedural_color_texture i
 from src.generator.procedural.texturing.color_tint import apply_texture_color_tint, parse_texture_color_tint
 from src.generator.procedural.texturing.pbr_map_utils import make_normal_map_from_albedo, make_roughness_map_from_albedo
 from src.generator.procedural.unfolding import frame_glass_atlas_uv_mesh, wall_mesh_expanded_uv
+from src.tracing import traced
 
 _DEFAULT_WALL_WIN_DIR = _REPO_ROOT / "data" / "wall_window_export"
 
@@ -166,6 +167,7 @@ def build_wall_with_window(
     )
 
 
+@traced(cat="export")
 def export_wall_with_window(
     out_dir: Path | None = None,
     *,
@@ -48,6 +48,7 @@ from src.generator.procedural.texturing import (
 )
 from src.generator.procedural.texturing.pbr_map_utils import make_normal_map_from_albedo, make_roughness_map_from_albedo
 from src.generator.procedural.unfolding import faceted_triplanar_uv, frame_glass_atlas_uv_mesh
+from src.tracing import traced
 
 Profile = Literal["rect", "arch", "round"]
 Kind = Literal["fixed", "double_hung", "casement", "french"]
@@ -474,6 +475,7 @@ def resolve_window_frame_glass_params(
 _DEFAULT_WINDOW_OBJ_EXPORT_DIR = Path(__file__).resolve().parents[3] / "data" / "window_export"
 
 
+@traced(cat="export")
 def export_window_demo(
     out_dir: Path | None = None,
     *,
@@ -617,6 +619,7 @@ def export_window_demo(
     return obj_path
 
 
+@traced(cat="export")
 def export_window_demo_with_procedural_texture_maps(
     out_dir: Path | None = None,
     *,
@@ -18,6 +18,7 @@ from src.generator.procedural.procedural_texture_maps.procedural_color_texture i
     make_vertical_stripes_texture,
     make_wood_plank_color_texture,
 )
+from src.tracing import traced
 
 ENTRANCE_ATLAS_NUM_TILES = 3
 TILE_WALL = 0
@@ -81,6 +82,7 @@ def _open_rgb_resize(path: Path | str, size: int) -> Image.Image:
     return im.resize((size, size), resample)
 
 
+@traced(cat="texture")
 def make_entrance_atlas(
     *,
     tile: int = 256,
@@ -3,6 +3,8 @@ from __future__ import annotations
 import numpy as np
 from PIL import Image
 
+from src.tracing import traced
+
 
 def _to_gray01(image: Image.Image) -> np.ndarray:
     a = np.asarray(image.convert("RGB"), dtype=np.float32)
@@ -12,6 +14,7 @@ def _to_gray01(image: Image.Image) -> np.ndarray:
     return g
 
 
+@traced(cat="texture")
 def make_normal_map_from_albedo(image: Image.Image, *, strength: float = 3.5) -> Image.Image:
     """Approximate tangent-space normal map from albedo luminance gradients."""
     h = _to_gray01(image)
@@ -27,6 +30,7 @@ def make_normal_map_from_albedo(image: Image.Image, *, strength: float = 3.5) ->
     return Image.fromarray(rgb, mode="RGB")
 
 
+@traced(cat="texture")
 def make_roughness_map_from_albedo(
     image: Image.Image,
     *,
@@ -16,6 +16,8 @@ from typing import Dict
 import numpy as np
 from PIL import Image
 
+from src.tracing import traced
+
 
 def _repo_root() -> Path:
     return Path(__file__).resolve().parents[4]
@@ -92,6 +94,7 @@ def _pack_from_height(height: np.ndarray, base_color: tuple[int, int, int], *, n
     }
 
 
+@traced(cat="texture")
 def make_rough_wall_pack(
     size: int = 512,
     *,
@@ -107,6 +110,7 @@ def make_rough_wall_pack(
     return _pack_from_height(n, (148, 142, 134), normal_strength=5.0)
 
 
+@traced(cat="texture")
 def make_cracked_wall_pack(
     size: int = 512,
     *,
@@ -153,6 +157,7 @@ def make_cracked_wall_pack(
     return pack
 
 
+@traced(cat="texture")
 def make_plaster_wall_pack(size: int = 512, *, seed: int = 303) -> Dict[str, Image.Image]:
     s = max(int(size), 64)
     low = _fractal_noise(s, seed=seed, octaves=3)
@@ -161,6 +166,7 @@ def make_plaster_wall_pack(size: int = 512, *, seed: int = 303) -> Dict[str, Ima
     return _pack_from_height(height, (210, 206, 198), normal_strength=3.2)
 
 
+@traced(cat="texture")
 def make_roof_shingles_pack(
     size: int = 512,
     *,
@@ -181,6 +187,7 @@ def make_roof_shingles_pack(
     return _pack_from_height(height, (122, 82, 62), normal_strength=6.0)
 
 
+@traced(cat="texture")
 def make_ceramic_tiles_pack(
     size: int = 512,
     *,
@@ -17,6 +17,7 @@ import numpy as np
 from PIL import Image
 
 from src.generator.procedural.texturing.color_tint import apply_texture_color_tint, parse_texture_color_tint
+from src.tracing import traced
 
 
 def _repo_root() -> Path:
@@ -35,6 +36,7 @@ def resolve_texture_path(path: str | Path | None) -> Path | None:
     return r if r.is_file() else None
 
 
+@traced(cat="texture")
 def make_window_frame_texture(size: int = 512) -> Image.Image:
     """Белая рама: почти чистый белый, лёгкий шум и едва заметные вертикальные швы."""
     rng = np.random.default_rng(42)
@@ -47,6 +49,7 @@ def make_window_frame_texture(size: int = 512) -> Image.Image:
     return Image.fromarray(img, mode="RGB")
 
 
+@traced(cat="texture")
 def make_window_glass_texture(size: int = 512) -> Image.Image:
     """Глянцево-серое стекло: нейтральный серый, плавный блик, мало шума."""
     rng = np.random.default_rng(17)
@@ -67,6 +70,7 @@ def make_window_glass_texture(size: int = 512) -> Image.Image:
     return Image.fromarray(out, mode="RGB")
 
 
+@traced(cat="texture")
 def make_window_atlas(half: int = 512) -> Image.Image:
     """Ширина 2*half: левая половина — рама, правая — стекло."""
     fr = make_window_frame_texture(half)
@@ -106,6 +110,7 @@ def _boost_dark_glass_visible(img: Image.Image, luminance_threshold: float = 72.
     return Image.fromarray(b, mode="RGB")
 
 
+@traced(cat="texture")
 def make_atlas_from_sources(
     *,
     frame_path: Path | str | None = None,
@@ -151,6 +156,7 @@ def make_atlas_from_sources(
     return atlas
 
 
+@traced(cat="texture")
 def make_normal_atlas_from_sources(
     *,
     frame_path: Path | str | None = None,
@@ -191,6 +197,7 @@ def make_normal_atlas_from_sources(
     return atlas
 
 
+@traced(cat="texture")
 def make_window_roughness_atlas(
     half_size: int,
     *,
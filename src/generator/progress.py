@@ -0,0 +1,73 @@
+"""
+progress.py — Stage hooks for long-running generation
+
+A progress hook is any callable taking one event dict.  Producers
+(``GridFacadeAssembler``, ``run_all_generators``) wrap their work in
+``stage(hook, name, **info)``, which emits:
+
+    {"stage": "planning", "status": "start", ...info}
+    {"stage": "planning", "status": "end",   "duration": 0.012, ...info}
+
+or ``"status": "error"`` with the message when the stage raises.  With
+``hook=None`` nothing is emitted, so call sites never need to branch.
+
+Every stage is also recorded in the process metrics registry as
+``generation_stage_seconds{stage, part}`` (``part`` is the generator section,
+facade or module type), whether or not a hook is attached, and opened as a
+span of the current request trace (``src.tracing``) when one is active.
+
+Hooks run synchronously on the producing thread and must be cheap; a hook
+that raises is logged and ignored — progress reporting never fails a build.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from src.metrics import REGISTRY
+from src.tracing import span
+
+logger = logging.getLogger(__name__)
+
+ProgressHook = Callable[[Dict[str, Any]], None]
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "generation_stage_seconds",
+    "Duration of generation stages (generator sections, assembler and server steps)",
+    ("stage", "part"),
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "generation_stage_errors_total", "Generation stages that raised", ("stage", "part"),
+)
+
+
+def emit(hook: Optional[ProgressHook], event: Dict[str, Any]) -> None:
+    """Deliver a single event to *hook*, swallowing listener errors."""
+    if hook is None:
+        return
+    try:
+        hook(event)
+    except Exception as exc:
+        logger.warning(f"Progress hook failed on {event.get('stage')}: {exc}")
+
+
+@contextmanager
+def stage(hook: Optional[ProgressHook], name: str, **info: Any) -> Iterator[None]:
+    """Time the enclosed block, record it and report it to *hook* as start/end events."""
+    part = str(info.get("section") or info.get("facade") or info.get("module_type") or "")
+    emit(hook, {"stage": name, "status": "start", **info})
+    t0 = time.perf_counter()
+    try:
+        with span(name, cat="stage", **info):
+            yield
+    except BaseException as exc:
+        duration = time.perf_counter() - t0
+        STAGE_SECONDS.observe(duration, stage=name, part=part)
+        STAGE_ERRORS.inc(stage=name, part=part)
+        emit(hook, {"stage": name, "status": "error", "duration": round(duration, 4),
+                    "error": str(exc), **info})
+        raise
+    duration = time.perf_counter() - t0
+    STAGE_SECONDS.observe(duration, stage=name, part=part)
+    emit(hook, {"stage": name, "status": "end", "duration": round(duration, 4), **info})
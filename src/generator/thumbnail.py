@@ -0,0 +1,248 @@
+"""
+thumbnail.py — Headless NumPy rasterizer for catalogue thumbnails
+
+Renders a small textured preview (default 256×256 RGBA PNG) of an OBJ module
+or house without a display, OpenGL or open3d — only trimesh (loading), NumPy
+(rasterization) and PIL (PNG).  Used at export time so catalogue cards cost
+a few kilobytes instead of the full OBJ + MTL + textures.
+
+Pipeline:
+
+  * the scene is flattened to one triangle soup with a material per face
+    (texture image + per-corner UVs, or a flat colour);
+  * a fixed 3/4 orthographic camera is fitted to the bounding box;
+  * triangles are bucketed by screen bbox size and rasterized in vectorised
+    batches (edge functions over the bbox pixel grid); the nearest fragment
+    per pixel wins via a (pixel, depth) sort instead of a per-pixel z-test;
+  * winners are textured (nearest texel), Lambert-shaded and the image is
+    rendered at ``supersample``× and box-filtered down for anti-aliasing.
+"""
+
+import logging
+import math
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = 256
+THUMBNAIL_NAME = "thumbnail.png"
+
+# Camera: yaw around the up axis, then pitch down towards the model
+_YAW = math.radians(-30.0)
+_PITCH = math.radians(20.0)
+_LIGHT = np.array([0.35, 0.6, 0.7])
+_AMBIENT = 0.45
+_MARGIN = 0.06
+# Upper bound on candidate pixels evaluated per batch (memory ≈ 40 B each)
+_BATCH_PIXELS = 1 << 22
+
+
+class _Soup:
+    """All triangles of a scene with per-face material data."""
+
+    def __init__(self):
+        self.vertices: List[np.ndarray] = []     # (F, 3, 3) per mesh
+        self.uv: List[np.ndarray] = []           # (F, 3, 2) per mesh
+        self.colors: List[np.ndarray] = []       # (F, 3) flat colour per face
+        self.texture_ids: List[np.ndarray] = []  # (F,) index into textures or -1
+        self.textures: List[np.ndarray] = []     # (H, W, 3) uint8
+
+    def add(self, mesh) -> None:
+        faces = np.asarray(mesh.faces)
+        if len(faces) == 0:
+            return
+        tris = np.asarray(mesh.vertices, dtype=np.float64)[faces]
+        count = len(faces)
+        uv = np.zeros((count, 3, 2))
+        color = np.full((count, 3), 200.0)
+        texture_id = np.full(count, -1, dtype=np.int32)
+
+        visual = mesh.visual
+        material = getattr(visual, "material", None)
+        image = getattr(material, "image", None) if material is not None else None
+        if material is not None:
+            diffuse = getattr(material, "diffuse", None)
+            if diffuse is None:
+                diffuse = getattr(material, "baseColorFactor", None)
+            if diffuse is not None:
+                color[:] = np.asarray(diffuse, dtype=np.float64)[:3]
+        vertex_uv = getattr(visual, "uv", None)
+        if image is not None and vertex_uv is not None and len(vertex_uv) == len(mesh.vertices):
+            uv = np.asarray(vertex_uv, dtype=np.float64)[faces]
+            texture_id[:] = len(self.textures)
+            self.textures.append(np.asarray(image.convert("RGB")))
+        elif getattr(visual, "kind", None) == "face":
+            color = np.asarray(visual.face_colors, dtype=np.float64)[:, :3]
+
+        self.vertices.append(tris)
+        self.uv.append(uv)
+        self.colors.append(color)
+        self.texture_ids.append(texture_id)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return (np.concatenate(self.vertices), np.concatenate(self.uv),
+                np.concatenate(self.colors), np.concatenate(self.texture_ids))
+
+
+def _load_soup(obj_path: Path) -> _Soup:
+    import trimesh
+
+    loaded = trimesh.load(str(obj_path), force="scene", process=False)
+    soup = _Soup()
+    for mesh in loaded.dump(concatenate=False):
+        if isinstance(mesh, trimesh.Trimesh):
+            soup.add(mesh)
+    if not soup.vertices:
+        raise ValueError(f"No triangles in {obj_path}")
+    return soup
+
+
+def _view_rotation(z_up: bool) -> np.ndarray:
+    cy, sy = math.cos(_YAW), math.sin(_YAW)
+    cp, sp = math.cos(_PITCH), math.sin(_PITCH)
+    yaw = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    pitch = np.array([[1, 0, 0], [0, cp, -sp], [0, sp, cp]])
+    rot = pitch @ yaw
+    if z_up:
+        # Z-up → Y-up (front face towards +Z, as in the assembler's export)
+        rot = rot @ np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]])
+    return rot
+
+
+def _rasterize(screen: np.ndarray, depth: np.ndarray, size: int
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Nearest fragment per pixel.
+
+    screen: (F, 3, 2) pixel coordinates, depth: (F, 3) (larger = closer).
+    Returns (pixel index, face index, barycentrics (N, 3)) of visible fragments.
+    """
+    x0, y0 = screen[:, 0, 0], screen[:, 0, 1]
+    x1, y1 = screen[:, 1, 0], screen[:, 1, 1]
+    x2, y2 = screen[:, 2, 0], screen[:, 2, 1]
+    area = (x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)
+
+    lo = np.floor(screen.min(axis=1) - 0.5).astype(np.int64) + 1
+    hi = np.floor(screen.max(axis=1) - 0.5).astype(np.int64)
+    lo = np.clip(lo, 0, size - 1)
+    hi = np.clip(hi, -1, size - 1)
+    span = hi - lo + 1
+    valid = (np.abs(area) > 1e-12) & (span[:, 0] > 0) & (span[:, 1] > 0)
+
+    # Bucket by power-of-two bbox width/height so each batch pads little
+    bucket = np.ceil(np.log2(np.maximum(span, 1))).astype(np.int64)
+    key = bucket[:, 0] * 64 + bucket[:, 1]
+
+    pixels, faces, depths, barys = [], [], [], []
+    for k in np.unique(key[valid]):
+        idx = np.nonzero(valid & (key == k))[0]
+        kx, ky = 1 << int(k // 64), 1 << int(k % 64)
+        oy, ox = np.divmod(np.arange(kx * ky), kx)
+        per_batch = max(1, _BATCH_PIXELS // (kx * ky))
+        for start in range(0, len(idx), per_batch):
+            f = idx[start:start + per_batch]
+            px = lo[f, 0:1] + ox
+            py = lo[f, 1:2] + oy
+            inside = (px <= hi[f, 0:1]) & (py <= hi[f, 1:2])
+            cx, cy = px + 0.5, py + 0.5
+            inv = 1.0 / area[f, None]
+            w0 = ((x1[f, None] - cx) * (y2[f, None] - cy) - (x2[f, None] - cx) * (y1[f, None] - cy)) * inv
+            w1 = ((x2[f, None] - cx) * (y0[f, None] - cy) - (x0[f, None] - cx) * (y2[f, None] - cy)) * inv
+            w2 = 1.0 - w0 - w1
+            inside &= (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+            rows, cols = np.nonzero(inside)
+            if len(rows) == 0:
+                continue
+            face = f[rows]
+            b = np.stack([w0[rows, cols], w1[rows, cols], w2[rows, cols]], axis=1)
+            pixels.append(py[rows, cols] * size + px[rows, cols])
+            faces.append(face)
+            depths.append((b * depth[face]).sum(axis=1))
+            barys.append(b)
+
+    if not pixels:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros((0, 3))
+    pixel = np.concatenate(pixels)
+    face = np.concatenate(faces)
+    z = np.concatenate(depths)
+    bary = np.concatenate(barys)
+    order = np.lexsort((-z, pixel))
+    _, first = np.unique(pixel[order], return_index=True)
+    win = order[first]
+    return pixel[win], face[win], bary[win]
+
+
+def render_thumbnail(obj_path: Union[str, Path],
+                     out_path: Optional[Union[str, Path]] = None,
+                     size: int = THUMBNAIL_SIZE,
+                     z_up: bool = False,
+                     supersample: int = 2) -> Path:
+    """
+    Render *obj_path* to an RGBA PNG (transparent background) and return its path.
+
+    *out_path* defaults to ``thumbnail.png`` next to the OBJ.  *z_up* marks
+    models exported Z-up (e.g. wall_window); everything else is treated as Y-up.
+    """
+    from PIL import Image
+
+    obj_path = Path(obj_path)
+    out_path = Path(out_path) if out_path else obj_path.with_name(THUMBNAIL_NAME)
+    ss = max(1, supersample)
+    res = size * ss
+
+    soup = _load_soup(obj_path)
+    tris, uv, colors, texture_ids = soup.arrays()
+
+    # Orthographic camera fitted to the projected bounding box
+    view = tris @ _view_rotation(z_up).T                      # (F, 3, 3)
+    flat = view.reshape(-1, 3)
+    mins, maxs = flat.min(axis=0), flat.max(axis=0)
+    extent = max(maxs[0] - mins[0], maxs[1] - mins[1], 1e-9)
+    scale = res * (1.0 - 2 * _MARGIN) / extent
+    center = (mins + maxs) / 2
+    screen = np.empty(view.shape[:2] + (2,))
+    screen[..., 0] = (view[..., 0] - center[0]) * scale + res / 2
+    screen[..., 1] = res / 2 - (view[..., 1] - center[1]) * scale
+
+    pixel, face, bary = _rasterize(screen, view[..., 2], res)
+
+    # Base colour: nearest texel for textured faces, flat colour otherwise
+    rgb = colors[face]
+    tex = texture_ids[face]
+    for t, image in enumerate(soup.textures):
+        sel = np.nonzero(tex == t)[0]
+        if len(sel) == 0:
+            continue
+        h, w = image.shape[:2]
+        fuv = (bary[sel, :, None] * uv[face[sel]]).sum(axis=1) % 1.0
+        col = np.minimum((fuv[:, 0] * w).astype(np.int64), w - 1)
+        row = np.minimum(((1.0 - fuv[:, 1]) * h).astype(np.int64), h - 1)
+        rgb[sel] = image[row, col]
+
+    # Lambert shading with a two-sided face normal (winding is not reliable)
+    normals = np.cross(view[:, 1] - view[:, 0], view[:, 2] - view[:, 0])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+    shade = _AMBIENT + (1.0 - _AMBIENT) * np.abs(normals @ (_LIGHT / np.linalg.norm(_LIGHT)))
+
+    # Premultiplied RGBA, then box-filter the supersampled image down
+    image = np.zeros((res * res, 4))
+    image[pixel, :3] = rgb * shade[face, None]
+    image[pixel, 3] = 255.0
+    image = image.reshape(size, ss, size, ss, 4).mean(axis=(1, 3))
+    alpha = image[..., 3:4]
+    image[..., :3] = np.where(alpha > 0, image[..., :3] * 255.0 / np.maximum(alpha, 1e-9), 0)
+    out = np.clip(np.rint(image), 0, 255).astype(np.uint8)
+
+    # Write-then-rename: a concurrent reader never sees a half-written PNG
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(f".{out_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    Image.fromarray(out, "RGBA").save(tmp, format="PNG", optimize=True)
+    os.replace(tmp, out_path)
+    logger.info(f"Thumbnail: {out_path} ({len(tris)} triangles, {out_path.stat().st_size} B)")
+    return out_path
@@ -0,0 +1,227 @@
+"""
+metrics.py — In-process metrics registry (counters, gauges, histograms)
+
+A dependency-free subset of the Prometheus client model.  Metrics are created
+once at import time of the module that owns them and updated from any thread:
+
+    REQUESTS = REGISTRY.counter("http_requests_total", "Requests", ("route",))
+    REQUESTS.inc(route="/api/modules")
+
+    LATENCY = REGISTRY.histogram("op_seconds", "Operation time", ("op",))
+    with LATENCY.time(op="export"):
+        ...
+
+Counters and gauges may instead be backed by a callback (``fn=``) that is
+read at scrape time — used for values another component already tracks, such
+as cache hit counts.  ``REGISTRY.render()`` produces the text exposition
+format (version 0.0.4) served at ``/api/metrics``.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Latency buckets in seconds: sub-millisecond registry ops up to minute-long builds.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelKey = Tuple[str, ...]
+# Callback result: a single value, or {label-values tuple: value}
+CallbackValue = Union[float, Dict[LabelKey, float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self,
+                 name: str,
+                 help_text: str,
+                 labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], CallbackValue]] = None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._fn = fn
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _callback_samples(self) -> List[Tuple[LabelKey, float]]:
+        value = self._fn()
+        if isinstance(value, dict):
+            return sorted(value.items())
+        return [((), float(value))]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[Tuple[LabelKey, float]]:
+        if self._fn is not None:
+            return self._callback_samples()
+        with self._lock:
+            return sorted(self._values.items())
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_label_str(self.labelnames, k)} {_format_value(v)}"
+                for k, v in self._samples()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down (in-flight requests, cache bytes, queue depth)."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with ``_sum`` and ``_count`` per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key → [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(sum(series[:-1])) if series else 0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((k, list(v)) for k, v in self._series.items())
+        lines: List[str] = []
+        for key, series in snapshot:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, le)} "
+                             f"{_format_value(cumulative)}")
+            cumulative += series[len(self.buckets)]
+            inf = _label_str(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {_format_value(cumulative)}")
+            labels = _label_str(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of one process; creating an existing name returns it."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                fn: Optional[Callable[[], CallbackValue]] = None) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames, fn=fn)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+              fn: Optional[Callable[[], CallbackValue]] = None) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames, fn=fn)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as exc:  # a broken callback must not break the scrape
+                lines.append(f"# {metric.name} unavailable: {_escape(str(exc))}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,253 @@
+"""
+tracing.py — Request-scoped tracing with nested spans (Chrome trace-event export)
+
+A trace is opened per request (or background job) with ``trace(name)``;
+inside it any code can open nested spans:
+
+    with span("template_merge", module_type="wall"):
+        ...
+
+    @traced("export_wall")
+    def export_wall(...): ...
+
+The current trace and span live in ``contextvars``, so nesting follows the
+call stack and asyncio tasks automatically.  Thread pools do not copy the
+context on their own: submit work through ``bind(fn)`` (a callable bound to
+a copy of the caller's context) to keep spans from worker threads in the
+same trace.  Outside a trace ``span`` is a no-op costing one ContextVar
+lookup, so library code can be instrumented unconditionally.
+
+Finished traces go to ``TRACES`` — a buffer of the slowest N plus the most
+recent traces that were explicitly requested (debug header) — and export as
+Chrome trace-event JSON (``chrome://tracing`` / Perfetto "Open trace file").
+"""
+
+import contextvars
+import functools
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Spans kept per trace; the rest are counted as dropped
+MAX_SPANS_PER_TRACE = 20000
+
+TRACING_ENABLED = os.getenv("TRACING", "on").strip().lower() not in ("0", "off", "false", "no")
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("span", default=None)
+
+
+def _attr(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class Trace:
+    """Spans of one request or job; appended from any thread."""
+
+    def __init__(self, name: str, **attrs: Any):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs: Dict[str, Any] = {k: _attr(v) for k, v in attrs.items()}
+        self.started_at = datetime.now().isoformat()
+        self.t0 = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.requested = False
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _next_id(self) -> int:
+        return next(self._ids)
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            if len(self.spans) < MAX_SPANS_PER_TRACE:
+                self.spans.append(record)
+            else:
+                self.dropped += 1
+
+    def annotate(self, **attrs: Any) -> None:
+        self.attrs.update({k: _attr(v) for k, v in attrs.items()})
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "spans": len(self.spans),
+            "attrs": dict(self.attrs),
+            "url": f"/api/debug/traces/{self.trace_id}",
+        }
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Chrome trace-event JSON: one complete ("X") event per span."""
+        with self._lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        threads: Dict[int, str] = {}
+        total = self.duration if self.duration is not None else time.perf_counter() - self.t0
+        events.append({
+            "name": self.name, "cat": "trace", "ph": "X", "pid": pid, "tid": 0,
+            "ts": 0, "dur": round(total * 1e6, 1), "args": dict(self.attrs),
+        })
+        threads[0] = "request"
+        for s in spans:
+            threads.setdefault(s["tid"], s["thread"])
+            args = dict(s["attrs"])
+            args["span_id"] = s["id"]
+            if s["parent"] is not None:
+                args["parent_id"] = s["parent"]
+            events.append({
+                "name": s["name"], "cat": s["cat"], "ph": "X", "pid": pid, "tid": s["tid"],
+                "ts": round(s["start"] * 1e6, 1), "dur": round(s["duration"] * 1e6, 1),
+                "args": args,
+            })
+        for tid, thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": thread_name}})
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {**self.summary(), "dropped_spans": self.dropped},
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def annotate(**attrs: Any) -> None:
+    """Add attributes to the current trace (no-op outside a trace)."""
+    tr = _current_trace.get()
+    if tr is not None:
+        tr.annotate(**attrs)
+
+
+@contextmanager
+def span(name: str, cat: str = "span", **attrs: Any) -> Iterator[None]:
+    """Time the enclosed block as a child of the current span."""
+    tr = _current_trace.get()
+    if tr is None:
+        yield
+        return
+    span_id = tr._next_id()
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        yield
+    except BaseException as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        end = time.perf_counter()
+        _current_span.reset(token)
+        record_attrs = {k: _attr(v) for k, v in attrs.items()}
+        if error is not None:
+            record_attrs["error"] = error
+        thread = threading.current_thread()
+        tr._add({
+            "id": span_id, "parent": parent, "name": name, "cat": cat,
+            "start": start - tr.t0, "duration": end - start,
+            "tid": thread.ident or 0, "thread": thread.name, "attrs": record_attrs,
+        })
+
+
+def traced(name: Optional[str] = None, cat: str = "function") -> Callable:
+    """Decorator: run the function inside ``span(name or fn.__name__)``."""
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name, cat=cat):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind(fn: Callable) -> Callable:
+    """``fn`` bound to a copy of the current context (for thread pools)."""
+    if _current_trace.get() is None:
+        return fn
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, fn)
+
+
+@contextmanager
+def trace(name: str, requested: bool = False, **attrs: Any) -> Iterator[Optional[Trace]]:
+    """
+    Open a new trace for the enclosed block and hand it to TRACES when done.
+    ``requested`` keeps it retrievable even if it is not among the slowest.
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+    tr = Trace(name, **attrs)
+    tr.requested = requested
+    t_token = _current_trace.set(tr)
+    s_token = _current_span.set(None)
+    try:
+        yield tr
+    finally:
+        _current_span.reset(s_token)
+        _current_trace.reset(t_token)
+        tr.duration = time.perf_counter() - tr.t0
+        TRACES.record(tr)
+
+
+class TraceBuffer:
+    """Slowest ``capacity`` traces (min-heap by duration) + recently requested ones."""
+
+    def __init__(self, capacity: int = 20, requested_capacity: int = 32):
+        self.capacity = max(1, capacity)
+        self.requested_capacity = max(1, requested_capacity)
+        self._lock = threading.Lock()
+        self._slowest: List[Tuple[float, int, Trace]] = []
+        self._requested: "OrderedDict[str, Trace]" = OrderedDict()
+        self._seq = itertools.count()
+
+    def record(self, tr: Trace) -> None:
+        with self._lock:
+            item = (tr.duration or 0.0, next(self._seq), tr)
+            if len(self._slowest) < self.capacity:
+                heapq.heappush(self._slowest, item)
+            elif item[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+            if tr.requested:
+                self._requested[tr.trace_id] = tr
+                while len(self._requested) > self.requested_capacity:
+                    self._requested.popitem(last=False)
+
+    def slowest(self) -> List[Trace]:
+        with self._lock:
+            return [t for _, _, t in sorted(self._slowest, key=lambda i: -i[0])]
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            if trace_id in self._requested:
+                return self._requested[trace_id]
+            return next((t for _, _, t in self._slowest if t.trace_id == trace_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slowest.clear()
+            self._requested.clear()
+
+
+TRACES = TraceBuffer(capacity=int(os.getenv("TRACE_SLOWEST", "20")))
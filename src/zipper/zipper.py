@@ -1,5 +1,6 @@
 import zipfile
 from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple, Union
 
 def make_zip(obj_path, mtl_path, texture_paths, output_zip):
     obj_path = Path(obj_path)
@@ -19,3 +20,111 @@ def make_zip(obj_path, mtl_path, texture_paths, output_zip):
             zipf.write(t, arcname=f"textures/{t.name}")
 
     return str(output_zip)
+
+
+# ======================= ПОТОКОВЫЙ ZIP =======================
+#
+# Архив собирается на лету и отдаётся кусками (StreamingResponse): ни сам
+# архив, ни файлы целиком в памяти не держатся.  PNG/JPG/WebP уже сжаты —
+# кладём их как есть (ZIP_STORED), deflate только для текстовых форматов.
+
+ZIP_CHUNK_SIZE = 256 * 1024
+
+DEFLATE_SUFFIXES = {".obj", ".mtl", ".json", ".txt"}
+
+ZipSource = Union[Path, bytes]
+
+
+def zip_compression(name: str) -> int:
+    """ZIP_DEFLATED для OBJ/MTL/JSON, ZIP_STORED для всего остального (картинки)."""
+    return zipfile.ZIP_DEFLATED if Path(name).suffix.lower() in DEFLATE_SUFFIXES else zipfile.ZIP_STORED
+
+
+class _ChunkSink:
+    """Несикаемый приёмник для ZipFile: копит записанные байты до drain()."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        if data:
+            self._parts.append(bytes(data))
+            self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        if self._parts:
+            data = b"".join(self._parts)
+            self._parts.clear()
+            yield data
+
+
+def iter_zip(entries: Iterable[Tuple[str, ZipSource]],
+             chunk_size: int = ZIP_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Генератор байтов ZIP-архива из пар (arcname, путь к файлу | bytes).
+    Файлы читаются блоками по chunk_size; отсутствующие пропускаются.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w") as z:
+        for arcname, src in entries:
+            compress_type = zip_compression(arcname)
+            if isinstance(src, (bytes, bytearray)):
+                z.writestr(arcname, bytes(src), compress_type=compress_type)
+                yield from sink.drain()
+                continue
+
+            src = Path(src)
+            if not src.is_file():
+                continue
+            zinfo = zipfile.ZipInfo.from_file(src, arcname)
+            zinfo.compress_type = compress_type
+            with open(src, "rb") as f, z.open(zinfo, "w") as dst:
+                while True:
+                    block = f.read(chunk_size)
+                    if not block:
+                        break
+                    dst.write(block)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def write_zip(entries: Iterable[Tuple[str, ZipSource]], output_zip) -> Path:
+    """Тот же архив, что отдаёт iter_zip, но записанный в файл."""
+    output_zip = Path(output_zip)
+    with open(output_zip, "wb") as out:
+        for chunk in iter_zip(entries):
+            out.write(chunk)
+    return output_zip
+
+
+# Предсжатые копии для HTTP (.gz/.br рядом с OBJ/MTL) в архив не кладём
+SKIP_SUFFIXES = (".gz", ".br")
+
+
+def dir_zip_entries(root, prefix: str = "",
+                    exclude: Tuple[str, ...] = ()) -> List[Tuple[str, Path]]:
+    """Все файлы каталога root (рекурсивно) как пары (arcname, путь)."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    entries = []
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        if path.suffix.lower() in SKIP_SUFFIXES:
+            continue
+        rel = path.relative_to(root).as_posix()
+        if path.name.startswith("."):
+            # Служебные скрытые файлы (хэши ETag .etags.json, недописанные .tmp)
+            continue
+        if any(rel == e or rel.startswith(e.rstrip("/") + "/") for e in exclude):
+            continue
+        entries.append((f"{prefix}{rel}", path))
+    return entries